@@ -19,3 +19,63 @@ class Config:
 
     # Knockback on collision
     KNOCKBACK_STRENGTH = 200
+
+    # network
+    # UDP game port a host listens on (LAN discovery answers with it)
+    NET_PORT = 5000
+    # wire codec for snapshots/input: "binary", or "json" for debugging
+    # (readable in a packet capture). json wins if either side asks for it
+    NET_CODEC = "binary"
+    # send snapshots as changes since the last one each client acked
+    # (clients on protocol < 3 always get full snapshots)
+    NET_DELTA_SNAPSHOTS = True
+    # per-peer snapshot filtering: enemies/pickups on the peer's map only,
+    # and only within this many pixels of its player (0 = the whole map)
+    NET_INTEREST_MANAGEMENT = True
+    NET_INTEREST_RADIUS = 0
+    # players on other maps are refreshed every this many snapshot ticks
+    NET_PARTY_SUMMARY_INTERVAL = 10
+    # client jitter buffer: render remote entities this far in the past (s).
+    # grows with snapshot interval and measured jitter, up to the max
+    NET_INTERP_DELAY = 0.1
+    NET_INTERP_DELAY_MAX = 0.35
+    # keep moving remote entities this long (s) when snapshots stop arriving
+    NET_EXTRAPOLATE_MAX = 0.1
+    # host: queued inputs per client beyond this are dropped (oldest first)
+    NET_INPUT_QUEUE_MAX = 6
+    # client: every input packet also repeats this many earlier inputs, so
+    # the input (attack press) of a lost packet still arrives with the next
+    NET_INPUT_HISTORY = 4
+    # host: per-peer snapshot rate follows measured rtt/loss between these
+    # (Hz), within a per-peer bandwidth budget (bytes/s, 0 = no budget)
+    NET_ADAPTIVE_RATE = True
+    NET_SEND_RATE_MIN = 10
+    NET_SEND_RATE_MAX = 60
+    NET_PEER_BUDGET = 32000
+    # host pings each peer this often (s); no pong within the timeout = lost
+    NET_PING_INTERVAL = 0.25
+    NET_PING_TIMEOUT = 1.0
+    # smoothed ping loss above this backs the snapshot rate off
+    NET_LOSS_THRESHOLD = 0.1
+    # largest datagram the host sends (bytes); bigger snapshots are split
+    # into chunks by entity range instead of relying on IP fragmentation
+    NET_MTU = 1200
+    # clients ping the host when they have sent nothing else for this long (s);
+    # the host drops peers it hasn't heard from for NET_PEER_TIMEOUT, and a
+    # client that hasn't heard from the host that long tries to resume with
+    # the token from its WELCOME (same peer id and hero)
+    NET_HEARTBEAT_INTERVAL = 1.0
+    NET_PEER_TIMEOUT = 5.0
+    # dedicated server: a run whose peers all timed out waits this long (s)
+    # for one of them to resume before going back to the lobby
+    NET_RESUME_GRACE = 60.0
+    # network condition simulator for local testing (game/net/netsim.py):
+    # datagrams this process sends get one-way latency +- jitter (s), and a
+    # fraction of them is lost, duplicated or reordered. off while all are 0.
+    # GC_NET_SIM_* environment variables override these
+    NET_SIM_LATENCY = 0.0
+    NET_SIM_JITTER = 0.0
+    NET_SIM_LOSS = 0.0
+    NET_SIM_DUPLICATE = 0.0
+    NET_SIM_REORDER = 0.0
+    NET_SIM_SEED = 1
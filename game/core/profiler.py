@@ -0,0 +1,161 @@
+# class: TickProfiler
+
+# per-system timing for World.update
+#
+# when a World has a profiler attached (world.profiler = TickProfiler()),
+# every system's update (plus the command flush after it) is timed with
+# perf_counter. each system keeps a rolling window of samples so we can read
+# p50/p95/p99 without storing the whole session
+#
+# scenes can time draw-side work too (RenderSystem.draw, HUD) with
+# profiler.section("name")
+#
+# results can be dumped with to_csv()/to_json() for comparing machines/builds
+#
+# "entities" is how many entities a system's queries/views walked in its last
+# call (World.visited); for the tick row it's the world's entity count
+#
+# percentiles sort the whole window, so the overlay reads latest_summary(),
+# which recomputes at most every SUMMARY_INTERVAL seconds instead of per frame
+
+import csv
+import json
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List
+
+# number of samples kept per system
+WINDOW = 300
+# how often (s) latest_summary() recomputes
+SUMMARY_INTERVAL = 0.25
+
+
+class SystemStats:
+    def __init__(self, name: str, window: int = WINDOW) -> None:
+        self.name = name
+        self.calls = 0                          # total calls since reset
+        self.total_ms = 0.0                     # total time since reset
+        self.last_ms = 0.0                      # time of the most recent call
+        self.max_ms = 0.0                       # worst call since reset
+        self.entities = 0                       # entities walked by the last call
+        self.samples: Deque[float] = deque(maxlen=window)
+
+    def add(self, ms: float, entities: int) -> None:
+        self.calls += 1
+        self.total_ms += ms
+        self.last_ms = ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+        self.entities = entities
+        self.samples.append(ms)
+
+    # p in [0, 100], nearest-rank over the current window
+    def percentile(self, p: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        k = int(round(p / 100.0 * (len(ordered) - 1)))
+        return ordered[k]
+
+    def mean(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(self.samples) / len(self.samples)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "system": self.name,
+            "calls": self.calls,
+            "entities": self.entities,
+            "last_ms": round(self.last_ms, 4),
+            "mean_ms": round(self.mean(), 4),
+            "p50_ms": round(self.percentile(50), 4),
+            "p95_ms": round(self.percentile(95), 4),
+            "p99_ms": round(self.percentile(99), 4),
+            "max_ms": round(self.max_ms, 4),
+        }
+
+
+class TickProfiler:
+    def __init__(self, window: int = WINDOW) -> None:
+        self.window = window
+        self.enabled = True
+        self.ticks = 0
+        self.stats: Dict[str, SystemStats] = {}     # system name -> stats, in first-seen order
+        self.tick = SystemStats("tick", window)     # whole World.update
+        self._summary: List[Dict[str, Any]] = []
+        self._summary_at = float("-inf")
+
+    def reset(self) -> None:
+        self.ticks = 0
+        self.stats.clear()
+        self.tick = SystemStats("tick", self.window)
+        self._summary_at = float("-inf")
+
+    def record(self, name: str, ms: float, entities: int) -> None:
+        st = self.stats.get(name)
+        if st is None:
+            st = SystemStats(name, self.window)
+            self.stats[name] = st
+        st.add(ms, entities)
+
+    def end_tick(self, ms: float, entities: int) -> None:
+        self.ticks += 1
+        self.tick.add(ms, entities)
+
+    # time an arbitrary block (draw calls, net pumping, ...)
+    # pass the world to count the entities the block walks
+    @contextmanager
+    def section(self, name: str, world: Any = None) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        visited = world.visited if world is not None else 0
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            ms = (time.perf_counter() - t0) * 1000.0
+            self.record(name, ms, world.visited - visited if world is not None else 0)
+
+    # one dict per system, worst p95 first, then the tick total
+    def summary(self) -> List[Dict[str, Any]]:
+        rows = [st.summary() for st in self.stats.values()]
+        rows.sort(key=lambda r: r["p95_ms"], reverse=True)
+        rows.append(self.tick.summary())
+        return rows
+
+    # summary() from at most SUMMARY_INTERVAL ago; the same list object until
+    # it's recomputed, so callers can cache what they build from it
+    def latest_summary(self) -> List[Dict[str, Any]]:
+        now = time.perf_counter()
+        if now - self._summary_at >= SUMMARY_INTERVAL:
+            self._summary = self.summary()
+            self._summary_at = now
+        return self._summary
+
+    # export ########################################################################
+
+    def to_csv(self, path: str) -> None:
+        rows = self.summary()
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def to_json(self, path: str, include_samples: bool = False) -> None:
+        data: Dict[str, Any] = {
+            "ticks": self.ticks,
+            "window": self.window,
+            "systems": self.summary(),
+        }
+        if include_samples:
+            data["samples"] = {name: list(st.samples) for name, st in self.stats.items()}
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+
+
+# name used for a system in the profiler (class name, like the systems list reads)
+def system_name(system: Any) -> str:
+    return type(system).__name__
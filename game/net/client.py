@@ -1,12 +1,31 @@
 # AUTHORED BY: Scott Petty, Cole Herzog
 # Non-blocking UDP client wrapper used by remote peers.
+# chunked snapshots are reassembled here; recv_all only hands out whole
+# (or given-up "partial") snapshots (game/net/fragment.py)
+# reliable control messages (game/net/reliable.py) are acked on every outgoing
+# datagram and handed out in order
+# against a v9+ host, a ping goes out whenever nothing else has for
+# Config.NET_HEARTBEAT_INTERVAL, and resume() says HELLO again with the token
+# from WELCOME to get the same peer id back after the link dropped
+# datagrams are received and decoded on the net loop thread
+# (game/net/transport.py); recv_all only drains what's already decoded
 
 from __future__ import annotations
 
 import socket
-from typing import List, Tuple, Dict, Any
+import time
+from typing import List, Tuple, Dict, Any, Optional
 
-from game.net.codec import encode_message, decode_message
+from game.core.config import Config
+from game.net.codec import encode_message, BinaryCodec, JsonCodec
+from game.net.protocol import (
+    PROTOCOL_VERSION, MSG_HELLO, MSG_WELCOME, MSG_PING,
+    JSON_PROTOCOL_VERSION, RELIABLE_PROTOCOL_VERSION, HEARTBEAT_PROTOCOL_VERSION,
+)
+from game.net.fragment import Reassembler
+from game.net.reliable import ReliableEndpoint, CHANNEL_CONTROL
+from game.net.netsim import NetSim, wrap_socket
+from game.net.transport import Inbox, net_loop
 
 Address = Tuple[str, int]
 
@@ -20,36 +39,149 @@ class NetClient:
         sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         sock.setblocking(False)
         sock.bind(("0.0.0.0", local_port))
-        self._sock = sock
+        # a simulated bad link when Config.NET_SIM_* asks for one (sends only)
+        self._sock = wrap_socket(sock, "client")
+
+        # JSON until the host's WELCOME says otherwise
+        self.codec = None
+        self.reassembler = Reassembler()
+        self.reliable = ReliableEndpoint()
+
+        # perf_counter times of the last datagram in / out
+        now = time.perf_counter()
+        self.last_heard = now
+        self.last_sent = now
+        # from WELCOME; None until a v9+ host gives us one
+        self.resume_token: Optional[str] = None
+        self._last_resume = -Config.NET_HEARTBEAT_INTERVAL
+
+        # received on the net loop, decoded with the codec current at the time
+        self._inbox = Inbox(self._codec_for)
+        self._transport = net_loop().open(sock, self._inbox)
 
     # I/O
 
     def send(self, message: Dict[str, Any]) -> None:
-        try:
-            self._sock.sendto(encode_message(message), self.remote)
-        except OSError:
-            pass
+        codec = self.codec
+        data = codec.encode(message) if codec is not None else encode_message(message)
+        self._send_bytes(data)
+
+    # resent until the host acks it; a host that predates reliable delivery
+    # gets a plain send
+    def send_reliable(self, message: Dict[str, Any], channel: int = CHANNEL_CONTROL) -> None:
+        codec = self.codec
+        if codec is not None and codec.protocol >= RELIABLE_PROTOCOL_VERSION:
+            message = self.reliable.wrap(message, time.perf_counter(), channel)
+        self.send(message)
 
+    # also resends unacked reliable messages, sends acks nothing carried and
+    # the heartbeat
     def recv_all(self) -> List[dict]:
         messages: List[dict] = []
-        while True:
-            try:
-                data, _addr = self._sock.recvfrom(self.buffer_size)
-            except BlockingIOError:
-                break
-            except OSError:
-                break
+        now = time.perf_counter()
+        if isinstance(self._sock, NetSim):
+            self._sock.flush(now)
+        for _addr, at, epoch, ack, bits, msg in self._inbox.drain():
+            self.last_heard = at
+            if epoch is not None:
+                self.reliable.on_ack(epoch, ack, bits)
+            if msg is None:
+                continue    # ack only
 
-            try:
-                msg = decode_message(data)
-            except Exception:
-                continue
+            delivered = self.reliable.on_receive(msg, now) if "rel" in msg else [msg]
+            for msg in delivered:
+                if msg.get("type") == MSG_WELCOME:
+                    self._accept_welcome(msg)
+                messages.extend(self.reassembler.push(msg))
 
-            messages.append(msg)
+        for message in self.reliable.due(now):
+            self.send(message)
+        if self.reliable.failed:
+            self._restart_reliable()
+        for header in self.reliable.stray_acks():
+            self._send_plain(header)
+        if self.reliable.ack_overdue(now):
+            self._send_bytes(b"")
 
+        codec = self.codec
+        if (codec is not None and codec.protocol >= HEARTBEAT_PROTOCOL_VERSION
+                and now - self.last_sent > Config.NET_HEARTBEAT_INTERVAL):
+            self.send({"type": MSG_PING, "time": now})
         return messages
 
+    # seconds since the host last sent anything
+    def silent_for(self) -> float:
+        return time.perf_counter() - self.last_heard
+
+    # ask the host for our old peer id back (after a timeout or an address
+    # change). rate limited to one HELLO per heartbeat interval; False when
+    # there's no token to resume with
+    def resume(self) -> bool:
+        if self.resume_token is None:
+            return False
+        now = time.perf_counter()
+        if now - self._last_resume < Config.NET_HEARTBEAT_INTERVAL:
+            return True
+        self._last_resume = now
+        # the host starts a fresh endpoint on HELLO; so do we
+        self.reliable = ReliableEndpoint()
+        self.send({
+            "type": MSG_HELLO,
+            "protocol": PROTOCOL_VERSION,
+            "codec": Config.NET_CODEC,
+            "name": "Player",
+            "resume": self.resume_token,
+        })
+        return True
+
+    # the host never acked one of our reliable messages, so it holds every
+    # later one on that channel. say HELLO again with the resume token (the
+    # host answers with a fresh endpoint and our old id); without a token,
+    # at least start a new epoch so later messages get through
+    def _restart_reliable(self) -> None:
+        stuck = self.reliable
+        lost = [m.get("type") for m in stuck.gave_up]
+        if self.resume():
+            # resume() is rate limited; only say so when the HELLO went out
+            if self.reliable is not stuck:
+                print(f"[net] host never acked {lost}; resuming")
+            return
+        print(f"[net] host never acked {lost}; starting a new reliable epoch")
+        self.reliable = ReliableEndpoint()
+
+    # our acks ride in front of every datagram while some are due
+    def _send_bytes(self, data: bytes) -> None:
+        header = self.reliable.ack_header(time.perf_counter())
+        if header is not None:
+            data = header + data
+        self._send_plain(data)
+
+    def _send_plain(self, data: bytes) -> None:
+        try:
+            self._sock.sendto(data, self.remote)
+            self.last_sent = time.perf_counter()
+        except OSError:
+            pass
+
+    def _codec_for(self, _addr: Address):
+        return self.codec
+
+    # switch to the codec the host picked for us
+    def _accept_welcome(self, msg: Dict[str, Any]) -> None:
+        strings = msg.get("strings")
+        clips = msg.get("clips")
+        protocol = int(msg.get("protocol", JSON_PROTOCOL_VERSION))
+        if msg.get("codec") == "binary" and isinstance(strings, list):
+            self.codec = BinaryCodec(strings, clips if isinstance(clips, list) else None, protocol)
+        else:
+            self.codec = JsonCodec(protocol)
+        self.reassembler.clear()
+        token = msg.get("resume")
+        if isinstance(token, str):
+            self.resume_token = token
+
     def close(self) -> None:
+        net_loop().close(self._transport)
         try:
             self._sock.close()
         except OSError:
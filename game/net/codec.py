@@ -1,9 +1,121 @@
 # AUTHORED BY: Scott Petty, Cole Herzog
-# Converts Python dict messages <-> bytes using JSON over UDP.
+# Converts Python dict messages <-> bytes for UDP.
+#
+# two codecs share the wire:
+#   - JsonCodec:   every message as compact JSON. used for control messages
+#                  (hello/welcome/lobby/...), for peers older than
+#                  BINARY_PROTOCOL_VERSION, and as a debug fallback
+#                  (Config.NET_CODEC = "json")
+#   - BinaryCodec: hot messages (snapshot, snapshot delta, input) as
+#                  [magic][type tag][records]. records are fixed-layout structs;
+#                  every string field is a u16 index into the session string
+#                  table the host sends in WELCOME, plus a small per-packet
+#                  table for strings that aren't in it (peer ids, new map ids, ...)
+#                  delta records carry a field mask and only the masked fields
+#                  positions/hp go as fixed-point integers and facing/clip as
+#                  u8 enum indices (quantization in game/net/snapshots.py);
+#                  the clip table travels in WELCOME with the string table
+#                  snapshot/delta headers carry part/parts for chunked
+#                  snapshots (game/net/fragment.py)
+#                  input packets end with the repeated earlier inputs, each
+#                  as its tick's distance back from the packet tick
+#
+# decoding doesn't need to know which codec the sender picked: binary packets
+# start with BINARY_MAGIC, JSON packets start with "{"
 
 from __future__ import annotations
 import json
-from typing import Any, Dict
+import struct
+from typing import Any, Callable, Dict, List, Optional
+
+from game.net.protocol import (
+    PROTOCOL_VERSION,
+    BINARY_PROTOCOL_VERSION,
+    JSON_PROTOCOL_VERSION,
+    MSG_SNAPSHOT,
+    MSG_SNAPSHOT_DELTA,
+    MSG_INPUT,
+)
+from game.net.snapshots import (
+    FACINGS,
+    POSITION_STEPS,
+    POSITION_MARGIN,
+    HP_STEPS,
+    build_clip_table,
+    quantize_position,
+    dequantize_position,
+    quantize_hp,
+    dequantize_hp,
+)
+
+BINARY_MAGIC = 0xB1
+
+# type tags for binary messages
+TAG_SNAPSHOT = 1
+TAG_INPUT = 2
+TAG_DELTA = 3
+
+NO_STRING = 0xFFFF      # string index meaning None
+
+FACING_INDEX = {f: i for i, f in enumerate(FACINGS)}
+SOURCE_KINDS = ("global", "player", "enemy")
+
+# magic, tag, tick, part, parts, map_id, n_players, n_enemies, n_pickups, n_sounds, n_extra_strings
+_SNAPSHOT_HEADER = struct.Struct("<BBIBBHHHHHH")
+# x/y are quantized positions, hp quantized hp, facing/clip enum indices
+# peer_id, x, y, facing, clip, frame, hp, map_id, score, input_tick
+_PLAYER = struct.Struct("<HHHBBBhHiI")
+# id, x, y, facing, clip, frame, hp, atlas_id, map_id
+_ENEMY = struct.Struct("<IHHBBBhHH")
+# id, x, y, kind, atlas_id, map_id
+_PICKUP = struct.Struct("<IHHHHH")
+# event, subtype, flags (bit0 global, bits1-2 source kind), host_id (-1 = None), peer_id
+_SOUND = struct.Struct("<HHBiH")
+# magic, tag, tick, ack, n_extra_strings, peer_id, move_x, move_y, facing, buttons, n_history
+_INPUT = struct.Struct("<BBIIHHffHBB")
+# ticks back from the packet tick, move_x, move_y, facing, buttons
+_INPUT_HISTORY = struct.Struct("<BffHB")
+# magic, tag, tick, base_tick, part, parts, map_id, n_players, n_enemies, n_pickups, n_sounds,
+# n_removed_players, n_removed_enemies, n_removed_pickups, n_extra_strings
+_DELTA_HEADER = struct.Struct("<BBIIBBHHHHHHHHH")
+_STR_LEN = struct.Struct("<H")
+
+# Intent button bits in binary input
+_BUTTONS = ("basic_atk", "basic_atk_held", "dash", "special_atk")
+
+# delta records: [key][u16 mask][masked fields in this order]
+# kinds: "S" string index, "P" quantized position, "Q" quantized hp,
+# "F" facing index, "C" clip index, anything else is a struct format char.
+# DELTA_NEW marks a created entity
+_PLAYER_FIELDS = (("x", "P"), ("y", "P"), ("facing", "F"), ("clip", "C"), ("frame", "B"),
+                  ("hp", "Q"), ("map_id", "S"), ("score", "i"), ("input_tick", "I"))
+_ENEMY_FIELDS = (("x", "P"), ("y", "P"), ("facing", "F"), ("clip", "C"), ("frame", "B"),
+                 ("hp", "Q"), ("atlas_id", "S"), ("map_id", "S"))
+_PICKUP_FIELDS = (("x", "P"), ("y", "P"), ("kind", "S"), ("atlas_id", "S"), ("map_id", "S"))
+# struct format of the special kinds
+_KIND_FORMATS = {"S": "H", "P": "H", "Q": "h", "F": "B", "C": "B"}
+# (category, key field, key struct, fields)
+_DELTA_CATEGORIES = (
+    ("players", "peer_id", struct.Struct("<HH"), _PLAYER_FIELDS),
+    ("enemies", "id", struct.Struct("<IH"), _ENEMY_FIELDS),
+    ("pickups", "id", struct.Struct("<IH"), _PICKUP_FIELDS),
+)
+DELTA_NEW = 0x8000
+
+# (fields, mask) -> (struct of the masked fields, [(name, kind), ...])
+_MASK_LAYOUTS: Dict[Any, Any] = {}
+
+
+def _mask_layout(fields, mask: int):
+    key = (id(fields), mask)
+    layout = _MASK_LAYOUTS.get(key)
+    if layout is None:
+        picked = [(name, kind) for bit, (name, kind) in enumerate(fields) if mask & (1 << bit)]
+        fmt = "<" + "".join(_KIND_FORMATS.get(kind, kind) for _name, kind in picked)
+        layout = (struct.Struct(fmt), picked)
+        _MASK_LAYOUTS[key] = layout
+    return layout
+
 
 # Encode message dict into bytes to send over UDP using a jSON representation
 def encode_message(message: Dict[str, Any]) -> bytes:
@@ -11,6 +123,494 @@ def encode_message(message: Dict[str, Any]) -> bytes:
 
 
 # Decode bytes recieved from the network back into a dict
-def decode_message(data: bytes) -> Dict[str, Any]:
+# binary packets need the BinaryCodec negotiated for that peer
+def decode_message(data: bytes, codec: Optional["BinaryCodec"] = None) -> Dict[str, Any]:
+    if data and data[0] == BINARY_MAGIC:
+        if codec is None or not isinstance(codec, BinaryCodec):
+            raise ValueError("binary packet without a negotiated string table")
+        return codec.decode(data)
     text = data.decode("utf-8")
     return json.loads(text)
+
+
+class JsonCodec:
+    name = "json"
+
+    def __init__(self, protocol: int = JSON_PROTOCOL_VERSION) -> None:
+        self.protocol = protocol
+
+    def encode(self, message: Dict[str, Any]) -> bytes:
+        # stamp the version this peer negotiated (protocol 1 peers drop others)
+        if message.get("protocol", self.protocol) != self.protocol:
+            message = {**message, "protocol": self.protocol}
+        return encode_message(message)
+
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        return decode_message(data)
+
+
+class BinaryCodec:
+    name = "binary"
+
+    # clips: the host's clip table from WELCOME (built locally if not given)
+    # protocol: the version negotiated with the peer (BINARY_PROTOCOL_VERSION or
+    # newer; the layout is the same, it gates the other features)
+    def __init__(self, strings: List[str], clips: Optional[List[str]] = None,
+                 protocol: int = PROTOCOL_VERSION) -> None:
+        self.protocol = protocol
+        self.strings: List[str] = list(strings)[:NO_STRING - 1]
+        self.index: Dict[str, int] = {s: i for i, s in enumerate(self.strings)}
+        self.clips: List[str] = list(clips if clips is not None else build_clip_table())[:0xFF]
+        self.clip_index: Dict[str, int] = {c: i for i, c in enumerate(self.clips)}
+        # clips no atlas has can't be drawn anyway; they go out as this one
+        self._clip_fallback = self.clip_index.get("idle", 0)
+
+    # encode ###############################################################
+
+    def encode(self, message: Dict[str, Any]) -> bytes:
+        mtype = message.get("type")
+        if mtype == MSG_SNAPSHOT:
+            return self._encode_snapshot(message)
+        if mtype == MSG_SNAPSHOT_DELTA:
+            return self._encode_delta(message)
+        if mtype == MSG_INPUT:
+            return self._encode_input(message)
+        # control messages are rare; keep them readable
+        return encode_message(message)
+
+    def _interner(self):
+        index = self.index
+        base = len(self.strings)
+        extras: List[str] = []
+        extra_index: Dict[str, int] = {}
+
+        def intern(s: Optional[str]) -> int:
+            if s is None:
+                return NO_STRING
+            i = index.get(s)
+            if i is None:
+                i = extra_index.get(s)
+                if i is None:
+                    s = str(s)
+                    i = base + len(extras)
+                    if i >= NO_STRING:
+                        raise ValueError("too many strings in one packet")
+                    extras.append(s)
+                    extra_index[s] = i
+            return i
+
+        return intern, extras
+
+    @staticmethod
+    def _pack_extras(extras: List[str]) -> bytes:
+        parts = []
+        for s in extras:
+            raw = s.encode("utf-8")
+            parts.append(_STR_LEN.pack(len(raw)))
+            parts.append(raw)
+        return b"".join(parts)
+
+    def _encode_snapshot(self, msg: Dict[str, Any]) -> bytes:
+        intern, extras = self._interner()
+        players = msg.get("players", [])
+        enemies = msg.get("enemies", [])
+        pickups = msg.get("pickups", [])
+        sounds = msg.get("sound_events", [])
+
+        try:
+            body = self._pack_records(players, enemies, pickups, intern)
+        except struct.error:
+            # something off the map or past the hp range: clamp and retry
+            clamp = self._clamp_record
+            body = self._pack_records([clamp(p) for p in players], [clamp(e) for e in enemies],
+                                      [clamp(p) for p in pickups], intern)
+        body += self._pack_sounds(sounds, intern)
+
+        map_i = intern(msg.get("map_id"))
+        header = _SNAPSHOT_HEADER.pack(
+            BINARY_MAGIC, TAG_SNAPSHOT, msg.get("tick", 0), msg.get("part", 0), msg.get("parts", 1), map_i,
+            len(players), len(enemies), len(pickups), len(sounds), len(extras),
+        )
+        return header + self._pack_extras(extras) + b"".join(body)
+
+    # records of a full snapshot. the host already rounded positions/hp to
+    # the wire steps, so this only scales them; values that don't fit the
+    # struct raise struct.error (see _clamp_record)
+    def _pack_records(self, players, enemies, pickups, intern) -> List[bytes]:
+        steps, margin, hp_steps = float(POSITION_STEPS), float(POSITION_MARGIN), HP_STEPS
+        facing_i = FACING_INDEX.get
+        clip_i = self.clip_index.get
+        clip_fallback = self._clip_fallback
+
+        pack_player = _PLAYER.pack
+        body = [pack_player(
+            intern(p["peer_id"]), round((p["x"] + margin) * steps), round((p["y"] + margin) * steps),
+            facing_i(p["facing"], 1), clip_i(p["clip"], clip_fallback), p["frame"],
+            round(p["hp"] * hp_steps), intern(p.get("map_id")), p.get("score", 0), p.get("input_tick", 0),
+        ) for p in players]
+
+        pack_enemy = _ENEMY.pack
+        body += [pack_enemy(
+            e["id"], round((e["x"] + margin) * steps), round((e["y"] + margin) * steps),
+            facing_i(e["facing"], 1), clip_i(e["clip"], clip_fallback), e["frame"],
+            round(e["hp"] * hp_steps), intern(e["atlas_id"]), intern(e.get("map_id")),
+        ) for e in enemies]
+
+        pack_pickup = _PICKUP.pack
+        body += [pack_pickup(
+            p["id"], round((p["x"] + margin) * steps), round((p["y"] + margin) * steps),
+            intern(p["kind"]), intern(p["atlas_id"]), intern(p.get("map_id")),
+        ) for p in pickups]
+        return body
+
+    # a record with position/hp/frame pulled into what the wire can carry
+    @staticmethod
+    def _clamp_record(rec: Dict[str, Any]) -> Dict[str, Any]:
+        rec = dict(rec)
+        rec["x"] = dequantize_position(quantize_position(rec["x"]))
+        rec["y"] = dequantize_position(quantize_position(rec["y"]))
+        if "hp" in rec:
+            rec["hp"] = dequantize_hp(quantize_hp(rec["hp"]))
+        if "frame" in rec:
+            rec["frame"] = max(0, min(int(rec["frame"]), 0xFF))
+        return rec
+
+    @staticmethod
+    def _pack_sounds(sounds: List[Dict[str, Any]], intern) -> List[bytes]:
+        pack_sound = _SOUND.pack
+        out = []
+        for s in sounds:
+            kind = s.get("source_kind")
+            kind_i = SOURCE_KINDS.index(kind) if kind in SOURCE_KINDS else 0
+            host_id = s.get("host_id")
+            out.append(pack_sound(
+                intern(s.get("event")), intern(s.get("subtype")),
+                (1 if s.get("global_event") else 0) | (kind_i << 1),
+                -1 if host_id is None else host_id,
+                intern(s.get("peer_id")),
+            ))
+        return out
+
+    def _encode_delta(self, msg: Dict[str, Any]) -> bytes:
+        intern, extras = self._interner()
+        removed = msg.get("removed") or {}
+        removed_players = removed.get("players", [])
+        removed_enemies = removed.get("enemies", [])
+        removed_pickups = removed.get("pickups", [])
+        sounds = msg.get("sound_events", [])
+
+        body = [struct.pack(f"<{len(removed_players)}H", *[intern(k) for k in removed_players]),
+                struct.pack(f"<{len(removed_enemies)}I", *removed_enemies),
+                struct.pack(f"<{len(removed_pickups)}I", *removed_pickups)]
+
+        counts = []
+        for category, key, head, fields in _DELTA_CATEGORIES:
+            records = msg.get(category, [])
+            counts.append(len(records))
+            key_is_string = head.format[1] == "H"
+            for rec in records:
+                mask = 0
+                for bit, (name, _kind) in enumerate(fields):
+                    if name in rec:
+                        mask |= 1 << bit
+                layout, picked = _mask_layout(fields, mask)
+                values = [self._pack_value(kind, rec[name], intern) for name, kind in picked]
+                if rec.get("new"):
+                    mask |= DELTA_NEW
+                k = rec[key]
+                body.append(head.pack(intern(k) if key_is_string else k, mask))
+                body.append(layout.pack(*values))
+
+        body += self._pack_sounds(sounds, intern)
+
+        map_i = intern(msg.get("map_id"))
+        header = _DELTA_HEADER.pack(
+            BINARY_MAGIC, TAG_DELTA, msg.get("tick", 0), msg.get("base_tick", 0),
+            msg.get("part", 0), msg.get("parts", 1), map_i,
+            counts[0], counts[1], counts[2], len(sounds),
+            len(removed_players), len(removed_enemies), len(removed_pickups), len(extras),
+        )
+        return header + self._pack_extras(extras) + b"".join(body)
+
+    def _encode_input(self, msg: Dict[str, Any]) -> bytes:
+        intern, extras = self._interner()
+        tick = msg.get("tick", 0)
+        intent = msg.get("intent", {}) or {}
+        peer_i = intern(msg.get("peer_id"))
+        facing_i = intern(intent.get("facing", "down"))
+
+        history = []
+        for old_tick, old in msg.get("history", ()):
+            back = tick - old_tick
+            if 0 < back <= 0xFF:
+                history.append(_INPUT_HISTORY.pack(
+                    back, old.get("move_x", 0.0), old.get("move_y", 0.0),
+                    intern(old.get("facing", "down")), self._buttons(old),
+                ))
+
+        head = _INPUT.pack(
+            BINARY_MAGIC, TAG_INPUT, tick, msg.get("ack", 0), len(extras), peer_i,
+            intent.get("move_x", 0.0), intent.get("move_y", 0.0), facing_i, self._buttons(intent),
+            len(history),
+        )
+        return head + self._pack_extras(extras) + b"".join(history)
+
+    @staticmethod
+    def _buttons(intent: Dict[str, Any]) -> int:
+        buttons = 0
+        for bit, name in enumerate(_BUTTONS):
+            if intent.get(name):
+                buttons |= 1 << bit
+        return buttons
+
+    # delta field value -> what its struct slot holds
+    def _pack_value(self, kind: str, v: Any, intern) -> Any:
+        if kind == "S":
+            return intern(v)
+        if kind == "P":
+            return quantize_position(v)
+        if kind == "Q":
+            return quantize_hp(v)
+        if kind == "F":
+            return FACING_INDEX.get(v, 1)
+        if kind == "C":
+            return self.clip_index.get(v, self._clip_fallback)
+        if kind == "B":
+            return min(v, 0xFF)
+        return v
+
+    def _unpack_value(self, kind: str, v: Any, s) -> Any:
+        if kind == "S":
+            return s(v)
+        if kind == "P":
+            return dequantize_position(v)
+        if kind == "Q":
+            return dequantize_hp(v)
+        if kind == "F":
+            return self._facing(v)
+        if kind == "C":
+            return self._clip(v)
+        return v
+
+    @staticmethod
+    def _facing(i: int) -> str:
+        return FACINGS[i] if i < len(FACINGS) else "down"
+
+    def _clip(self, i: int) -> Optional[str]:
+        clips = self.clips
+        if i < len(clips):
+            return clips[i]
+        return clips[self._clip_fallback] if clips else None
+
+    # decode ###############################################################
+
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        tag = data[1]
+        if tag == TAG_SNAPSHOT:
+            return self._decode_snapshot(data)
+        if tag == TAG_DELTA:
+            return self._decode_delta(data)
+        if tag == TAG_INPUT:
+            return self._decode_input(data)
+        raise ValueError(f"unknown binary message tag {tag}")
+
+    def _read_strings(self, data: bytes, offset: int, count: int):
+        if not count:
+            return self.strings, offset
+        strings = list(self.strings)
+        for _ in range(count):
+            (n,) = _STR_LEN.unpack_from(data, offset)
+            offset += 2
+            strings.append(data[offset:offset + n].decode("utf-8"))
+            offset += n
+        return strings, offset
+
+    def _decode_snapshot(self, data: bytes) -> Dict[str, Any]:
+        (_magic, _tag, tick, part, parts, map_i, n_players, n_enemies, n_pickups, n_sounds,
+         n_extra) = _SNAPSHOT_HEADER.unpack_from(data, 0)
+        strings, offset = self._read_strings(data, _SNAPSHOT_HEADER.size, n_extra)
+
+        def s(i: int) -> Optional[str]:
+            return None if i == NO_STRING else strings[i]
+
+        pos = dequantize_position
+        hp_of = dequantize_hp
+        facing_of = self._facing
+        clip_of = self._clip
+
+        end = offset + n_players * _PLAYER.size
+        players = [{
+            "peer_id": s(peer), "x": pos(x), "y": pos(y), "facing": facing_of(facing), "clip": clip_of(clip),
+            "frame": frame, "hp": hp_of(hp), "map_id": s(map_id), "score": score, "input_tick": input_tick,
+        } for peer, x, y, facing, clip, frame, hp, map_id, score, input_tick
+            in _PLAYER.iter_unpack(data[offset:end])]
+        offset = end
+
+        end = offset + n_enemies * _ENEMY.size
+        enemies = [{
+            "id": eid, "x": pos(x), "y": pos(y), "facing": facing_of(facing), "clip": clip_of(clip),
+            "frame": frame, "hp": hp_of(hp), "atlas_id": s(atlas), "map_id": s(map_id),
+        } for eid, x, y, facing, clip, frame, hp, atlas, map_id
+            in _ENEMY.iter_unpack(data[offset:end])]
+        offset = end
+
+        end = offset + n_pickups * _PICKUP.size
+        pickups = [{
+            "id": pid, "x": pos(x), "y": pos(y), "kind": s(kind), "atlas_id": s(atlas), "map_id": s(map_id),
+        } for pid, x, y, kind, atlas, map_id
+            in _PICKUP.iter_unpack(data[offset:end])]
+        offset = end
+
+        sound_events = self._unpack_sounds(data, offset, n_sounds, s)
+
+        msg = {
+            "type": MSG_SNAPSHOT,
+            "protocol": self.protocol,
+            "tick": tick,
+            "map_id": s(map_i),
+            "players": players,
+            "enemies": enemies,
+            "pickups": pickups,
+            "sound_events": sound_events,
+        }
+        if parts > 1:
+            msg["part"] = part
+            msg["parts"] = parts
+        return msg
+
+    @staticmethod
+    def _unpack_sounds(data: bytes, offset: int, count: int, s) -> List[Dict[str, Any]]:
+        end = offset + count * _SOUND.size
+        return [{
+            "event": s(event), "subtype": s(subtype), "global_event": bool(flags & 1),
+            "source_kind": SOURCE_KINDS[(flags >> 1) & 3] if (flags >> 1) & 3 < len(SOURCE_KINDS) else "global",
+            "host_id": None if host_id < 0 else host_id, "peer_id": s(peer),
+        } for event, subtype, flags, host_id, peer
+            in _SOUND.iter_unpack(data[offset:end])]
+
+    def _decode_delta(self, data: bytes) -> Dict[str, Any]:
+        (_magic, _tag, tick, base_tick, part, parts, map_i, n_players, n_enemies, n_pickups, n_sounds,
+         n_rm_players, n_rm_enemies, n_rm_pickups, n_extra) = _DELTA_HEADER.unpack_from(data, 0)
+        strings, offset = self._read_strings(data, _DELTA_HEADER.size, n_extra)
+
+        def s(i: int) -> Optional[str]:
+            return None if i == NO_STRING else strings[i]
+
+        removed_players = [s(i) for i in struct.unpack_from(f"<{n_rm_players}H", data, offset)]
+        offset += 2 * n_rm_players
+        removed_enemies = list(struct.unpack_from(f"<{n_rm_enemies}I", data, offset))
+        offset += 4 * n_rm_enemies
+        removed_pickups = list(struct.unpack_from(f"<{n_rm_pickups}I", data, offset))
+        offset += 4 * n_rm_pickups
+
+        msg: Dict[str, Any] = {
+            "type": MSG_SNAPSHOT_DELTA,
+            "protocol": self.protocol,
+            "tick": tick,
+            "base_tick": base_tick,
+            "map_id": s(map_i),
+        }
+        for (category, key, head, fields), count in zip(_DELTA_CATEGORIES, (n_players, n_enemies, n_pickups)):
+            key_is_string = head.format[1] == "H"
+            records = []
+            for _ in range(count):
+                k, mask = head.unpack_from(data, offset)
+                offset += head.size
+                layout, picked = _mask_layout(fields, mask & ~DELTA_NEW)
+                values = layout.unpack_from(data, offset)
+                offset += layout.size
+                rec: Dict[str, Any] = {key: s(k) if key_is_string else k}
+                for (name, kind), v in zip(picked, values):
+                    rec[name] = self._unpack_value(kind, v, s)
+                if mask & DELTA_NEW:
+                    rec["new"] = True
+                records.append(rec)
+            msg[category] = records
+
+        msg["removed"] = {
+            "players": removed_players,
+            "enemies": removed_enemies,
+            "pickups": removed_pickups,
+        }
+        msg["sound_events"] = self._unpack_sounds(data, offset, n_sounds, s)
+        if parts > 1:
+            msg["part"] = part
+            msg["parts"] = parts
+        return msg
+
+    def _decode_input(self, data: bytes) -> Dict[str, Any]:
+        (_magic, _tag, tick, ack, n_extra, peer_i, move_x, move_y, facing_i,
+         buttons, n_history) = _INPUT.unpack_from(data, 0)
+        strings, offset = self._read_strings(data, _INPUT.size, n_extra)
+
+        msg = {
+            "type": MSG_INPUT,
+            "protocol": self.protocol,
+            "peer_id": None if peer_i == NO_STRING else strings[peer_i],
+            "tick": tick,
+            "ack": ack,
+            "intent": self._unpack_intent(move_x, move_y, facing_i, buttons, strings),
+        }
+        if n_history:
+            history = []
+            for _ in range(n_history):
+                back, hx, hy, hf, hb = _INPUT_HISTORY.unpack_from(data, offset)
+                offset += _INPUT_HISTORY.size
+                history.append([tick - back, self._unpack_intent(hx, hy, hf, hb, strings)])
+            msg["history"] = history
+        return msg
+
+    @staticmethod
+    def _unpack_intent(move_x: float, move_y: float, facing_i: int, buttons: int,
+                       strings: List[str]) -> Dict[str, Any]:
+        intent: Dict[str, Any] = {
+            "move_x": move_x,
+            "move_y": move_y,
+            "facing": None if facing_i == NO_STRING else strings[facing_i],
+        }
+        for bit, name in enumerate(_BUTTONS):
+            intent[name] = bool(buttons & (1 << bit))
+        return intent
+
+
+# strings worth interning for a session: atlas ids + their clip names,
+# registered map ids, facings and sound events. order only has to be stable
+# within one host process, since the table travels in WELCOME
+def build_string_table() -> List[str]:
+    from game.core.resources import atlases
+    from game.world.maps.map_index import REGISTRY
+
+    table: List[str] = []
+    seen = set()
+
+    def add(s: str) -> None:
+        if s not in seen:
+            seen.add(s)
+            table.append(s)
+
+    for s in FACINGS:
+        add(s)
+    for s in ("enemy_aggro", "enemy_death", "enemy_hit", "map_transition", "player_dash",
+              "player_death", "player_hit", "player_swing", "big", "medium", "small", "tiny"):
+        add(s)
+    for map_id in sorted(REGISTRY):
+        add(map_id)
+    for atlas_id in sorted(atlases):
+        add(atlas_id)
+        for clip in sorted(atlases[atlas_id].get("clips", {})):
+            add(clip)
+    return table
+
+
+# pick the codec for a peer from its HELLO, at the newest version both sides
+# speak. peers older than the binary layout get JSON; either side can force
+# JSON for debugging. binary(version) hands out the host's binary codec
+def negotiate_codec(hello: Dict[str, Any], binary: Callable[[int], BinaryCodec], prefer: str = "binary"):
+    try:
+        version = int(hello.get("protocol", JSON_PROTOCOL_VERSION))
+    except (TypeError, ValueError):
+        version = JSON_PROTOCOL_VERSION
+    version = min(version, PROTOCOL_VERSION)
+    if version < BINARY_PROTOCOL_VERSION or prefer == "json" or hello.get("codec") == "json":
+        return JsonCodec(version)
+    return binary(version)
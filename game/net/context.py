@@ -5,6 +5,8 @@
 # This is where the NetServer / NetClient live so that when you swap scenes,
 # the sockets are not destroyed. Scenes just "attach" these into their World as
 # NetHostState / NetClientState components.
+# A dedicated server running several sessions (server/sessions.py) gives each
+# one its own NetworkContext and hands it to DungeonScene(context=...).
 
 from __future__ import annotations
 from dataclasses import dataclass, field
@@ -0,0 +1,178 @@
+# class: SnapshotHistory
+
+# delta snapshots
+#
+# clients ack the newest snapshot tick they have applied (in their input
+# messages). the host keeps a short ring of the snapshots it sent to each peer,
+# and encodes the next one against that peer's acked baseline:
+#   - created entities: every field, flagged "new"
+#   - changed entities: the key plus only the fields that differ
+#   - destroyed entities: just the key, under "removed"
+# anything the delta doesn't mention is unchanged. when a peer hasn't acked
+# anything yet, or its ack already fell out of the ring, it gets a full snapshot
+#
+# the client keeps the same ring of rebuilt snapshots, so a delta can be
+# expanded back into the regular snapshot dict apply_world_snapshot() reads
+#
+# snapshots are kept in "state" form: one dict per category keyed by the
+# entity key (peer_id for players, host entity id for the rest)
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from game.net.protocol import PROTOCOL_VERSION, MSG_SNAPSHOT, MSG_SNAPSHOT_DELTA
+
+# (category, key field)
+CATEGORIES: Tuple[Tuple[str, str], ...] = (
+    ("players", "peer_id"),
+    ("enemies", "id"),
+    ("pickups", "id"),
+)
+
+# ~1 second of snapshots at 60Hz
+HISTORY = 64
+
+State = Dict[str, Any]
+
+
+# full snapshot payload -> state
+def index_snapshot(snapshot: Dict[str, Any]) -> State:
+    state: State = {
+        "tick": int(snapshot.get("tick", 0)),
+        "map_id": snapshot.get("map_id"),
+    }
+    for category, key in CATEGORIES:
+        state[category] = {rec[key]: rec for rec in snapshot.get(category, [])}
+    return state
+
+
+# host: delta payload taking a client from `base` to `state`
+def diff_snapshot(base: State, state: State, sound_events: List[Dict[str, Any]]) -> Dict[str, Any]:
+    delta: Dict[str, Any] = {
+        "tick": state["tick"],
+        "base_tick": base["tick"],
+        "map_id": state["map_id"],
+    }
+    removed: Dict[str, List[Any]] = {}
+
+    for category, key in CATEGORIES:
+        old = base[category]
+        new = state[category]
+        changes: List[Dict[str, Any]] = []
+
+        for k, rec in new.items():
+            prev = old.get(k)
+            if prev is None:
+                changes.append({**rec, "new": True})
+            elif prev is not rec:
+                diff = {f: v for f, v in rec.items() if prev.get(f) != v}
+                if diff:
+                    diff[key] = k
+                    changes.append(diff)
+
+        delta[category] = changes
+        removed[category] = [k for k in old if k not in new]
+
+    delta["removed"] = removed
+    delta["sound_events"] = sound_events
+    return delta
+
+
+# client: rebuild the full snapshot a delta describes
+# returns (snapshot message, its state) or None if the delta doesn't fit `base`
+def expand_delta(base: State, delta: Dict[str, Any]) -> Optional[Tuple[Dict[str, Any], State]]:
+    if int(delta.get("base_tick", -1)) != base["tick"]:
+        return None
+
+    tick = int(delta.get("tick", 0))
+    state: State = {"tick": tick, "map_id": delta.get("map_id")}
+    removed = delta.get("removed") or {}
+
+    for category, key in CATEGORIES:
+        # records are never mutated, so unchanged ones are shared with the base
+        recs = dict(base[category])
+        for k in removed.get(category, ()):
+            recs.pop(k, None)
+
+        for change in delta.get(category, ()):
+            k = change.get(key)
+            if k is None:
+                continue
+            if change.get("new"):
+                rec = dict(change)
+                del rec["new"]
+                recs[k] = rec
+            else:
+                prev = recs.get(k)
+                if prev is None:
+                    # change for something we never saw: can't rebuild it
+                    continue
+                recs[k] = {**prev, **change}
+
+        state[category] = recs
+
+    snapshot: Dict[str, Any] = {
+        "type": MSG_SNAPSHOT,
+        "protocol": delta.get("protocol", PROTOCOL_VERSION),
+        "tick": tick,
+        "map_id": state["map_id"],
+        "players": list(state["players"].values()),
+        "enemies": list(state["enemies"].values()),
+        "pickups": list(state["pickups"].values()),
+        "sound_events": delta.get("sound_events", []),
+    }
+    return snapshot, state
+
+
+# wrap a delta payload as a message
+def delta_message(delta: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "type": MSG_SNAPSHOT_DELTA,
+        "protocol": PROTOCOL_VERSION,
+        **delta,
+    }
+
+
+# ring of recent snapshot states by tick
+# host: one per peer (what we sent it + what it acked)
+# client: one for the snapshots we rebuilt
+class SnapshotHistory:
+    def __init__(self, size: int = HISTORY) -> None:
+        self.size = size
+        self.acked_tick = 0
+        self._states: Dict[int, State] = {}
+        self._order: Deque[int] = deque()
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def push(self, state: State) -> None:
+        tick = state["tick"]
+        if tick not in self._states:
+            self._order.append(tick)
+        self._states[tick] = state
+        while len(self._order) > self.size:
+            self._states.pop(self._order.popleft(), None)
+
+    def get(self, tick: int) -> Optional[State]:
+        return self._states.get(tick)
+
+    # acks for ticks we no longer hold (or never sent) are ignored
+    def ack(self, tick: Any) -> None:
+        try:
+            tick = int(tick)
+        except (TypeError, ValueError):
+            return
+        if tick > self.acked_tick and tick in self._states:
+            self.acked_tick = tick
+
+    # state of the newest acked snapshot, if it's still in the ring
+    def baseline(self) -> Optional[State]:
+        return self._states.get(self.acked_tick)
+
+    def clear(self) -> None:
+        self.acked_tick = 0
+        self._states.clear()
+        self._order.clear()
@@ -8,16 +8,20 @@
 #   - Runs on a client in HubScene JOIN mode.
 #   - Periodically sends "discover" broadcast packets to DISCOVERY_PORT.
 #   - Collects "host_ad" responses into a hosts dict: (ip, port) -> name.
+#
+# both are served by the shared net loop (game/net/transport.py) instead of a
+# polling thread each
 
 
 from __future__ import annotations
 
+import asyncio
 import socket
 import json
-import threading
-import time
 from typing import Dict, Tuple
 
+from game.net.transport import net_loop
+
 DISCOVERY_PORT = 5001  # separate from game port (5000)
 DISCOVERY_MAGIC = "GATECRASHERS_DISCOVERY_V1"
 
@@ -26,7 +30,7 @@ DISCOVERY_MAGIC = "GATECRASHERS_DISCOVERY_V1"
 # HostDiscovery (runs on HOST machine)
 # ---------------------------------------------------------------------------
 
-class HostDiscovery:
+class HostDiscovery(asyncio.DatagramProtocol):
     """
     Runs on the host machine. Listens for UDP "discover" packets on
     DISCOVERY_PORT and replies with a JSON "host_ad" message containing
@@ -43,48 +47,41 @@ class HostDiscovery:
         self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         # Bind to all interfaces on the discovery port
         self._sock.bind(("", DISCOVERY_PORT))
-        self._sock.settimeout(0.5)
 
-        self._thread = threading.Thread(target=self._thread_main, daemon=True)
-        self._thread.start()
+        # datagram_received() runs on the net loop thread
+        self._transport = net_loop().open(self._sock, self)
 
-    def _thread_main(self) -> None:
-        while self.running:
-            try:
-                data, addr = self._sock.recvfrom(4096)
-            except socket.timeout:
-                continue
-            except OSError:
-                # Socket closed
-                break
-
-            # Expect a JSON "discover" packet
-            try:
-                msg = json.loads(data.decode("utf-8"))
-            except Exception:
-                continue
-
-            if msg.get("type") != "discover":
-                continue
-            if msg.get("magic") != DISCOVERY_MAGIC:
-                continue
-
-            # Determine the host's LAN IP (not the client's IP)
-            host_ip = self._get_lan_ip()
-
-            response = {
-                "type": "host_ad",
-                "magic": DISCOVERY_MAGIC,
-                "ip": host_ip,
-                "port": self.game_port,
-                "name": self.name,
-            }
-
-            try:
-                self._sock.sendto(json.dumps(response).encode("utf-8"), addr)
-            except OSError:
-                # Best effort; ignore errors on send
-                pass
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]) -> None:
+        if not self.running:
+            return
+
+        # Expect a JSON "discover" packet
+        try:
+            msg = json.loads(data.decode("utf-8"))
+        except Exception:
+            return
+
+        if not isinstance(msg, dict) or msg.get("type") != "discover":
+            return
+        if msg.get("magic") != DISCOVERY_MAGIC:
+            return
+
+        # Determine the host's LAN IP (not the client's IP)
+        host_ip = self._get_lan_ip()
+
+        response = {
+            "type": "host_ad",
+            "magic": DISCOVERY_MAGIC,
+            "ip": host_ip,
+            "port": self.game_port,
+            "name": self.name,
+        }
+
+        # Best effort; send errors end up in error_received
+        self._transport.sendto(json.dumps(response).encode("utf-8"), addr)
+
+    def error_received(self, exc: Exception) -> None:
+        return
 
     def _get_lan_ip(self) -> str:
         """
@@ -106,25 +103,23 @@ class HostDiscovery:
     def update(self, dt: float) -> None:
         """
         No-op for compatibility with existing HubScene code that calls
-        host_discovery.update(dt). All work is done in the thread.
+        host_discovery.update(dt). All work is done on the net loop.
         """
         return
 
     def close(self) -> None:
         self.running = False
-        if self._sock is not None:
-            try:
-                self._sock.close()
-            except OSError:
-                pass
-            self._sock = None
+        if self._transport is not None:
+            net_loop().close(self._transport)
+            self._transport = None
+        self._sock = None
 
 
 # ---------------------------------------------------------------------------
 # ClientDiscovery (runs on JOIN clients)
 # ---------------------------------------------------------------------------
 
-class ClientDiscovery:
+class ClientDiscovery(asyncio.DatagramProtocol):
     """
     Runs on JOIN clients. Periodically broadcasts a "discover" packet
     and collects "host_ad" responses in self.hosts.
@@ -137,85 +132,67 @@ class ClientDiscovery:
         self.interval = float(interval)
         self.running = True
 
-        # (ip, port) -> name
+        # (ip, port) -> name. replaced, never changed in place: the game
+        # thread can iterate it while the net loop adds a host
         self.hosts: Dict[Tuple[str, int], str] = {}
 
         # UDP broadcast socket
         self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-        self._sock.settimeout(0.3)
+        self._sock.bind(("", 0))
 
-        self._thread = threading.Thread(target=self._thread_main, daemon=True)
-        self._thread.start()
+        loop = net_loop()
+        self._transport = loop.open(self._sock, self)
+        self._broadcasts = asyncio.run_coroutine_threadsafe(self._broadcast_main(), loop.loop)
 
-    def _thread_main(self) -> None:
+    async def _broadcast_main(self) -> None:
         """
-        Loop:
-          - Broadcast "discover" packet.
-          - For a short window, collect any "host_ad" replies.
-          - Sleep until next interval.
+        Loop: broadcast a "discover" packet every interval. Replies come
+        in through datagram_received whenever they arrive.
         """
+        discover_msg = json.dumps({
+            "type": "discover",
+            "magic": DISCOVERY_MAGIC,
+        }).encode("utf-8")
         while self.running:
-            # 1) Broadcast discover packet
-            discover_msg = {
-                "type": "discover",
-                "magic": DISCOVERY_MAGIC,
-            }
-            try:
-                self._sock.sendto(
-                    json.dumps(discover_msg).encode("utf-8"),
-                    ("255.255.255.255", DISCOVERY_PORT),
-                )
-            except OSError:
-                # Ignore send errors; we will retry next interval
-                pass
-
-            # 2) Collect responses for a short window
-            end_time = time.time() + 0.3
-            while self.running and time.time() < end_time:
-                try:
-                    data, addr = self._sock.recvfrom(4096)
-                except socket.timeout:
-                    break
-                except OSError:
-                    # Socket closed
-                    return
-
-                try:
-                    msg = json.loads(data.decode("utf-8"))
-                except Exception:
-                    continue
-
-                if msg.get("type") != "host_ad":
-                    continue
-                if msg.get("magic") != DISCOVERY_MAGIC:
-                    continue
-
-                ip = msg.get("ip") or addr[0]
-                try:
-                    port = int(msg.get("port", 5000))
-                except (TypeError, ValueError):
-                    port = 5000
-                name = msg.get("name", "Host")
-
-                self.hosts[(ip, port)] = name
-
-            # 3) Sleep until next broadcast
-            sleep_time = max(0.1, self.interval - 0.3)
-            time.sleep(sleep_time)
+            # Send errors end up in error_received; we will retry next interval
+            self._transport.sendto(discover_msg, ("255.255.255.255", DISCOVERY_PORT))
+            await asyncio.sleep(self.interval)
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]) -> None:
+        try:
+            msg = json.loads(data.decode("utf-8"))
+        except Exception:
+            return
+
+        if not isinstance(msg, dict) or msg.get("type") != "host_ad":
+            return
+        if msg.get("magic") != DISCOVERY_MAGIC:
+            return
+
+        ip = msg.get("ip") or addr[0]
+        try:
+            port = int(msg.get("port", 5000))
+        except (TypeError, ValueError):
+            port = 5000
+        name = msg.get("name", "Host")
+
+        self.hosts = {**self.hosts, (ip, port): name}
+
+    def error_received(self, exc: Exception) -> None:
+        return
 
     def update(self, dt: float) -> None:
         """
         No-op for compatibility with existing HubScene code that calls
-        client_discovery.update(dt). All work is done in the thread.
+        client_discovery.update(dt). All work is done on the net loop.
         """
         return
 
     def close(self) -> None:
         self.running = False
-        if self._sock is not None:
-            try:
-                self._sock.close()
-            except OSError:
-                pass
-            self._sock = None
+        self._broadcasts.cancel()
+        if self._transport is not None:
+            net_loop().close(self._transport)
+            self._transport = None
+        self._sock = None
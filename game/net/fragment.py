@@ -0,0 +1,167 @@
+# class: Reassembler
+
+# MTU-safe snapshots
+#
+# a snapshot (full or delta) that encodes bigger than Config.NET_MTU goes out
+# as several datagrams instead of one IP-fragmented one, where losing any
+# fragment loses everything. each chunk is a complete message of the same type
+# and tick with "part" / "parts" added:
+#   - part 0: players, sound events, removals + the first enemies/pickups
+#   - part 1..n-1: further ranges of enemies/pickups
+# so every chunk decodes on its own and a lost one only loses its entities
+#
+# the client reassembles by tick. when a newer tick shows up before an older
+# one is complete, the older one is given up and passed on flagged "partial"
+# with what did arrive: entities in the lost chunks keep their previous state.
+# a partial snapshot is applied but never acked or kept as a delta baseline,
+# since the host's copy of that tick has everything
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from game.net.protocol import PROTOCOL_VERSION, MSG_SNAPSHOT, MSG_SNAPSHOT_DELTA
+from game.net.delta import CATEGORIES, index_snapshot
+
+# entity ranges are cut from these; everything else rides in part 0
+RECORD_CATEGORIES = ("enemies", "pickups")
+HEAD_FIELDS = ("players", "sound_events", "removed")
+# part/parts are a byte each in the binary header
+MAX_PARTS = 255
+
+CHUNKED_TYPES = (MSG_SNAPSHOT, MSG_SNAPSHOT_DELTA)
+
+
+# host: datagrams for one message, each at most `mtu` bytes when possible
+# encode is the peer codec's encode(); messages that can't be cut small enough
+# (one oversized record, more than MAX_PARTS chunks) go out whole
+def fragment(message: Dict[str, Any], encode: Callable[[Dict[str, Any]], bytes], mtu: int) -> List[bytes]:
+    data = encode(message)
+    if len(data) <= mtu or message.get("type") not in CHUNKED_TYPES:
+        return [data]
+
+    records = [(category, rec) for category in RECORD_CATEGORIES for rec in message.get(category, ())]
+    if not records:
+        return [data]
+
+    head = {k: v for k, v in message.items() if k not in RECORD_CATEGORIES}
+    tail = {k: v for k, v in head.items() if k not in HEAD_FIELDS}
+    head_size = len(encode({**head, "part": 0, "parts": MAX_PARTS}))
+    tail_size = len(encode({**tail, "part": MAX_PARTS, "parts": MAX_PARTS}))
+    per_record = max(1.0, (len(data) - head_size) / len(records))
+
+    scale = 1.0
+    while True:
+        first = max(0, int((mtu - head_size) / per_record * scale))
+        each = max(1, int((mtu - tail_size) / per_record * scale))
+        bounds = [0, min(first, len(records))]
+        while bounds[-1] < len(records):
+            bounds.append(min(bounds[-1] + each, len(records)))
+        parts = len(bounds) - 1
+        if parts > MAX_PARTS:
+            return [data]
+
+        chunks = [
+            encode(_chunk(head if i == 0 else tail, records[bounds[i]:bounds[i + 1]], i, parts))
+            for i in range(parts)
+        ]
+        if each == 1 or all(len(c) <= mtu for c in chunks):
+            return chunks
+        scale *= 0.8
+
+
+def _chunk(base: Dict[str, Any], records: List[Tuple[str, Dict[str, Any]]],
+           part: int, parts: int) -> Dict[str, Any]:
+    chunk = dict(base)
+    for category in RECORD_CATEGORIES:
+        chunk[category] = []
+    for category, rec in records:
+        chunk[category].append(rec)
+    chunk["part"] = part
+    chunk["parts"] = parts
+    return chunk
+
+
+# client: full snapshot with some chunks missing -> (snapshot, state), where
+# whatever the received chunks don't mention keeps its record from `base`
+def overlay_snapshot(base: Optional[Dict[str, Any]], snapshot: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    state = index_snapshot(snapshot)
+    if base is not None:
+        for category, _key in CATEGORIES:
+            state[category] = {**base[category], **state[category]}
+
+    merged: Dict[str, Any] = {
+        "type": MSG_SNAPSHOT,
+        "protocol": snapshot.get("protocol", PROTOCOL_VERSION),
+        "tick": state["tick"],
+        "map_id": state["map_id"],
+        "players": list(state["players"].values()),
+        "enemies": list(state["enemies"].values()),
+        "pickups": list(state["pickups"].values()),
+        "sound_events": snapshot.get("sound_events", []),
+        "partial": True,
+    }
+    return merged, state
+
+
+# client side of fragment(): collects chunks by tick, hands back whole messages
+class Reassembler:
+    def __init__(self) -> None:
+        # tick -> {part: chunk}
+        self._pending: Dict[int, Dict[int, Dict[str, Any]]] = {}
+        self._done_tick = 0     # newest tick handed out (older chunks are late)
+
+    # returns the messages ready after this one, oldest first
+    def push(self, msg: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if msg.get("type") not in CHUNKED_TYPES:
+            return [msg]
+        try:
+            tick = int(msg.get("tick", 0))
+        except (TypeError, ValueError):
+            return []
+
+        ready: List[Dict[str, Any]] = []
+        # a newer tick means the older ones lost their missing chunks
+        if self._pending:
+            for old in sorted(t for t in self._pending if t < tick):
+                ready.append(self._merge(self._pending.pop(old)))
+
+        parts = msg.get("parts", 1)
+        part = msg.get("part", 0)
+        if not isinstance(parts, int) or parts <= 1:
+            ready.append(msg)
+        elif tick > self._done_tick and isinstance(part, int) and 0 <= part < parts:
+            chunks = self._pending.setdefault(tick, {})
+            chunks[part] = msg
+            if len(chunks) == parts:
+                ready.append(self._merge(self._pending.pop(tick)))
+
+        if ready:
+            self._done_tick = max(self._done_tick, int(ready[-1].get("tick", 0)))
+        return ready
+
+    def clear(self) -> None:
+        self._pending.clear()
+        self._done_tick = 0
+
+    # one message from the chunks we have. without part 0 there are no
+    # players/sounds/removals: those keys are left out, not sent empty
+    @staticmethod
+    def _merge(chunks: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
+        first = chunks[min(chunks)]
+        parts = first["parts"]
+        msg = {k: v for k, v in first.items() if k not in RECORD_CATEGORIES and k not in HEAD_FIELDS}
+        del msg["part"]
+        del msg["parts"]
+
+        head = chunks.get(0)
+        if head is not None:
+            for k in HEAD_FIELDS:
+                if k in head:
+                    msg[k] = head[k]
+        for category in RECORD_CATEGORIES:
+            msg[category] = [rec for i in sorted(chunks) for rec in chunks[i].get(category, ())]
+
+        if len(chunks) < parts:
+            msg["partial"] = True
+        return msg
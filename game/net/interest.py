@@ -0,0 +1,139 @@
+# class: InterestFilter
+
+# per-peer snapshot filtering (interest management)
+#
+# build_world_snapshot() collects every player, enemy and pickup on every map,
+# but a client only renders the map its camera is on. each peer gets:
+#   - enemies/pickups on the same map as its player, and only those within
+#     Config.NET_INTEREST_RADIUS of it when a radius is set (0 = whole map)
+#   - players on that map, every snapshot
+#   - players on other maps as a party summary: their last record, refreshed
+#     every Config.NET_PARTY_SUMMARY_INTERVAL ticks or when they change map
+#     (enough for HUD hearts/scores and spectating)
+#   - sound events whose source made it through, plus global ones
+# a peer without a player (dead) is filtered around the player its camera
+# spectates: the first one in the snapshot, like CameraFollowSystem picks
+#
+# with no radius, what a peer gets depends only on its map, so peers on the
+# same map share one filtered payload (and one delta diff/encode)
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from game.core.config import Config
+
+
+class InterestFilter:
+    def __init__(self, radius: Optional[float] = None, summary_interval: Optional[int] = None) -> None:
+        self.radius = Config.NET_INTEREST_RADIUS if radius is None else radius
+        self.summary_interval = max(1, int(
+            Config.NET_PARTY_SUMMARY_INTERVAL if summary_interval is None else summary_interval
+        ))
+
+        # peer_id -> player record other maps currently see
+        self._party: Dict[str, Dict[str, Any]] = {}
+        self._refreshed_tick = 0
+
+        # rebuilt by begin() every snapshot
+        self._payload: Dict[str, Any] = {}
+        self._players: Dict[str, Dict[str, Any]] = {}
+        self._enemies: Dict[Optional[str], List[Dict[str, Any]]] = {}
+        self._pickups: Dict[Optional[str], List[Dict[str, Any]]] = {}
+        self._views: Dict[Any, Dict[str, Any]] = {}
+
+    # index this tick's full snapshot payload
+    def begin(self, payload: Dict[str, Any]) -> None:
+        self._payload = payload
+        self._views.clear()
+
+        players = self._players
+        players.clear()
+        for p in payload["players"]:
+            if p["peer_id"] is not None:
+                players[p["peer_id"]] = p
+
+        enemies: Dict[Optional[str], List[Dict[str, Any]]] = {}
+        for e in payload["enemies"]:
+            enemies.setdefault(e["map_id"], []).append(e)
+        self._enemies = enemies
+
+        pickups: Dict[Optional[str], List[Dict[str, Any]]] = {}
+        for p in payload["pickups"]:
+            pickups.setdefault(p["map_id"], []).append(p)
+        self._pickups = pickups
+
+        # party summaries: keep the old record (same object -> nothing in the
+        # delta) until the refresh interval is up or the player changes map
+        tick = payload["tick"]
+        refresh = tick - self._refreshed_tick >= self.summary_interval
+        if refresh:
+            self._refreshed_tick = tick
+        party = self._party
+        for peer_id, p in players.items():
+            cached = party.get(peer_id)
+            if refresh or cached is None or cached["map_id"] != p["map_id"]:
+                party[peer_id] = p
+        for peer_id in [k for k in party if k not in players]:
+            del party[peer_id]
+
+    # (cache key, payload) for one peer. peers with the same key get the same payload
+    def view_for(self, peer_id: str) -> Tuple[Any, Dict[str, Any]]:
+        me = self._players.get(peer_id)
+        if me is None and self._players:
+            me = next(iter(self._players.values()))
+
+        map_id = me["map_id"] if me is not None else self._payload.get("map_id")
+        if self.radius > 0 and me is not None:
+            key: Any = (map_id, me["peer_id"])
+        else:
+            key = map_id
+
+        view = self._views.get(key)
+        if view is None:
+            view = self._build(map_id, me)
+            self._views[key] = view
+        return key, view
+
+    # internals ################################################################
+
+    def _build(self, map_id: Optional[str], me: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        payload = self._payload
+        enemies = self._enemies.get(map_id, [])
+        pickups = self._pickups.get(map_id, [])
+
+        if self.radius > 0 and me is not None:
+            cx, cy = me["x"], me["y"]
+            r2 = self.radius * self.radius
+            enemies = [e for e in enemies if (e["x"] - cx) ** 2 + (e["y"] - cy) ** 2 <= r2]
+            pickups = [p for p in pickups if (p["x"] - cx) ** 2 + (p["y"] - cy) ** 2 <= r2]
+
+        party = self._party
+        players: List[Dict[str, Any]] = []
+        here = set()
+        for p in payload["players"]:
+            peer_id = p["peer_id"]
+            if p["map_id"] == map_id:
+                players.append(p)
+                here.add(peer_id)
+            elif peer_id is not None:
+                players.append(party[peer_id])
+
+        enemy_ids = {e["id"] for e in enemies}
+        sound_events = []
+        for ev in payload["sound_events"]:
+            kind = ev.get("source_kind")
+            if kind == "enemy" and ev.get("host_id") not in enemy_ids:
+                continue
+            if kind == "player" and ev.get("peer_id") not in here:
+                continue
+            sound_events.append(ev)
+
+        return {
+            "tick": payload["tick"],
+            "map_id": payload["map_id"],
+            "players": players,
+            "enemies": enemies,
+            "pickups": pickups,
+            "sound_events": sound_events,
+        }
@@ -0,0 +1,194 @@
+# class: SnapshotBuffer
+
+# client-side jitter buffer + snapshot interpolation
+#
+# snapshots don't get applied the moment they arrive. they're buffered and the
+# client renders the world `delay` seconds in the past (about 100ms):
+#   - every snapshot at or before the render time is applied in order
+#     (state, clips, spawns/despawns, sounds)
+#   - remote players and enemies are placed by linear interpolation between
+#     the last applied snapshot and the next buffered one
+#   - if the next one hasn't arrived, positions are extrapolated from the last
+#     two snapshots for at most Config.NET_EXTRAPOLATE_MAX seconds, then held
+#   - the local player keeps following the newest snapshot, so the buffer
+#     doesn't add to input latency
+#
+# host ticks advance at TICK_RATE, so tick * tick_dt is host time. each arrival
+# updates the estimated offset between our clock and host time and the jitter
+# around it. the delay then tracks max(NET_INTERP_DELAY, 2 snapshot intervals)
+# plus a multiple of the jitter, so slower or noisier snapshot streams get a
+# deeper buffer
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from game.core.config import Config
+from game.net.protocol import TICK_RATE
+from game.world.components import PlayerTag, Owner, Transform, RemoteEntity, LocalControlled
+
+# clock offset / jitter / snapshot interval smoothing (per snapshot)
+OFFSET_GAIN = 0.05
+JITTER_GAIN = 0.1
+INTERVAL_GAIN = 0.1
+# how fast the delay slews toward its target (per second)
+DELAY_SLEW = 2.0
+# delay = max(base, 2 intervals) + JITTER_SCALE * jitter
+JITTER_SCALE = 3.0
+
+# (tick, snapshot message, state)
+Entry = Tuple[int, Dict[str, Any], Dict[str, Any]]
+
+
+class SnapshotBuffer:
+    def __init__(self, tick_dt: float = 1.0 / TICK_RATE) -> None:
+        self.tick_dt = tick_dt
+        self.delay = Config.NET_INTERP_DELAY
+        self.offset: Optional[float] = None     # our clock - host time
+        self.jitter = 0.0                       # mean deviation of arrivals (s)
+        self.interval = tick_dt                 # mean time between received snapshots (s)
+
+        self.pending: Deque[Entry] = deque()    # received, not applied yet (tick order)
+        self.current: Optional[Entry] = None    # last applied
+        self.previous: Optional[Entry] = None   # applied before current (for extrapolation)
+        self._last_tick = 0                     # newest tick pushed
+        self._arrivals = 0
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    # newest state we know about (the local player follows this one)
+    def latest_state(self) -> Optional[Dict[str, Any]]:
+        if self.pending:
+            return self.pending[-1][2]
+        return self.current[2] if self.current is not None else None
+
+    # arrivals #################################################################
+
+    def push(self, snapshot: Dict[str, Any], state: Dict[str, Any], now: float) -> None:
+        tick = state["tick"]
+        if tick <= self._last_tick:
+            return
+
+        sample = now - tick * self.tick_dt
+        if self.offset is None:
+            self.offset = sample
+        else:
+            dev = sample - self.offset
+            self.jitter += (abs(dev) - self.jitter) * JITTER_GAIN
+            # a late snapshot is mostly jitter; an early one means the
+            # estimate is behind, so follow those faster
+            self.offset += dev * (2.0 * OFFSET_GAIN if dev < 0 else OFFSET_GAIN)
+            gap = (tick - self._last_tick) * self.tick_dt
+            if self._arrivals == 1:
+                self.interval = gap     # first gap: no history to smooth against
+            else:
+                self.interval += (gap - self.interval) * INTERVAL_GAIN
+
+        self._last_tick = tick
+        self._arrivals += 1
+        self.pending.append((tick, snapshot, state))
+
+    # playout ##################################################################
+
+    def target_delay(self) -> float:
+        base = max(Config.NET_INTERP_DELAY, 2.0 * self.interval)
+        return min(base + JITTER_SCALE * self.jitter, Config.NET_INTERP_DELAY_MAX)
+
+    # host time to render at
+    def render_time(self, now: float, dt: float) -> float:
+        self.delay += (self.target_delay() - self.delay) * min(1.0, DELAY_SLEW * dt)
+        if self.offset is None:
+            return 0.0
+        return now - self.offset - self.delay
+
+    # snapshots due at render_time, oldest first. they become current
+    def pop_ready(self, render_time: float) -> List[Dict[str, Any]]:
+        ready: List[Dict[str, Any]] = []
+        pending = self.pending
+        while pending and pending[0][0] * self.tick_dt <= render_time:
+            entry = pending.popleft()
+            self.previous = self.current
+            self.current = entry
+            ready.append(entry[1])
+        return ready
+
+    # where a record should be drawn at render_time, or None to leave it alone
+    def position(self, category: str, key: Any, render_time: float) -> Optional[Tuple[float, float]]:
+        if self.current is None:
+            return None
+        tick_a, _snap, state_a = self.current
+        a = state_a[category].get(key)
+        if a is None:
+            return None
+        t_a = tick_a * self.tick_dt
+
+        if self.pending:
+            tick_b, _snap, state_b = self.pending[0]
+            b = state_b[category].get(key)
+            if b is None or b.get("map_id") != a.get("map_id"):
+                return a["x"], a["y"]
+            alpha = (render_time - t_a) / ((tick_b - tick_a) * self.tick_dt)
+            alpha = 0.0 if alpha < 0.0 else 1.0 if alpha > 1.0 else alpha
+            return a["x"] + (b["x"] - a["x"]) * alpha, a["y"] + (b["y"] - a["y"]) * alpha
+
+        # starved: extrapolate along the last known motion, briefly
+        if self.previous is None:
+            return a["x"], a["y"]
+        tick_p, _snap, state_p = self.previous
+        p = state_p[category].get(key)
+        if p is None or p.get("map_id") != a.get("map_id"):
+            return a["x"], a["y"]
+        ahead = min(render_time - t_a, Config.NET_EXTRAPOLATE_MAX)
+        if ahead <= 0.0:
+            return a["x"], a["y"]
+        span = (tick_a - tick_p) * self.tick_dt
+        k = ahead / span
+        return a["x"] + (a["x"] - p["x"]) * k, a["y"] + (a["y"] - p["y"]) * k
+
+    def clear(self) -> None:
+        self.pending.clear()
+        self.current = None
+        self.previous = None
+        self.offset = None
+        self.jitter = 0.0
+        self.interval = self.tick_dt
+        self.delay = Config.NET_INTERP_DELAY
+        self._last_tick = 0
+        self._arrivals = 0
+
+
+# place remote players/enemies at render_time; the local player's target
+# follows the newest snapshot (NetSmoothingSystem eases it there)
+def interpolate_world(world, buffer: SnapshotBuffer, render_time: float, my_peer_id: str) -> None:
+    if buffer.current is None:
+        return
+
+    position = buffer.position
+    for _eid, comps in world.view(PlayerTag, Owner, Transform):
+        peer_id = comps[Owner].peer_id
+        tr: Transform = comps[Transform]
+        if peer_id == my_peer_id or LocalControlled in comps:
+            latest = buffer.latest_state()
+            rec = latest["players"].get(peer_id) if latest is not None else None
+            cur = buffer.current[2]["players"].get(peer_id)
+            # across a map change, wait for the applied snapshot to catch up
+            if rec is not None and cur is not None and rec.get("map_id") == cur.get("map_id"):
+                tr.net_x = rec["x"]
+                tr.net_y = rec["y"]
+            continue
+        pos = position("players", peer_id, render_time)
+        if pos is not None:
+            tr.x, tr.y = pos
+            tr.net_x, tr.net_y = pos
+
+    for _eid, comps in world.view(RemoteEntity, Transform):
+        rem: RemoteEntity = comps[RemoteEntity]
+        if rem.category != "enemy":
+            continue
+        pos = position("enemies", rem.remote_id, render_time)
+        if pos is not None:
+            tr = comps[Transform]
+            tr.x, tr.y = pos
+            tr.net_x, tr.net_y = pos
@@ -0,0 +1,228 @@
+# class: PeerLink
+
+# per-peer link quality + adaptive snapshot rate (host side)
+#
+# the host pings every peer each Config.NET_PING_INTERVAL seconds with the
+# existing PING/PONG messages (clients already echo "time" back). a ping
+# resolves either as a pong (an rtt sample) or, after Config.NET_PING_TIMEOUT,
+# as a loss. from those samples:
+#   - srtt: smoothed round trip time, min_rtt: lowest of the recent samples
+#   - loss: smoothed fraction of pings lost
+#
+# every resolved ping nudges the peer's snapshot rate (AIMD, like TCP):
+#   - congested (loss above NET_LOSS_THRESHOLD, or the latest rtt well above
+#     the recent minimum, i.e. a queue is building somewhere): rate *= RATE_BACKOFF
+#   - otherwise: rate += RATE_STEP
+# a new peer starts at the minimum rate and grows by SLOW_START per clean
+# ping until the first sign of congestion, so a join doesn't open with a
+# burst the link can't take
+# clamped to [NET_SEND_RATE_MIN, NET_SEND_RATE_MAX] and to what fits in
+# NET_PEER_BUDGET bytes/s at the peer's average snapshot size
+#
+# if even the minimum rate doesn't fit the budget, snapshots get smaller
+# instead: only `record_limit` enemies/pickups are updated per snapshot,
+# picked by prioritize_view()
+
+from __future__ import annotations
+
+import math
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from game.core.config import Config
+
+# rtt smoothing, loss smoothing, per-sample size smoothing
+RTT_GAIN = 0.125
+LOSS_GAIN = 0.1
+SIZE_GAIN = 0.1
+# rtt samples kept for min_rtt
+RTT_WINDOW = 16
+# congested when the latest rtt > min_rtt + max(QUEUE_DELAY_MIN, min_rtt)
+# (the raw sample, not srtt: a smoothed rtt notices a queue too late)
+QUEUE_DELAY_MIN = 0.05
+# AIMD steps (per resolved ping)
+RATE_STEP = 1.0
+RATE_BACKOFF = 0.6
+SLOW_START = 1.5
+# record_limit bounds; above RECORD_LIMIT_MAX the limit is dropped
+RECORD_LIMIT_MIN = 8
+RECORD_LIMIT_MAX = 512
+# priority falls off with distance from the peer's player (px)
+PRIORITY_DISTANCE = 160.0
+
+
+class PeerLink:
+    def __init__(self, rate_min: Optional[float] = None, rate_max: Optional[float] = None,
+                 budget: Optional[float] = None) -> None:
+        self.rate_min = float(Config.NET_SEND_RATE_MIN if rate_min is None else rate_min)
+        self.rate_max = float(Config.NET_SEND_RATE_MAX if rate_max is None else rate_max)
+        self.budget = float(Config.NET_PEER_BUDGET if budget is None else budget)
+        self.rate = self.rate_min               # snapshots per second
+        self.slow_start = True
+        self.credit = 0.0                       # seconds banked toward the next snapshot
+
+        self.srtt: Optional[float] = None
+        self.rtt: Optional[float] = None        # latest sample
+        self.min_rtt: Optional[float] = None
+        self.loss = 0.0
+        self._rtts: Deque[float] = deque(maxlen=RTT_WINDOW)
+        self._pings: Dict[float, float] = {}    # echoed time -> sent at (outstanding)
+        self._last_ping = -math.inf
+
+        self.bytes_avg = 0.0                    # bytes per snapshot sent
+        self.records_avg = 0.0                  # enemy/pickup records per snapshot sent
+        self.record_limit: Optional[int] = None
+        self.priorities: Dict[Tuple[str, Any], float] = {}
+        self.last_sent: Optional[Dict[str, Any]] = None  # state of the last snapshot sent
+
+    # snapshots ################################################################
+
+    # called once per host snapshot tick (step = seconds since the last one)
+    # True when this peer gets a snapshot this tick
+    def due(self, step: float) -> bool:
+        self.credit += step
+        interval = 1.0 / self.rate
+        if self.credit + 1e-9 < interval:
+            return False
+        # no catching up after a slow stretch: at most one snapshot banked
+        self.credit = min(self.credit - interval, interval)
+        return True
+
+    def sent(self, nbytes: int, records: int) -> None:
+        if self.bytes_avg <= 0.0:
+            self.bytes_avg = float(nbytes)
+            self.records_avg = float(records)
+        else:
+            self.bytes_avg += (nbytes - self.bytes_avg) * SIZE_GAIN
+            self.records_avg += (records - self.records_avg) * SIZE_GAIN
+
+    # pings ####################################################################
+
+    # time for a new ping? returns the time value to send, or None
+    def ping(self, now: float) -> Optional[float]:
+        if now - self._last_ping < Config.NET_PING_INTERVAL:
+            return None
+        self._last_ping = now
+        self._pings[now] = now
+        return now
+
+    def pong(self, echoed: Any, now: float) -> None:
+        try:
+            sent_at = self._pings.pop(float(echoed))
+        except (KeyError, TypeError, ValueError):
+            return  # late (already counted lost), duplicate, or not ours
+        sample = now - sent_at
+        self.rtt = sample
+        self._rtts.append(sample)
+        self.min_rtt = min(self._rtts)
+        self.srtt = sample if self.srtt is None else self.srtt + (sample - self.srtt) * RTT_GAIN
+        self.loss += (0.0 - self.loss) * LOSS_GAIN
+        self._adapt()
+
+    # pings that ran out of time count as lost
+    def expire(self, now: float) -> None:
+        timeout = Config.NET_PING_TIMEOUT
+        lost = [t for t, sent_at in self._pings.items() if now - sent_at > timeout]
+        for t in lost:
+            del self._pings[t]
+            self.loss += (1.0 - self.loss) * LOSS_GAIN
+            self._adapt()
+
+    # internals ################################################################
+
+    def congested(self) -> bool:
+        if self.loss > Config.NET_LOSS_THRESHOLD:
+            return True
+        if self.rtt is None or self.min_rtt is None:
+            return False
+        return self.rtt > self.min_rtt + max(QUEUE_DELAY_MIN, self.min_rtt)
+
+    def _adapt(self) -> None:
+        if self.congested():
+            rate = self.rate * RATE_BACKOFF
+            self.slow_start = False
+        elif self.slow_start:
+            rate = self.rate * SLOW_START
+        else:
+            rate = self.rate + RATE_STEP
+        self.rate = min(self.rate_max, max(self.rate_min, rate))
+        self._fit_budget()
+
+    def _fit_budget(self) -> None:
+        if self.budget <= 0.0 or self.bytes_avg <= 0.0:
+            self.record_limit = None
+            return
+
+        cap = self.budget / self.bytes_avg
+        if cap >= self.rate_min:
+            self.rate = min(self.rate, cap)
+            # back under budget: let more records through again
+            if self.record_limit is not None:
+                limit = int(self.record_limit * 1.25) + 1
+                self.record_limit = None if limit > RECORD_LIMIT_MAX else limit
+            return
+
+        # even the slowest rate is too much: shrink the snapshots
+        self.rate = self.rate_min
+        per_record = self.bytes_avg / max(1.0, self.records_avg)
+        limit = int(self.budget / self.rate / per_record)
+        self.record_limit = max(RECORD_LIMIT_MIN, min(limit, RECORD_LIMIT_MAX))
+
+
+# the `limit` most important enemy/pickup updates in a view; the rest keep the
+# record this peer last got (so deltas leave them alone) or, if it never got
+# one, wait for a later snapshot. players always go out
+#
+# priority accumulates every snapshot an entity's record differs from what the
+# peer has, weighted by closeness to the peer's player, and resets when sent:
+# near, changing things go first, far ones still get their turn
+def prioritize_view(view: Dict[str, Any], last_sent: Optional[Dict[str, Any]],
+                    priorities: Dict[Tuple[str, Any], float], limit: int,
+                    peer_id: str) -> Dict[str, Any]:
+    me = next((p for p in view["players"] if p["peer_id"] == peer_id), None)
+    if me is None and view["players"]:
+        me = view["players"][0]
+
+    changed: List[Tuple[float, str, Any]] = []
+    kept: Dict[Tuple[str, Any], float] = {}
+    for category in ("enemies", "pickups"):
+        had = last_sent[category] if last_sent is not None else {}
+        for rec in view[category]:
+            k = rec["id"]
+            prev = had.get(k)
+            if prev is not None and (prev is rec or prev == rec):
+                continue
+            if me is not None:
+                dist = math.hypot(rec["x"] - me["x"], rec["y"] - me["y"])
+            else:
+                dist = 0.0
+            p = priorities.get((category, k), 0.0) + 1.0 / (1.0 + dist / PRIORITY_DISTANCE)
+            kept[(category, k)] = p
+            changed.append((p, category, k))
+
+    if len(changed) <= limit:
+        priorities.clear()
+        return view
+
+    changed.sort(key=lambda c: c[0], reverse=True)
+    held = set()
+    for _p, category, k in changed[limit:]:
+        held.add((category, k))
+    # sent ones start over; held ones keep what they built up
+    priorities.clear()
+    for ck in held:
+        priorities[ck] = kept[ck]
+
+    limited = dict(view)
+    for category in ("enemies", "pickups"):
+        had = last_sent[category] if last_sent is not None else {}
+        recs = []
+        for rec in view[category]:
+            if (category, rec["id"]) in held:
+                prev = had.get(rec["id"])
+                if prev is not None:
+                    recs.append(prev)
+                continue
+            recs.append(rec)
+        limited[category] = recs
+    return limited
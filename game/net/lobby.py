@@ -0,0 +1,223 @@
+# class: LobbyHost
+
+# host side of the lobby protocol, shared by HubScene (HOST) and the
+# dedicated server's sessions (server/sessions.py)
+#
+# slots are LobbySlot components. the hub keeps them on entities (with hero
+# previews), the dedicated server in a plain list, so the owner passes a
+# callable that yields (key, slot) pairs and, if it wants to hear about it,
+# on_slot_changed(key, slot) after a slot's peer or hero changed. a local
+# slot (the hub's own player) is never handed to a peer
+#
+# messages handled by pump():
+#   - HELLO: protocol check, a free slot and a new peer id, WELCOME. the
+#     same address saying hello again (lost WELCOME, or a client restarting
+#     a stuck reliable channel) gets the id it already has
+#   - LOBBY_UPDATE: a peer's hero and ready flag
+#   - PING / DISCONNECT
+# peers that go silent or stop acking give up their slot. every change goes
+# out to everyone as LOBBY_STATE
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from game.core.config import Config
+from game.net.context import NetworkContext
+from game.net.protocol import (
+    MSG_HELLO,
+    MSG_WELCOME,
+    MSG_JOIN_DENY,
+    MSG_LOBBY_UPDATE,
+    MSG_LOBBY_STATE,
+    MSG_START_GAME,
+    MSG_PING,
+    MSG_PONG,
+    MSG_DISCONNECT,
+    is_supported_protocol,
+)
+from game.world.components import LobbySlot
+
+Address = Tuple[str, int]
+
+
+class LobbyHost:
+    def __init__(
+        self,
+        context: NetworkContext,
+        slots: Callable[[], Iterable[Tuple[Any, LobbySlot]]],
+        catalog: List[str],
+        on_slot_changed: Optional[Callable[[Any, LobbySlot], None]] = None,
+        name: str = "net",
+    ) -> None:
+        self.net = context
+        self.slots = slots
+        self.catalog = catalog
+        self.on_slot_changed = on_slot_changed
+        # log prefix
+        self.name = name
+
+    def pump(self) -> None:
+        server = self.net.server
+        if server is None:
+            return
+
+        for addr, msg in server.recv_all():
+            mtype = msg.get("type")
+            if mtype == MSG_HELLO:
+                self._handle_hello(addr, msg)
+            elif mtype == MSG_LOBBY_UPDATE:
+                self._handle_lobby_update(msg)
+            elif mtype == MSG_PING:
+                server.send_raw(addr, {"type": MSG_PONG, "time": msg.get("time", 0)})
+            elif mtype == MSG_DISCONNECT:
+                peer_id = msg.get("peer_id")
+                if isinstance(peer_id, str):
+                    self.drop_peer(peer_id, "left")
+
+        # clients heartbeat while they wait; a silent one gives up its slot,
+        # and so does one whose reliable channel got stuck
+        for peer_id in server.silent_peers(Config.NET_PEER_TIMEOUT):
+            self.drop_peer(peer_id, "timed out")
+        for peer_id in server.failed_peers():
+            self.drop_peer(peer_id, "stopped acking")
+
+    # slots ####################################################################
+
+    def has_room(self) -> bool:
+        return any(slot.peer_id is None and not slot.is_local for _, slot in self.slots())
+
+    def all_ready(self) -> bool:
+        any_occupied = False
+        for _, slot in self.slots():
+            if slot.peer_id is not None or slot.is_local:
+                any_occupied = True
+                if not slot.ready:
+                    return False
+        return any_occupied
+
+    def payload(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "index": slot.index,
+                "peer_id": slot.peer_id,
+                "hero_index": slot.selected_char_index,
+                "ready": slot.ready,
+                "name": slot.name,
+            }
+            for _, slot in self.slots()
+        ]
+
+    def broadcast_state(self) -> None:
+        if self.net.server is None:
+            return
+        self.net.server.broadcast_reliable({
+            "type": MSG_LOBBY_STATE,
+            "slots": self.payload(),
+        })
+
+    # fill lobby_data and tell everyone to switch to the dungeon
+    def start_game(self, map_id: str) -> None:
+        heroes_by_peer: Dict[str, str] = {}
+        for _, slot in self.slots():
+            if slot.peer_id is None and not slot.is_local:
+                continue
+            hero_name = self.catalog[slot.selected_char_index % len(self.catalog)]
+            heroes_by_peer[slot.peer_id or self.net.my_peer_id] = f"hero.{hero_name}"
+
+        self.net.lobby_data = {
+            "heroes": heroes_by_peer,
+            "map_id": map_id,
+        }
+        if self.net.server is not None:
+            self.net.server.broadcast_reliable({
+                "type": MSG_START_GAME,
+                "lobby": self.net.lobby_data,
+            })
+
+    # free the peer's slot and forget the peer
+    def drop_peer(self, peer_id: str, reason: str) -> None:
+        for key, slot in self.slots():
+            if slot.peer_id == peer_id and not slot.is_local:
+                slot.peer_id = None
+                slot.selected_char_index = 0
+                slot.ready = False
+                self._changed(key, slot)
+        self.net.peers.pop(peer_id, None)
+        if self.net.server is not None:
+            self.net.server.unregister_peer(peer_id)
+        print(f"[{self.name}] {peer_id} {reason}")
+        self.broadcast_state()
+
+    # internals ################################################################
+
+    def _changed(self, key: Any, slot: LobbySlot) -> None:
+        if self.on_slot_changed is not None:
+            self.on_slot_changed(key, slot)
+
+    def _handle_hello(self, addr: Address, msg: Dict[str, Any]) -> None:
+        server = self.net.server
+        if not is_supported_protocol(msg.get("protocol")):
+            server.send_raw(addr, {"type": MSG_JOIN_DENY, "reason": "protocol_mismatch"})
+            return
+
+        # same address saying hello again: answer with the id it has
+        peer_id = server.addr_to_peer.get(addr)
+        if peer_id is not None:
+            welcome_fields = server.accept_peer(peer_id, addr, msg)
+        else:
+            free = next(
+                ((key, slot) for key, slot in self.slots() if slot.peer_id is None and not slot.is_local),
+                None,
+            )
+            if free is None:
+                server.send_raw(addr, {"type": MSG_JOIN_DENY, "reason": "full"})
+                return
+
+            used = {slot.peer_id for _, slot in self.slots() if slot.peer_id is not None}
+            index = 1
+            while f"peer:{index}" in used:
+                index += 1
+            peer_id = f"peer:{index}"
+
+            key, slot = free
+            slot.peer_id = peer_id
+            slot.name = f"Player {slot.index + 1}"
+            slot.selected_char_index = 0
+            slot.ready = False
+            self._changed(key, slot)
+
+            self.net.peers[peer_id] = addr
+            welcome_fields = server.accept_peer(peer_id, addr, msg)
+            print(f"[{self.name}] {peer_id} joined from {addr[0]}:{addr[1]}")
+
+        server.send_reliable(addr, {
+            "type": MSG_WELCOME,
+            "peer_id": peer_id,
+            **welcome_fields,
+        })
+        # the new peer is registered, so this reaches it too
+        self.broadcast_state()
+
+    def _handle_lobby_update(self, msg: Dict[str, Any]) -> None:
+        peer_id = msg.get("peer_id")
+        if not isinstance(peer_id, str):
+            return
+
+        for key, slot in self.slots():
+            if slot.peer_id != peer_id:
+                continue
+            hero_index = msg.get("hero_index")
+            if hero_index is not None:
+                try:
+                    hero_index = int(hero_index)
+                except (TypeError, ValueError):
+                    hero_index = 0
+                slot.selected_char_index = hero_index % len(self.catalog)
+                self._changed(key, slot)
+            ready = msg.get("ready")
+            if ready is not None:
+                slot.ready = bool(ready)
+            break
+
+        self.broadcast_state()
@@ -0,0 +1,167 @@
+# class: NetSim
+
+# network condition simulator for local testing
+#
+# wraps a UDP socket and makes every datagram sent through it go through a
+# bad link: one-way latency with jitter, loss, duplication and reordering.
+# NetServer and NetClient wrap their socket with wrap_socket(), which only
+# does so when one of the Config.NET_SIM_* settings is non-zero, so host and
+# clients on one machine (loopback) can replay a bad wifi session. set it
+# for every process to affect both directions
+#
+# every setting can be overridden from the environment as GC_<NAME>, e.g.
+#   GC_NET_SIM_LATENCY=0.08 GC_NET_SIM_JITTER=0.02 GC_NET_SIM_LOSS=0.05 python main.py
+# the random choices (loss, duplicates, jitter, reordering) come from a
+# generator seeded with NET_SIM_SEED, so a run sees the same pattern each time
+#
+# held datagrams go out from sendto() and flush(); NetServer/NetClient flush
+# on every recv_all(), so timing is as fine as the caller's frame rate
+#
+# reordering works like netem: a reordered datagram skips the latency and
+# overtakes the ones still held back
+
+from __future__ import annotations
+
+import heapq
+import os
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from game.core.config import Config
+
+Address = Tuple[str, int]
+
+# Config attribute -> type; the environment variable is "GC_" + the name
+SETTINGS = {
+    "NET_SIM_LATENCY": float,
+    "NET_SIM_JITTER": float,
+    "NET_SIM_LOSS": float,
+    "NET_SIM_DUPLICATE": float,
+    "NET_SIM_REORDER": float,
+    "NET_SIM_SEED": int,
+}
+ENV_PREFIX = "GC_"
+
+
+# Config values with environment overrides applied
+def sim_settings() -> Dict[str, Any]:
+    settings: Dict[str, Any] = {}
+    for name, kind in SETTINGS.items():
+        value = getattr(Config, name)
+        raw = os.environ.get(ENV_PREFIX + name)
+        if raw is not None:
+            try:
+                value = kind(raw)
+            except ValueError:
+                print(f"[netsim] ignoring {ENV_PREFIX + name}={raw!r}")
+        settings[name] = value
+    return settings
+
+
+# the socket itself, or a NetSim around it when any condition is configured
+def wrap_socket(sock, label: str = "net"):
+    settings = sim_settings()
+    sim = NetSim(
+        sock,
+        latency=settings["NET_SIM_LATENCY"],
+        jitter=settings["NET_SIM_JITTER"],
+        loss=settings["NET_SIM_LOSS"],
+        duplicate=settings["NET_SIM_DUPLICATE"],
+        reorder=settings["NET_SIM_REORDER"],
+        seed=settings["NET_SIM_SEED"],
+    )
+    if not sim.active():
+        return sock
+    print(f"[netsim] {label}: {sim.describe()}")
+    return sim
+
+
+class NetSim:
+    def __init__(self, sock, latency: float = 0.0, jitter: float = 0.0, loss: float = 0.0,
+                 duplicate: float = 0.0, reorder: float = 0.0, seed: int = 1) -> None:
+        self._sock = sock
+        self.latency = max(0.0, latency)
+        self.jitter = max(0.0, jitter)
+        self.loss = min(1.0, max(0.0, loss))
+        self.duplicate = min(1.0, max(0.0, duplicate))
+        self.reorder = min(1.0, max(0.0, reorder))
+        self._rng = random.Random(seed)
+
+        # (due time, order, data, addr); order keeps equal times in send order
+        self._held: List[Tuple[float, int, bytes, Address]] = []
+        self._order = 0
+
+        # counters, for debugging
+        self.sent = 0
+        self.dropped = 0
+        self.duplicated = 0
+        self.reordered = 0
+
+    def active(self) -> bool:
+        return bool(self.latency or self.jitter or self.loss or self.duplicate or self.reorder)
+
+    def describe(self) -> str:
+        return (f"latency {self.latency * 1000:.0f}ms +-{self.jitter * 1000:.0f}ms, "
+                f"loss {self.loss:.0%}, duplicate {self.duplicate:.0%}, reorder {self.reorder:.0%}")
+
+    # socket interface #########################################################
+
+    def sendto(self, data: bytes, addr: Address) -> int:
+        now = time.perf_counter()
+        self.flush(now)
+        rng = self._rng
+
+        if rng.random() < self.loss:
+            self.dropped += 1
+            return len(data)
+        copies = 2 if rng.random() < self.duplicate else 1
+        if copies > 1:
+            self.duplicated += 1
+
+        for _ in range(copies):
+            if rng.random() < self.reorder:
+                self.reordered += 1
+                self._send_now(data, addr)
+                continue
+            delay = self.latency
+            if self.jitter:
+                delay = max(0.0, delay + rng.uniform(-self.jitter, self.jitter))
+            if delay <= 0.0 and not self._held:
+                self._send_now(data, addr)
+                continue
+            heapq.heappush(self._held, (now + delay, self._order, data, addr))
+            self._order += 1
+        return len(data)
+
+    def recvfrom(self, buffer_size: int):
+        self.flush()
+        return self._sock.recvfrom(buffer_size)
+
+    def close(self) -> None:
+        self._held.clear()
+        self._sock.close()
+
+    def __getattr__(self, name: str):
+        # setblocking, bind, getsockname, ... go to the real socket
+        return getattr(self._sock, name)
+
+    # internals ################################################################
+
+    # send whatever is due
+    def flush(self, now: Optional[float] = None) -> None:
+        held = self._held
+        if not held:
+            return
+        if now is None:
+            now = time.perf_counter()
+        while held and held[0][0] <= now:
+            _due, _order, data, addr = heapq.heappop(held)
+            self._send_now(data, addr)
+
+    def _send_now(self, data: bytes, addr: Address) -> None:
+        try:
+            self._sock.sendto(data, addr)
+            self.sent += 1
+        except OSError:
+            pass
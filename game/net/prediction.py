@@ -0,0 +1,157 @@
+# class: LocalPredictor
+
+# client-side prediction + reconciliation for the local hero
+#
+# every input tick the client sends, it also runs that input through the same
+# movement step (movement.move_one) and wall push-out (collision.push_out_of_walls)
+# the host uses, so the hero moves as soon as the key goes down instead of a
+# round trip later. the input is kept until the host says it has applied it:
+# each player record in a snapshot carries "input_tick"
+#
+# when a snapshot arrives: drop the inputs up to its input_tick, put the hero
+# where the host has it, and replay the inputs the host hasn't processed yet.
+# host-only effects (knockback, attack lock, repeated inputs) show up as a
+# correction there
+#
+# the predicted position goes into both x/y and net_x/net_y, and hold() puts it
+# (and the predicted facing) back after snapshots are applied, so neither
+# apply_world_snapshot nor NetSmoothingSystem drag the hero back in time
+
+from __future__ import annotations
+
+import math
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from game.core.config import Config
+from game.world.components import (
+    PlayerTag, LocalControlled, Owner, Transform, Movement, Facing, Attack,
+    Intent, HitboxSize, OnMap, Map,
+)
+from game.world.systems.movement import move_one
+from game.world.systems.collision import wall_rect, push_out_of_walls
+
+# inputs kept for replay (~2s at 60Hz); older ones are given up on
+MAX_PENDING = 120
+
+# (input tick, intent dict, dash_cooldown before, dash_duration before)
+Pending = Tuple[int, Dict[str, Any], float, float]
+
+
+class LocalPredictor:
+    def __init__(self, dt: float = Config.FIXED_DT) -> None:
+        self.dt = dt                            # one input = one host frame
+        self.pending: Deque[Pending] = deque()
+        self.map_id: Optional[str] = None
+        self.facing: Optional[str] = None       # predicted facing, re-applied by hold()
+        self.last_error = 0.0                   # size of the last correction (px)
+        self._walls: Tuple[Optional[str], list] = (None, [])
+
+    # predict one sent input
+    def step(self, world, my_peer_id: str, tick: int, intent_data: Dict[str, Any]) -> None:
+        comps = self._local_player(world, my_peer_id)
+        if comps is None:
+            return
+
+        om: OnMap | None = comps.get(OnMap)
+        map_id = om.id if om is not None else None
+        if map_id != self.map_id:
+            self.pending.clear()
+            self.map_id = map_id
+
+        mv: Movement = comps[Movement]
+        self.pending.append((tick, intent_data, mv.dash_cooldown, mv.dash_duration))
+        if len(self.pending) > MAX_PENDING:
+            self.pending.popleft()
+
+        self._simulate(world, comps, intent_data)
+        tr: Transform = comps[Transform]
+        tr.net_x = tr.x
+        tr.net_y = tr.y
+        self.facing = comps[Facing].direction
+
+    # rewind to the host's position for our hero and replay what it hasn't seen
+    def reconcile(self, world, my_peer_id: str, rec: Optional[Dict[str, Any]]) -> None:
+        if rec is None or rec.get("input_tick") is None:
+            return
+        comps = self._local_player(world, my_peer_id)
+        if comps is None:
+            return
+
+        acked = int(rec["input_tick"])
+        pending = self.pending
+        while pending and pending[0][0] <= acked:
+            pending.popleft()
+
+        # map transition: apply_world_snapshot moves us, start over there
+        if rec.get("map_id") != self.map_id:
+            pending.clear()
+            return
+
+        tr: Transform = comps[Transform]
+        mv: Movement = comps[Movement]
+        old_x, old_y = tr.x, tr.y
+
+        tr.x = float(rec["x"])
+        tr.y = float(rec["y"])
+        if pending:
+            mv.dash_cooldown, mv.dash_duration = pending[0][2], pending[0][3]
+        for _tick, intent_data, _cd, _dur in pending:
+            self._simulate(world, comps, intent_data)
+
+        self.last_error = math.hypot(tr.x - old_x, tr.y - old_y)
+        tr.net_x = tr.x
+        tr.net_y = tr.y
+
+    # after snapshots were applied this frame: keep the hero on its prediction
+    def hold(self, world, my_peer_id: str) -> None:
+        if self.map_id is None:
+            return
+        comps = self._local_player(world, my_peer_id)
+        if comps is None:
+            return
+        om: OnMap | None = comps.get(OnMap)
+        if om is None or om.id != self.map_id:
+            return
+        tr: Transform = comps[Transform]
+        tr.net_x = tr.x
+        tr.net_y = tr.y
+        if self.facing is not None:
+            comps[Facing].direction = self.facing
+
+    # internals ################################################################
+
+    @staticmethod
+    def _local_player(world, my_peer_id: str):
+        for _eid, comps in world.view(PlayerTag, LocalControlled, Owner, Transform, Movement, Facing, Attack):
+            if comps[Owner].peer_id == my_peer_id:
+                return comps
+        return None
+
+    def _walls_for(self, world, map_id: Optional[str]) -> list:
+        cached_id, walls = self._walls
+        if cached_id == map_id and walls:
+            return walls
+        walls = []
+        for _eid, comps in world.view(Map):
+            m: Map = comps[Map]
+            if m.id == map_id:
+                walls = m.collisions or []
+                break
+        self._walls = (map_id, walls)
+        return walls
+
+    def _simulate(self, world, comps, intent_data: Dict[str, Any]) -> None:
+        # scratch Intent: move_one normalizes diagonals and clears dash in place
+        it = Intent(
+            move_x=float(intent_data.get("move_x", 0.0)),
+            move_y=float(intent_data.get("move_y", 0.0)),
+            dash=bool(intent_data.get("dash", False)),
+            facing=intent_data.get("facing", "down"),
+        )
+        tr: Transform = comps[Transform]
+        move_one(tr, it, comps[Movement], comps[Facing], comps[Attack], self.dt)
+
+        hitbox: HitboxSize | None = comps.get(HitboxSize)
+        radius = (hitbox.radius / 2) if hitbox else 5
+        push_out_of_walls(tr, wall_rect(tr, radius), self._walls_for(world, self.map_id))
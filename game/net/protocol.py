@@ -4,7 +4,30 @@
 from __future__ import annotations
 from typing import Literal
 
-PROTOCOL_VERSION = 1
+# 9 = heartbeats/peer timeouts, resume tokens in WELCOME/HELLO
+# 8 = quantized positions/hp, facing/clip enums in binary snapshots
+# 7 = input packets repeat the last few inputs ("history")
+# 6 = reliable ordered control messages (game/net/reliable.py)
+# 5 = snapshots bigger than the MTU go out as independent chunks (game/net/fragment.py)
+# 4 = player records carry the last applied input tick (client prediction)
+# 3 = delta snapshots against acked baselines (game/net/delta.py)
+# 2 = binary snapshot/input codec (game/net/codec.py)
+# 1 = everything as JSON
+# older versions are still accepted: each feature is used with a peer whose
+# version is at least the feature's own constant below. the binary codec only
+# has its current layout, so peers older than that get JSON
+PROTOCOL_VERSION = 9
+HEARTBEAT_PROTOCOL_VERSION = 9
+BINARY_PROTOCOL_VERSION = 8
+RELIABLE_PROTOCOL_VERSION = 6
+FRAGMENT_PROTOCOL_VERSION = 5
+DELTA_PROTOCOL_VERSION = 3
+JSON_PROTOCOL_VERSION = 1
+MIN_PROTOCOL_VERSION = 1
+
+# host snapshot ticks per second: tick / TICK_RATE is host time in seconds
+# (NetHostState.send_interval defaults to one tick)
+TICK_RATE = 60
 
 MessageType = Literal[
     "hello",        # client -> host: initial handshake
@@ -12,6 +35,8 @@ MessageType = Literal[
     "join_denied",  # host  -> client: lobby full / version mismatch
     "input",        # client -> host: input snapshot
     "snapshot",     # host  -> client: world snapshot
+    "snapshot_delta", # host -> client: snapshot as changes since an acked one
+    "ack",          # client -> host: newest snapshot tick applied (when not sending input)
     "start_game",   # host  -> clients: transition hub -> dungeon
     "lobby_update", # client -> host (hero/ready change)
     "lobby_state",  # host -> clients (lobby slots)
@@ -25,9 +50,19 @@ MSG_WELCOME     = "welcome"
 MSG_JOIN_DENY   = "join_denied"
 MSG_INPUT       = "input"
 MSG_SNAPSHOT    = "snapshot"
+MSG_SNAPSHOT_DELTA = "snapshot_delta"
+MSG_ACK         = "ack"
 MSG_START_GAME  = "start_game"
 MSG_LOBBY_UPDATE = "lobby_update"
 MSG_LOBBY_STATE = "lobby_state"
 MSG_PING        = "ping"
 MSG_PONG        = "pong"
 MSG_DISCONNECT  = "disconnect"
+
+
+def is_supported_protocol(version) -> bool:
+    try:
+        version = int(version)
+    except (TypeError, ValueError):
+        return False
+    return MIN_PROTOCOL_VERSION <= version <= PROTOCOL_VERSION
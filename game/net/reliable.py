@@ -0,0 +1,202 @@
+# class: ReliableEndpoint
+
+# reliable, ordered control messages over the game's UDP socket
+#
+# snapshots and input are real-time: a lost one is replaced by the next. lobby
+# and session control (welcome, lobby state, start game, disconnect, ...) is
+# not: one lost START_GAME leaves a client in the hub forever. those go
+# through a ReliableEndpoint, one per remote address:
+#   - each reliable message gets "rel": [epoch, seq, channel, channel_seq].
+#     seq numbers every reliable message to that address (acks), channel_seq
+#     orders messages within a channel
+#   - the receiver acks by seq: the highest seq seen plus a bitfield of the 32
+#     before it. acks ride in front of whatever datagram goes out next
+#     (snapshot, input, pong, ...); if nothing goes out within ACK_DELAY, an
+#     ack-only datagram is sent
+#   - unacked messages are resent with exponential backoff. after MAX_ATTEMPTS
+#     the endpoint gives up and is marked failed: the receiver holds everything
+#     after the missing message on its channel, so the channel can't recover.
+#     the owner has to drop the peer (NetServer.failed_peers) or start over
+#     with a fresh endpoint and a new epoch (NetClient)
+#   - the receiver drops duplicates and holds a message until everything
+#     before it on its channel has been delivered
+#   - epoch is random per endpoint: a peer that reconnects from the same
+#     address starts a fresh sequence instead of looking like old duplicates
+#
+# datagram framing: [RELIABLE_MAGIC][epoch u32][ack u32][ack bits u32][payload]
+# payload is a normal codec message (or empty for an ack-only datagram), so
+# it doesn't matter which codec encoded it and shared encodes stay shared
+
+from __future__ import annotations
+
+import random
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+
+RELIABLE_MAGIC = 0xA5
+ACK_HEADER = struct.Struct("<BIII")
+
+CHANNEL_CONTROL = 0     # welcome, lobby state/updates, start game, disconnect
+
+# first resend after RESEND_MIN seconds, doubling up to RESEND_MAX
+RESEND_MIN = 0.2
+RESEND_MAX = 2.0
+MAX_ATTEMPTS = 12
+# an owed ack waits this long (s) for a datagram to ride on
+ACK_DELAY = 0.03
+# after a new reliable message arrives, keep acking on outgoing datagrams
+# this long (s), in case the first acks are lost
+ACK_LINGER = 1.0
+ACK_BITS = 32
+
+
+# -> (epoch, ack, bits, payload); epoch is None for datagrams without acks
+def unframe(data: bytes) -> Tuple[Optional[int], int, int, bytes]:
+    if len(data) >= ACK_HEADER.size and data[0] == RELIABLE_MAGIC:
+        _magic, epoch, ack, bits = ACK_HEADER.unpack_from(data, 0)
+        return epoch, ack, bits, data[ACK_HEADER.size:]
+    return None, 0, 0, data
+
+
+class ReliableEndpoint:
+    def __init__(self) -> None:
+        self.epoch = random.getrandbits(32)
+
+        # sending
+        self._next_seq = 1
+        self._channel_seq: Dict[int, int] = {}
+        # seq -> [message, next resend time, resend interval, attempts]
+        self._unacked: Dict[int, List[Any]] = {}
+        # a message ran out of attempts; its channel is stuck for good
+        self.failed = False
+        self.gave_up: List[Dict[str, Any]] = []
+
+        # receiving (per remote epoch)
+        self._remote_epoch: Optional[int] = None
+        self._received_max = 0
+        self._received_bits = 0            # bit i = seq (received_max - 1 - i) arrived
+        self._expected: Dict[int, int] = {}  # channel -> next channel_seq to deliver
+        self._held: Dict[int, Dict[int, Dict[str, Any]]] = {}
+        self._ack_owed_since: Optional[float] = None
+        self._last_receipt = -ACK_LINGER
+        self._stray: List[int] = []         # seqs too old for the ack bitfield
+
+    def __len__(self) -> int:
+        return len(self._unacked)
+
+    # sending ##################################################################
+
+    # stamp a message for reliable delivery; the caller sends the result
+    def wrap(self, message: Dict[str, Any], now: float, channel: int = CHANNEL_CONTROL) -> Dict[str, Any]:
+        seq = self._next_seq
+        self._next_seq += 1
+        cseq = self._channel_seq.get(channel, 0) + 1
+        self._channel_seq[channel] = cseq
+
+        wrapped = {**message, "rel": [self.epoch, seq, channel, cseq]}
+        self._unacked[seq] = [wrapped, now + RESEND_MIN, RESEND_MIN, 1]
+        return wrapped
+
+    # messages to send again now. one that has had MAX_ATTEMPTS is given up
+    # on instead: it goes to gave_up and the endpoint is marked failed
+    def due(self, now: float) -> List[Dict[str, Any]]:
+        out: List[Dict[str, Any]] = []
+        for seq, entry in list(self._unacked.items()):
+            if now < entry[1]:
+                continue
+            if entry[3] >= MAX_ATTEMPTS:
+                del self._unacked[seq]
+                self.gave_up.append(entry[0])
+                self.failed = True
+                continue
+            entry[2] = min(entry[2] * 2.0, RESEND_MAX)
+            entry[1] = now + entry[2]
+            entry[3] += 1
+            out.append(entry[0])
+        return out
+
+    def on_ack(self, epoch: int, ack: int, bits: int) -> None:
+        if epoch != self.epoch or not self._unacked:
+            return
+        unacked = self._unacked
+        unacked.pop(ack, None)
+        i = 0
+        while bits and i < ACK_BITS:
+            if bits & 1:
+                unacked.pop(ack - 1 - i, None)
+            bits >>= 1
+            i += 1
+
+    # receiving ################################################################
+
+    # a message that came in with "rel": returns what can be delivered now
+    # (this one and anything it unblocked, in channel order), "rel" removed
+    def on_receive(self, message: Dict[str, Any], now: float) -> List[Dict[str, Any]]:
+        try:
+            epoch, seq, channel, cseq = (int(v) for v in message["rel"])
+        except (KeyError, TypeError, ValueError):
+            return []
+
+        if epoch != self._remote_epoch:
+            self._remote_epoch = epoch
+            self._received_max = 0
+            self._received_bits = 0
+            self._expected.clear()
+            self._held.clear()
+
+        # ack it even if it's a duplicate: our earlier ack may have been lost
+        if self._ack_owed_since is None:
+            self._ack_owed_since = now
+        self._record(seq)
+
+        expected = self._expected.get(channel, 1)
+        held = self._held.setdefault(channel, {})
+        if cseq < expected or cseq in held:
+            return []   # duplicate
+        self._last_receipt = now
+        held[cseq] = {k: v for k, v in message.items() if k != "rel"}
+
+        out: List[Dict[str, Any]] = []
+        while expected in held:
+            out.append(held.pop(expected))
+            expected += 1
+        self._expected[channel] = expected
+        return out
+
+    # ack fields for an outgoing datagram, or None if there's nothing to ack
+    def ack_header(self, now: float) -> Optional[bytes]:
+        if self._remote_epoch is None:
+            return None
+        if self._ack_owed_since is None and now - self._last_receipt > ACK_LINGER:
+            return None
+        self._ack_owed_since = None
+        return ACK_HEADER.pack(RELIABLE_MAGIC, self._remote_epoch, self._received_max, self._received_bits)
+
+    # an ack has been owed longer than ACK_DELAY with nothing to carry it
+    def ack_overdue(self, now: float) -> bool:
+        return self._ack_owed_since is not None and now - self._ack_owed_since >= ACK_DELAY
+
+    # ack-only headers for seqs that fell out of the bitfield window
+    def stray_acks(self) -> List[bytes]:
+        if not self._stray:
+            return []
+        out = [ACK_HEADER.pack(RELIABLE_MAGIC, self._remote_epoch, seq, 0) for seq in self._stray]
+        self._stray.clear()
+        return out
+
+    # internals ################################################################
+
+    # note seq in the ack window
+    def _record(self, seq: int) -> None:
+        top = self._received_max
+        if seq > top:
+            shift = seq - top
+            bits = (self._received_bits << shift) | (1 << (shift - 1)) if top else 0
+            self._received_bits = bits & ((1 << ACK_BITS) - 1)
+            self._received_max = seq
+        elif seq < top:
+            offset = top - 1 - seq
+            if offset < ACK_BITS:
+                self._received_bits |= 1 << offset
+            else:
+                self._stray.append(seq)
@@ -0,0 +1,198 @@
+# class: SessionRouter
+
+# several host sessions behind one UDP socket
+#
+# a dedicated server can run many independent sessions (each its own lobby,
+# World, peers and tick; server/sessions.py) on a single port. the router owns
+# that socket on the net loop (game/net/transport.py) and hands each datagram
+# to the session its sender belongs to:
+#   - routes: address -> session id. a session's NetServer adds and removes
+#     its peers' routes as they register (through its SessionLink), so once a
+#     peer is in, its datagrams go straight to that session's inbox
+#   - datagrams from unknown addresses wait in `pending` for the owner
+#     (SessionManager) to pick a session: by the HELLO's "session" field, the
+#     session id prefixed to a resume token, or the first lobby with room.
+#     deliver() then hands it over and routes the address there for
+#     PROVISIONAL_TTL seconds, so HELLO retries don't land somewhere else
+#   - a session may live in another process: it's then reached through a
+#     receiver that forwards datagrams over a pipe, and its sends and route
+#     changes come back the same way (watch()). those sends go out on the
+#     loop thread
+#
+# routing is by address because a peer's address is already in every
+# datagram; the session id only has to travel once, in the HELLO
+
+from __future__ import annotations
+
+import asyncio
+import json
+import socket
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, Tuple
+
+from game.net.codec import encode_message
+from game.net.netsim import NetSim, wrap_socket
+from game.net.reliable import unframe
+from game.net.transport import INBOX_MAX, net_loop
+
+Address = Tuple[str, int]
+Receiver = Callable[[bytes, Address], None]
+
+# how long (s) a delivered HELLO keeps its sender routed to the chosen session
+# without that session registering it (e.g. it was turned away)
+PROVISIONAL_TTL = 2.0
+
+
+class SessionRouter(asyncio.DatagramProtocol):
+    def __init__(self, host: str = "0.0.0.0", port: int = 5000) -> None:
+        self.address: Address = (host, port)
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setblocking(False)
+        sock.bind(self.address)
+        # a simulated bad link when Config.NET_SIM_* asks for one (sends only)
+        self.sock = wrap_socket(sock, "server")
+
+        self.routes: Dict[Address, str] = {}
+        # address -> (session id, routed until)
+        self._provisional: Dict[Address, Tuple[str, float]] = {}
+        # session id -> where its datagrams go
+        self.receivers: Dict[str, Receiver] = {}
+        # (addr, raw datagram, JSON message) from unknown addresses
+        self.pending: Deque[Tuple[Address, bytes, Dict[str, Any]]] = deque(maxlen=INBOX_MAX)
+        # sessions in other processes send through the loop thread; then the
+        # game thread must not send too
+        self._loop_sends = False
+
+        self._loop = net_loop()
+        self._transport = self._loop.open(sock, self)
+
+    # loop thread ##############################################################
+
+    def datagram_received(self, data: bytes, addr: Address) -> None:
+        sid = self.routes.get(addr)
+        if sid is None:
+            provisional = self._provisional.get(addr)
+            if provisional is not None and time.perf_counter() < provisional[1]:
+                sid = provisional[0]
+        receiver = self.receivers.get(sid) if sid is not None else None
+        if receiver is not None:
+            receiver(data, addr)
+            return
+
+        # only a HELLO means anything from a stranger, and that's JSON
+        _epoch, _ack, _bits, payload = unframe(data)
+        try:
+            msg = json.loads(payload.decode("utf-8"))
+        except Exception:
+            return
+        if isinstance(msg, dict):
+            self.pending.append((addr, data, msg))
+
+    def error_received(self, exc: Exception) -> None:
+        return
+
+    # handler gets each message a worker sends over `conn`, and None once the
+    # pipe is closed
+    def watch(self, conn, handler: Callable[[Any], None]) -> None:
+        self._loop_sends = True
+        loop = self._loop.loop
+
+        def readable() -> None:
+            try:
+                while conn.poll():
+                    handler(conn.recv())
+            except (EOFError, OSError):
+                loop.remove_reader(conn.fileno())
+                handler(None)
+
+        loop.call_soon_threadsafe(loop.add_reader, conn.fileno(), readable)
+
+    # game thread ##############################################################
+
+    def link(self, session_id: str) -> "SessionLink":
+        return SessionLink(self, session_id)
+
+    def drain_pending(self) -> Iterator[Tuple[Address, bytes, Dict[str, Any]]]:
+        pending = self.pending
+        for _ in range(len(pending)):
+            yield pending.popleft()
+
+    # hand an unrouted datagram to a session, and its sender's next ones too
+    def deliver(self, session_id: str, data: bytes, addr: Address) -> None:
+        receiver = self.receivers.get(session_id)
+        if receiver is None:
+            return
+        now = time.perf_counter()
+        if len(self._provisional) >= INBOX_MAX:
+            self._provisional = {a: p for a, p in self._provisional.items() if p[1] > now}
+        self._provisional[addr] = (session_id, now + PROVISIONAL_TTL)
+        receiver(data, addr)
+
+    # a JSON message to an address no session owns (e.g. JOIN_DENY)
+    def send(self, message: Dict[str, Any], addr: Address) -> None:
+        data = encode_message(message)
+        if self._loop_sends:
+            self._loop.loop.call_soon_threadsafe(self.send_now, data, addr)
+        else:
+            self.send_now(data, addr)
+
+    # datagrams held by the network simulator, if any, go out
+    def flush(self) -> None:
+        if not isinstance(self.sock, NetSim):
+            return
+        if self._loop_sends:
+            self._loop.loop.call_soon_threadsafe(self.sock.flush)
+        else:
+            self.sock.flush()
+
+    def close(self) -> None:
+        self._loop.close(self._transport)
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+    # either thread ############################################################
+
+    def send_now(self, data: bytes, addr: Address) -> None:
+        try:
+            self.sock.sendto(data, addr)
+        except OSError:
+            pass
+
+    def route(self, addr: Address, session_id: str) -> None:
+        self.routes[addr] = session_id
+        self._provisional.pop(addr, None)
+
+    def unroute(self, addr: Address, session_id: str) -> None:
+        if self.routes.get(addr) == session_id:
+            del self.routes[addr]
+
+    def drop_session(self, session_id: str) -> None:
+        self.receivers.pop(session_id, None)
+        for addr in [a for a, sid in self.routes.items() if sid == session_id]:
+            self.routes.pop(addr, None)
+
+
+# what a NetServer running as one session of a SessionRouter talks to
+# (NetServer(session=router.link(session_id)))
+class SessionLink:
+    def __init__(self, router: SessionRouter, session_id: str) -> None:
+        self.router = router
+        self.session_id = session_id
+        self.address = router.address
+        self.sock = router.sock
+
+    def attach(self, inbox) -> None:
+        self.router.receivers[self.session_id] = inbox.datagram_received
+
+    def route(self, addr: Address) -> None:
+        self.router.route(addr, self.session_id)
+
+    def unroute(self, addr: Address) -> None:
+        self.router.unroute(addr, self.session_id)
+
+    def close(self) -> None:
+        self.router.drop_session(self.session_id)
@@ -1,59 +1,136 @@
 # AUTHORED BY: Scott Petty, Cole Herzog
 # Non-blocking UDP server wrapper used by the host.
+# snapshots bigger than Config.NET_MTU are sent as independent chunks to
+# peers that can reassemble them (game/net/fragment.py)
+# control messages can go out reliably (send_reliable / broadcast_reliable):
+# resent until acked, delivered in order (game/net/reliable.py)
+# every datagram from a peer counts as a heartbeat (silent_peers); WELCOME
+# carries a resume token that lets a peer reclaim its id from a new address
+# datagrams are received and decoded on the net loop thread
+# (game/net/transport.py); recv_all only drains what's already decoded
+# a NetServer can also be one session of several behind one socket: given a
+# session link (game/net/router.py) it sends through the shared socket, gets
+# only its own peers' datagrams and keeps the router's routes up to date
 
 from __future__ import annotations
 
+import secrets
 import socket
-from typing import Dict, Tuple, List, Any
+import time
+from typing import Dict, Tuple, List, Any, Optional
 
-from game.net.codec import encode_message, decode_message
+from game.core.config import Config
+from game.net.protocol import (
+    PROTOCOL_VERSION, JSON_PROTOCOL_VERSION, FRAGMENT_PROTOCOL_VERSION, RELIABLE_PROTOCOL_VERSION,
+    HEARTBEAT_PROTOCOL_VERSION,
+)
+from game.net.codec import (
+    encode_message, BinaryCodec, build_string_table, negotiate_codec,
+)
+from game.net.fragment import fragment
+from game.net.reliable import ReliableEndpoint, ACK_HEADER, CHANNEL_CONTROL
+from game.net.netsim import NetSim, wrap_socket
+from game.net.transport import Inbox, net_loop
 
 Address = Tuple[str, int]
 
 
 class NetServer:
     def __init__(self, host: str = "0.0.0.0", port: int = 5000,
-                 buffer_size: int = 65535) -> None:
+                 buffer_size: int = 65535, session: Any = None) -> None:
         self.address: Address = (host, port)
         self.buffer_size = buffer_size
+        # the router's link when this server is one session on a shared socket
+        self.session = session
 
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        sock.setblocking(False)
-        sock.bind(self.address)
-        self._sock = sock
+        sock = None
+        if session is None:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setblocking(False)
+            sock.bind(self.address)
+            # a simulated bad link when Config.NET_SIM_* asks for one (sends only)
+            self._sock = wrap_socket(sock, "server")
+        else:
+            self.address = session.address
+            self._sock = session.sock
 
         # Maps: peer_id -> address, and reverse.
         self.peer_to_addr: Dict[str, Address] = {}
         self.addr_to_peer: Dict[Address, str] = {}
 
+        # codec negotiated per address in accept_peer(); unknown addresses get JSON
+        self.codecs: Dict[Address, Any] = {}
+        # protocol version -> binary codec; they all share one string table
+        self._binary: Dict[int, BinaryCodec] = {}
+
+        # reliability state per address, for peers that negotiated it
+        self.reliable: Dict[Address, ReliableEndpoint] = {}
+
+        # address -> perf_counter time of its last datagram
+        self.last_heard: Dict[Address, float] = {}
+        # resume token -> peer_id; outlives the registration until the id is
+        # given to someone else
+        self.resume_tokens: Dict[str, str] = {}
+
+        # received on the net loop, decoded with this address's codec
+        self._inbox = Inbox(self.codecs.get)
+        self._transport = None
+        if session is None:
+            self._transport = net_loop().open(sock, self._inbox)
+        else:
+            session.attach(self._inbox)
+
     # I/O ##################################################################
 
-    # non-blocking recieve loop. Returns a list of (addr, message_dict).
+    # drains what arrived since the last call. Returns a list of (addr, message_dict).
+    # also resends unacked reliable messages and sends acks nothing carried
     def recv_all(self) -> List[Tuple[Address, dict]]:
         messages: List[Tuple[Address, dict]] = []
-        while True:
-            try:
-                data, addr = self._sock.recvfrom(self.buffer_size)
-            except BlockingIOError:
-                break
-            except OSError:
-                break
-
-            try:
-                msg = decode_message(data)
-            except Exception:
-                continue
+        now = time.perf_counter()
+        if isinstance(self._sock, NetSim):
+            self._sock.flush(now)
+        for addr, at, epoch, ack, bits, msg in self._inbox.drain():
+            if addr in self.addr_to_peer:
+                self.last_heard[addr] = at
+            endpoint = self.reliable.get(addr)
+            if epoch is not None and endpoint is not None:
+                endpoint.on_ack(epoch, ack, bits)
+            if msg is None:
+                continue    # ack only
 
+            if "rel" in msg and endpoint is not None:
+                for delivered in endpoint.on_receive(msg, now):
+                    messages.append((addr, delivered))
+                continue
             messages.append((addr, msg))
 
+        self._service_reliable(now)
         return messages
 
     def send_raw(self, addr: Address, message: dict) -> None:
-        try:
-            self._sock.sendto(encode_message(message), addr)
-        except OSError:
-            # Ignore send errors. socket might be closed.
-            pass
+        for data in self._datagrams(self.codecs.get(addr), message):
+            self._send_bytes(addr, data)
+
+    # message -> datagrams for one codec (more than one only for big snapshots)
+    @staticmethod
+    def _datagrams(codec: Any, message: dict) -> List[bytes]:
+        if codec is None:
+            return [encode_message(message)]
+        if codec.protocol >= RELIABLE_PROTOCOL_VERSION:
+            # room for the ack header _send_bytes may put in front
+            return fragment(message, codec.encode, Config.NET_MTU - ACK_HEADER.size)
+        if codec.protocol >= FRAGMENT_PROTOCOL_VERSION:
+            return fragment(message, codec.encode, Config.NET_MTU)
+        return [codec.encode(message)]
+
+    # every datagram to a reliable peer carries our acks when some are due
+    def _send_bytes(self, addr: Address, data: bytes) -> None:
+        endpoint = self.reliable.get(addr)
+        if endpoint is not None:
+            header = endpoint.ack_header(time.perf_counter())
+            if header is not None:
+                data = header + data
+        self._send_plain(addr, data)
 
     def send_to_peer(self, peer_id: str, message: dict) -> None:
         addr = self.peer_to_addr.get(peer_id)
@@ -61,22 +138,166 @@ class NetServer:
             return
         self.send_raw(addr, message)
 
-    def broadcast(self, message: dict) -> None:
-        for addr in list(self.peer_to_addr.values()):
-            self.send_raw(addr, message)
+    # encodes once per codec in use, not once per peer
+    # addrs narrows the send to some peers (default: every registered peer)
+    # returns the number of bytes sent to each address
+    def broadcast(self, message: dict, addrs: Optional[List[Address]] = None) -> Dict[Address, int]:
+        encoded: Dict[int, List[bytes]] = {}
+        sizes: Dict[Address, int] = {}
+        if addrs is None:
+            addrs = list(self.peer_to_addr.values())
+        for addr in addrs:
+            codec = self.codecs.get(addr)
+            key = id(codec)
+            datagrams = encoded.get(key)
+            if datagrams is None:
+                datagrams = encoded[key] = self._datagrams(codec, message)
+            for data in datagrams:
+                self._send_bytes(addr, data)
+            sizes[addr] = sum(len(data) for data in datagrams)
+        return sizes
+
+    # resent until acked and delivered in order on its channel; peers that
+    # predate reliable delivery get a plain send_raw
+    def send_reliable(self, addr: Address, message: dict, channel: int = CHANNEL_CONTROL) -> None:
+        endpoint = self.reliable.get(addr)
+        if endpoint is not None:
+            message = endpoint.wrap(message, time.perf_counter(), channel)
+        self.send_raw(addr, message)
+
+    def broadcast_reliable(self, message: dict, addrs: Optional[List[Address]] = None,
+                           channel: int = CHANNEL_CONTROL) -> None:
+        if addrs is None:
+            addrs = list(self.peer_to_addr.values())
+        for addr in addrs:
+            self.send_reliable(addr, message, channel)
+
+    def _service_reliable(self, now: float) -> None:
+        for addr, endpoint in self.reliable.items():
+            for message in endpoint.due(now):
+                self.send_raw(addr, message)
+            for header in endpoint.stray_acks():
+                self._send_plain(addr, header)
+            if endpoint.ack_overdue(now):
+                self._send_bytes(addr, b"")
+
+    def _send_plain(self, addr: Address, data: bytes) -> None:
+        try:
+            self._sock.sendto(data, addr)
+        except OSError:
+            # Ignore send errors. socket might be closed.
+            pass
 
     # bookkeeping ##########################################################
 
     def register_peer(self, peer_id: str, addr: Address) -> None:
         self.peer_to_addr[peer_id] = addr
         self.addr_to_peer[addr] = peer_id
+        if self.session is not None:
+            self.session.route(addr)
 
-    def unregister_peer(self, peer_id: str) -> None:
+    # resumable: keep the peer's resume token valid (it may come back)
+    def unregister_peer(self, peer_id: str, resumable: bool = False) -> None:
         addr = self.peer_to_addr.pop(peer_id, None)
         if addr is not None:
             self.addr_to_peer.pop(addr, None)
+            if self.session is not None:
+                self.session.unroute(addr)
+            self.codecs.pop(addr, None)
+            self.reliable.pop(addr, None)
+            self.last_heard.pop(addr, None)
+        if not resumable:
+            self._drop_tokens(peer_id)
+
+    # registered peers we haven't heard from in `timeout` seconds. peers that
+    # predate heartbeats are left alone: they're silent in the lobby
+    def silent_peers(self, timeout: float) -> List[str]:
+        now = time.perf_counter()
+        silent = []
+        for peer_id, addr in self.peer_to_addr.items():
+            if self.peer_protocol(addr) < HEARTBEAT_PROTOCOL_VERSION:
+                continue
+            if now - self.last_heard.get(addr, now) > timeout:
+                silent.append(peer_id)
+        return silent
+
+    # registered peers with a reliable message they never acked after
+    # MAX_ATTEMPTS: their control channel is stuck, so the caller drops them
+    def failed_peers(self) -> List[str]:
+        return [
+            self.addr_to_peer[addr] for addr, endpoint in self.reliable.items()
+            if endpoint.failed and addr in self.addr_to_peer
+        ]
+
+    # the peer id a HELLO's resume token belongs to, if it's still valid
+    def resume_peer(self, hello: Dict[str, Any]) -> Optional[str]:
+        token = hello.get("resume")
+        if not isinstance(token, str):
+            return None
+        return self.resume_tokens.get(token)
+
+    def _drop_tokens(self, peer_id: str) -> None:
+        for token in [t for t, p in self.resume_tokens.items() if p == peer_id]:
+            del self.resume_tokens[token]
+
+    # register a peer that sent HELLO and pick its codec
+    # returns the fields to merge into the WELCOME reply
+    # (WELCOME itself always goes out as JSON, the client has no table yet)
+    def accept_peer(self, peer_id: str, addr: Address, hello: Dict[str, Any]) -> Dict[str, Any]:
+        # resuming from a new address: let go of the old one
+        old_addr = self.peer_to_addr.get(peer_id)
+        if old_addr is not None and old_addr != addr:
+            self.unregister_peer(peer_id, resumable=True)
+        self.register_peer(peer_id, addr)
+        codec = negotiate_codec(hello, self.binary_codec, Config.NET_CODEC)
+        self.codecs[addr] = codec
+        self.last_heard[addr] = time.perf_counter()
+        # fresh endpoint (new epoch) on every HELLO: the client starts over too
+        if codec.protocol >= RELIABLE_PROTOCOL_VERSION:
+            self.reliable[addr] = ReliableEndpoint()
+        else:
+            self.reliable.pop(addr, None)
+
+        fields: Dict[str, Any] = {"protocol": codec.protocol, "codec": codec.name}
+        if codec.protocol >= HEARTBEAT_PROTOCOL_VERSION:
+            token = hello.get("resume")
+            if not isinstance(token, str) or self.resume_tokens.get(token) != peer_id:
+                # a new player on this id: older tokens for it are void
+                self._drop_tokens(peer_id)
+                token = secrets.token_hex(8)
+                if self.session is not None:
+                    # the router finds the session from the token alone
+                    token = f"{self.session.session_id}:{token}"
+                self.resume_tokens[token] = peer_id
+            fields["resume"] = token
+        if self.session is not None:
+            fields["session"] = self.session.session_id
+        if isinstance(codec, BinaryCodec):
+            fields["strings"] = codec.strings
+            fields["clips"] = codec.clips
+        return fields
+
+    # protocol version negotiated with this address (JSON v1 if it never said HELLO)
+    def peer_protocol(self, addr: Address) -> int:
+        codec = self.codecs.get(addr)
+        return codec.protocol if codec is not None else JSON_PROTOCOL_VERSION
+
+    # one string table per server, built after atlases/maps are loaded. one
+    # codec per negotiated version, so broadcasts still encode once per codec
+    def binary_codec(self, protocol: int = PROTOCOL_VERSION) -> BinaryCodec:
+        codec = self._binary.get(protocol)
+        if codec is None:
+            latest = self._binary.get(PROTOCOL_VERSION)
+            if latest is None:
+                latest = self._binary[PROTOCOL_VERSION] = BinaryCodec(build_string_table())
+            codec = self._binary[protocol] = BinaryCodec(latest.strings, latest.clips, protocol)
+        return codec
 
     def close(self) -> None:
+        if self.session is not None:
+            self.session.close()
+            return
+        net_loop().close(self._transport)
         try:
             self._sock.close()
         except OSError:
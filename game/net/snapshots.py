@@ -4,10 +4,12 @@
 # Building and applying world snapshots.
 # Host: collects players, enemies, and pickups into a serializable dict.
 # Client: applies that dict to proxy entities (RemoteEntity) for enemies/pickups.
+# Quantization: the steps positions/hp are rounded to and the enum tables the
+# binary codec packs facing/clip with.
 
 from __future__ import annotations
 
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, fields
 from typing import List, Dict, Any, Optional
 
 from game.world.components import (
@@ -21,7 +23,10 @@ from game.world.components import (
     AI,
     Pickup,
     RemoteEntity,
+    RemoteIndex,
+    SnapshotCache,
     ActiveMapId,
+    Map,
     OnMap,
     Score,
     SoundRequest,
@@ -31,6 +36,70 @@ from game.world.components import (
 
 from game.world.maps.map_factory import create_or_activate, resolve_map_hint_to_id
 
+
+# quantization ############################################################
+# records are rounded on the host to what the binary codec (game/net/codec.py)
+# packs as small integers, so a snapshot means the same on either codec:
+#   - x/y: fixed point in 1/POSITION_STEPS px from the map's top-left corner,
+#     shifted by POSITION_MARGIN for anything knocked past the edge
+#     (u16: -512 .. 3583 px; the biggest map is 1280 px). error <= 1/32 px.
+#     the frame is the same for every map, so maps are checked against it
+#     when they load (check_map_fits)
+#   - hp: in 1/HP_STEPS steps (i16)
+#   - facing: index into FACINGS, clip: index into the clip table built from
+#     data/sprites/atlases.json (u8 each)
+POSITION_STEPS = 16
+POSITION_MARGIN = 512
+POSITION_MAX = 0xFFFF
+HP_STEPS = 4
+HP_MIN, HP_MAX = -0x8000, 0x7FFF
+FACINGS = ("up", "down", "left", "right")
+
+
+def quantize_position(v: float) -> int:
+    q = round((v + POSITION_MARGIN) * POSITION_STEPS)
+    return 0 if q < 0 else POSITION_MAX if q > POSITION_MAX else q
+
+
+def dequantize_position(q: int) -> float:
+    return q / POSITION_STEPS - POSITION_MARGIN
+
+
+# raises ValueError for a map whose positions (plus the margin past its far
+# edges) the fixed frame can't hold; they would be clamped on the wire
+def check_map_fits(m: Map) -> None:
+    tmx = m.tmx_data
+    if tmx is None:
+        return
+    width = tmx.width * tmx.tilewidth
+    height = tmx.height * tmx.tileheight
+    most = POSITION_MAX / POSITION_STEPS - 2 * POSITION_MARGIN
+    if width > most or height > most:
+        raise ValueError(
+            f"map {m.id or m.name} is {width}x{height} px, but snapshot positions "
+            f"cover at most {most:.0f} px per side (POSITION_STEPS / POSITION_MARGIN "
+            f"in game/net/snapshots.py)"
+        )
+
+
+def quantize_hp(hp: float) -> int:
+    q = round(hp * HP_STEPS)
+    return HP_MIN if q < HP_MIN else HP_MAX if q > HP_MAX else q
+
+
+def dequantize_hp(q: int) -> float:
+    return q / HP_STEPS
+
+
+# every clip name any atlas has, sorted. the host sends its table in WELCOME,
+# so clients index with the host's list even if their data differs
+def build_clip_table() -> List[str]:
+    from game.core.resources import atlases
+    return sorted({clip for atlas in atlases.values() for clip in atlas.get("clips", {})})
+
+
+# record schemas: build_world_snapshot writes plain dicts with these fields
+# (in this order) straight from the components, no dataclass per entity
 @dataclass
 class PlayerSnapshot:
     peer_id: str
@@ -42,6 +111,7 @@ class PlayerSnapshot:
     hp: float
     map_id: Optional[str] = None
     score: int = 0
+    input_tick: int = 0  # last client input tick applied to this player (prediction)
 
 
 @dataclass
@@ -67,14 +137,6 @@ class PickupSnapshot:
     map_id: Optional[str] = None
 
 
-@dataclass
-class WorldSnapshot:
-    tick: int
-    map_id: Optional[str]
-    players: List[PlayerSnapshot]
-    enemies: List[EnemySnapshot]
-    pickups: List[PickupSnapshot]
-
 @dataclass
 class SoundEventSnapshot:
     event: str
@@ -85,86 +147,132 @@ class SoundEventSnapshot:
     peer_id: str | None
 
 
+PLAYER_FIELDS = tuple(f.name for f in fields(PlayerSnapshot))
+ENEMY_FIELDS = tuple(f.name for f in fields(EnemySnapshot))
+PICKUP_FIELDS = tuple(f.name for f in fields(PickupSnapshot))
+
+
 # host-side ###############################################################
 
+# SnapshotCache singleton for this world (created on first use)
+def _snapshot_cache(world) -> SnapshotCache:
+    cache = world.singleton(SnapshotCache)
+    if cache is None:
+        cache = SnapshotCache()
+        world.set_singleton(cache)
+    return cache
+
+# (last build's key map, this build's key map, output list) for a category.
+# the map from the build before last and last build's output list are cleared
+# and refilled; only changed records are new objects
+def _scratch(cache: SnapshotCache, category: str):
+    old = cache.records.get(category)
+    if old is None:
+        old = {}
+    new = cache.spare.get(category)
+    if new is None:
+        new = {}
+    new.clear()
+    cache.records[category] = new
+    cache.spare[category] = old
+    out = cache.lists.get(category)
+    if out is None:
+        out = cache.lists[category] = []
+    out.clear()
+    return old, new, out
+
+# record for `values` (in `names` order): last build's dict if nothing changed
+def _record(old: Dict[Any, Any], new: Dict[Any, Any], key: Any, values: tuple, names: tuple) -> Dict[str, Any]:
+    cached = old.get(key)
+    if cached is not None and cached[0] == values:
+        new[key] = cached
+        return cached[1]
+    rec = dict(zip(names, values))
+    new[key] = (values, rec)
+    return rec
+
 # gets current presentation state for players, enemies, and pickups into a serializable dict
 # called on the Host
 # map geometry not serialized because both host and clients load the same TMX map blueprint
-def build_world_snapshot(world, tick: int) -> Dict[str, Any]:
+# input_ticks: peer_id -> last input tick the host has applied for that peer
+#
+# records of entities that didn't change are the same dict objects as in the
+# previous snapshot: treat them as read-only (delta baselines keep them for
+# SnapshotHistory's whole ring, so a changed entity always gets a new dict).
+# the players/enemies/pickups lists are refilled by the next build: copy them
+# to keep them past that. positions and hp are quantized (see above)
+def build_world_snapshot(world, tick: int, input_ticks: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
     # Host's currently active map id 
-    host_map_id: Optional[str] = None
-    for _eid, comps in world.query(ActiveMapId):
-        host_map_id = comps[ActiveMapId].id
-        break
+    am = world.singleton(ActiveMapId)
+    host_map_id: Optional[str] = am.id if am is not None else None
+    cache = _snapshot_cache(world)
+    # quantization inlined (see quantize_position): this runs for every entity
+    # every snapshot tick. off-map values are clamped by the codec
+    steps, margin = float(POSITION_STEPS), float(POSITION_MARGIN)
 
     # Players ################################################################
-    players: List[PlayerSnapshot] = []
-    for _eid, comps in world.query(PlayerTag, Owner, Transform, Facing, AnimationState, Life):
-        owner: Owner = comps[Owner]
+    input_ticks = input_ticks or {}
+    old, new, players = _scratch(cache, "players")
+    for _eid, comps in world.view(PlayerTag, Owner, Transform, Facing, AnimationState, Life):
+        peer_id = comps[Owner].peer_id
         tr: Transform = comps[Transform]
-        facing: Facing = comps[Facing]
         anim: AnimationState = comps[AnimationState]
-        life: Life = comps[Life]
-        om: OnMap | None = world.get(_eid, OnMap)
-        score = world.get(_eid, Score)
-
-        players.append(PlayerSnapshot(
-            peer_id=owner.peer_id,
-            x=tr.x,
-            y=tr.y,
-            facing=facing.direction,
-            clip=anim.clip,
-            frame=anim.frame,
-            hp=life.hp,
-            map_id=getattr(om, "id", None),
-            score=score.points if score else 0,
-        ))
+        om: OnMap | None = comps.get(OnMap)
+        score = comps.get(Score)
+
+        players.append(_record(old, new, peer_id, (
+            peer_id,
+            round((tr.x + margin) * steps) / steps - margin,
+            round((tr.y + margin) * steps) / steps - margin,
+            comps[Facing].direction,
+            anim.clip,
+            anim.frame,
+            round(comps[Life].hp * HP_STEPS) / HP_STEPS,
+            om.id if om is not None else None,
+            score.points if score else 0,
+            input_ticks.get(peer_id, 0),
+        ), PLAYER_FIELDS))
 
     # Enemies #################################################################
-    enemies: List[EnemySnapshot] = []
-    for eid, comps in world.query(AI, Life, Transform, Facing, AnimationState, Sprite):
+    old, new, enemies = _scratch(cache, "enemies")
+    for eid, comps in world.view(AI, Life, Transform, Facing, AnimationState, Sprite):
         if PlayerTag in comps:
             continue  # skip any weird player+AI hybrids
 
         tr: Transform = comps[Transform]
-        facing: Facing = comps[Facing]
         anim: AnimationState = comps[AnimationState]
-        life: Life = comps[Life]
-        spr: Sprite = comps[Sprite]
-        om: OnMap | None = world.get(eid, OnMap)
-
-        enemies.append(EnemySnapshot(
-            id=eid,
-            x=tr.x,
-            y=tr.y,
-            facing=facing.direction,
-            clip=anim.clip,
-            frame=anim.frame,
-            hp=life.hp,
-            atlas_id=spr.atlas_id,
-            map_id=getattr(om, "id", None),
-        ))
+        om: OnMap | None = comps.get(OnMap)
+
+        enemies.append(_record(old, new, eid, (
+            eid,
+            round((tr.x + margin) * steps) / steps - margin,
+            round((tr.y + margin) * steps) / steps - margin,
+            comps[Facing].direction,
+            anim.clip,
+            anim.frame,
+            round(comps[Life].hp * HP_STEPS) / HP_STEPS,
+            comps[Sprite].atlas_id,
+            om.id if om is not None else None,
+        ), ENEMY_FIELDS))
 
     # Pickups ####################################################
-    pickups: List[PickupSnapshot] = []
-    for eid, comps in world.query(Pickup, Transform, Sprite):
+    old, new, pickups = _scratch(cache, "pickups")
+    for eid, comps in world.view(Pickup, Transform, Sprite):
         tr: Transform = comps[Transform]
-        p: Pickup = comps[Pickup]
-        spr: Sprite = comps[Sprite]
-        om: OnMap | None = world.get(eid, OnMap)
-
-        pickups.append(PickupSnapshot(
-            id=eid,
-            x=tr.x,
-            y=tr.y,
-            kind=p.kind,
-            atlas_id=spr.atlas_id,
-            map_id=getattr(om, "id", None),
-        ))
+        om: OnMap | None = comps.get(OnMap)
+
+        pickups.append(_record(old, new, eid, (
+            eid,
+            round((tr.x + margin) * steps) / steps - margin,
+            round((tr.y + margin) * steps) / steps - margin,
+            comps[Pickup].kind,
+            comps[Sprite].atlas_id,
+            om.id if om is not None else None,
+        ), PICKUP_FIELDS))
     
     # sound requests ###########################################
     sound_events: list[dict[str, Any]] = []
-    for eid, comps in world.query(SoundRequest):
+    for eid, comps in world.view(SoundRequest):
         req: SoundRequest = comps[SoundRequest]
 
         # classify source
@@ -192,34 +300,45 @@ def build_world_snapshot(world, tick: int) -> Dict[str, Any]:
             "peer_id": peer_id,
         })
 
-    snapshot = WorldSnapshot(
-        tick=tick,
-        map_id=host_map_id,
-        players=players,
-        enemies=enemies,
-        pickups=pickups,
-    )
-
     return {
-        "tick": snapshot.tick,
-        "map_id": snapshot.map_id,
-        "players": [asdict(p) for p in snapshot.players],
-        "enemies": [asdict(e) for e in snapshot.enemies],
-        "pickups": [asdict(p) for p in snapshot.pickups],
+        "tick": tick,
+        "map_id": host_map_id,
+        "players": players,
+        "enemies": enemies,
+        "pickups": pickups,
         "sound_events": sound_events,
     }
 
 
 # client-side utilities ################################################
 
+# RemoteIndex singleton for this world (created on first use)
+def _remote_index(world) -> RemoteIndex:
+    index = world.singleton(RemoteIndex)
+    if index is None:
+        index = RemoteIndex()
+        world.set_singleton(index)
+    return index
+
+# component dict of the proxy indexed under (category, remote_id), or None
+# if there isn't one (or it was deleted behind the index's back)
+def _indexed_remote(world, index: RemoteIndex, category: str, remote_id: int):
+    eid = index.remotes.get(category, {}).get(remote_id)
+    if eid is None:
+        return None
+    comps = world.entities.get(eid)
+    if comps is None or RemoteEntity not in comps:
+        del index.remotes[category][remote_id]
+        return None
+    return comps
+
 #  Look up or create a client-side proxy entity representing an enemy owned by the host
 # identified by remote_id
-def _find_or_create_remote_enemy(world, remote_id: int, atlas_id: str):
+def _find_or_create_remote_enemy(world, index: RemoteIndex, remote_id: int, atlas_id: str):
     # see if we already have this one
-    for _eid, comps in world.query(RemoteEntity, Transform, Facing, AnimationState, Sprite, Life):
-        rem: RemoteEntity = comps[RemoteEntity]
-        if rem.category == "enemy" and rem.remote_id == remote_id:
-            return comps
+    comps = _indexed_remote(world, index, "enemy", remote_id)
+    if comps is not None:
+        return comps
 
     # else create a new proxy
     e = world.new_entity()
@@ -230,15 +349,15 @@ def _find_or_create_remote_enemy(world, remote_id: int, atlas_id: str):
     comps[AnimationState] = AnimationState()
     comps[Sprite] = Sprite(atlas_id=atlas_id)
     comps[Life] = Life()
+    index.remotes.setdefault("enemy", {})[remote_id] = e
 
     return comps
 
 # Look up or create a client-side proxy entity representing a pickup owned by the host.
-def _find_or_create_remote_pickup(world, remote_id: int, atlas_id: str, kind: str):
-    for _eid, comps in world.query(RemoteEntity, Transform, Sprite, Pickup):
-        rem: RemoteEntity = comps[RemoteEntity]
-        if rem.category == "pickup" and rem.remote_id == remote_id:
-            return comps
+def _find_or_create_remote_pickup(world, index: RemoteIndex, remote_id: int, atlas_id: str, kind: str):
+    comps = _indexed_remote(world, index, "pickup", remote_id)
+    if comps is not None:
+        return comps
 
     e = world.new_entity()
     comps = world.components_of(e)
@@ -246,18 +365,46 @@ def _find_or_create_remote_pickup(world, remote_id: int, atlas_id: str, kind: st
     comps[Transform] = Transform(x=0.0, y=0.0)
     comps[Sprite] = Sprite(atlas_id=atlas_id)
     comps[Pickup] = Pickup(kind=kind)
+    index.remotes.setdefault("pickup", {})[remote_id] = e
     return comps
 
 # remove any RemoteEntity entities of the given category that are no longer in the latest snapshot
-def _cleanup_remote_category(world, category: str, ids_in_snapshot: set[int]) -> None:
-    to_delete: List[int] = []
-    for eid, comps in world.query(RemoteEntity):
-        rem: RemoteEntity = comps[RemoteEntity]
-        if rem.category == category and rem.remote_id not in ids_in_snapshot:
-            to_delete.append(eid)
-
-    for eid in to_delete:
-        world.delete_entity(eid)
+def _cleanup_remote_category(world, index: RemoteIndex, category: str, ids_in_snapshot: set[int]) -> None:
+    by_id = index.remotes.get(category)
+    if not by_id:
+        return
+    to_delete = [rid for rid in by_id if rid not in ids_in_snapshot]
+
+    for rid in to_delete:
+        world.delete_entity(by_id.pop(rid))
+
+# local entity for a player, by peer_id
+# players are spawned by the scene, not here, so a miss rebuilds the peer
+# index from the player view once and tries again
+_PLAYER_TYPES = (PlayerTag, Owner, Transform, Facing, AnimationState, Life)
+
+def _find_player(world, index: RemoteIndex, peer_id: str):
+    eid = index.players.get(peer_id)
+    if eid is not None:
+        comps = world.entities.get(eid)
+        if comps is not None and all(ct in comps for ct in _PLAYER_TYPES) and comps[Owner].peer_id == peer_id:
+            return eid, comps
+
+    # a miss only means something if players came or went since the last
+    # rebuild; otherwise the peer has no player here (yet)
+    view = world.view(*_PLAYER_TYPES)
+    if view.version == index.players_version:
+        return None, None
+    players = index.players
+    players.clear()
+    for eid, comps in view:
+        players.setdefault(comps[Owner].peer_id, eid)
+    index.players_version = view.version
+
+    eid = players.get(peer_id)
+    if eid is None:
+        return None, None
+    return eid, world.entities[eid]
 
 
 # client-side main entry ##############################################################
@@ -266,6 +413,7 @@ def _cleanup_remote_category(world, category: str, ids_in_snapshot: set[int]) ->
 def apply_world_snapshot(world, msg: Dict[str, Any], my_peer_id: str) -> None:
     # Map id is informational. actual map geometry should be loaded by the scene.
     pending_map_switch = None
+    index = _remote_index(world)
     # Players #############################
     players_data = msg.get("players", [])
 
@@ -276,11 +424,8 @@ def apply_world_snapshot(world, msg: Dict[str, Any], my_peer_id: str) -> None:
         
         snapshot_map_id = pdata.get("map_id")
 
-        for eid, comps in world.query(PlayerTag, Owner, Transform, Facing, AnimationState, Life):
-            owner: Owner = comps[Owner]
-            if owner.peer_id != peer_id:
-                continue
-            
+        eid, comps = _find_player(world, index, peer_id)
+        if comps is not None:
             tr: Transform = comps[Transform]
             facing: Facing = comps[Facing]
             anim: AnimationState = comps[AnimationState]
@@ -346,10 +491,7 @@ def apply_world_snapshot(world, msg: Dict[str, Any], my_peer_id: str) -> None:
                 anim.time = 0.0
                 anim.frame = 0
                 anim.changed = True
-            
-            # found matching entity so stop scanning
-            break
-        
+
         if pending_map_switch is not None:
             target_id = resolve_map_hint_to_id(pending_map_switch) or pending_map_switch
             create_or_activate(world, target_id)
@@ -367,7 +509,7 @@ def apply_world_snapshot(world, msg: Dict[str, Any], my_peer_id: str) -> None:
         enemy_ids_in_snapshot.add(rid)
 
         atlas_id = edata.get("atlas_id", "enemy.chort")
-        comps = _find_or_create_remote_enemy(world, rid, atlas_id)
+        comps = _find_or_create_remote_enemy(world, index, rid, atlas_id)
 
         tr: Transform = comps[Transform]
         facing: Facing = comps[Facing]
@@ -392,7 +534,7 @@ def apply_world_snapshot(world, msg: Dict[str, Any], my_peer_id: str) -> None:
             else:
                 comps[OnMap] = OnMap(id=snapshot_map_id)
 
-    _cleanup_remote_category(world, "enemy", enemy_ids_in_snapshot)
+    _cleanup_remote_category(world, index, "enemy", enemy_ids_in_snapshot)
 
     # Pickups #########################################################
     pickups_data = msg.get("pickups", [])
@@ -407,7 +549,7 @@ def apply_world_snapshot(world, msg: Dict[str, Any], my_peer_id: str) -> None:
 
         kind = pdata.get("kind", "potion_health")
         atlas_id = pdata.get("atlas_id", kind)
-        comps = _find_or_create_remote_pickup(world, rid, atlas_id, kind)
+        comps = _find_or_create_remote_pickup(world, index, rid, atlas_id, kind)
 
         tr: Transform = comps[Transform]
         tr.x = float(pdata.get("x", tr.x))
@@ -422,7 +564,7 @@ def apply_world_snapshot(world, msg: Dict[str, Any], my_peer_id: str) -> None:
             else:
                 comps[OnMap] = OnMap(id=snapshot_map_id)
 
-    _cleanup_remote_category(world, "pickup", pickup_ids_in_snapshot)
+    _cleanup_remote_category(world, index, "pickup", pickup_ids_in_snapshot)
 
     # Sound Requests #####################################################
     sound_events = msg.get("sound_events", [])
@@ -438,19 +580,11 @@ def apply_world_snapshot(world, msg: Dict[str, Any], my_peer_id: str) -> None:
 
         if source_kind == "enemy" and host_id is not None:
             # map host enemy id to RemoteEntity enemy
-            for _eid, comps in world.query(RemoteEntity, Transform, Sprite, Life):
-                rem: RemoteEntity = comps[RemoteEntity]
-                if rem.category == "enemy" and rem.remote_id == host_id:
-                    target_comps = comps
-                    break
+            target_comps = _indexed_remote(world, index, "enemy", host_id)
 
         elif source_kind == "player" and peer_id is not None:
             # map peer_id to local PlayerTag entity
-            for _eid, comps in world.query(PlayerTag, Owner, Transform, Life):
-                owner: Owner = comps[Owner]
-                if owner.peer_id == peer_id:
-                    target_comps = comps
-                    break
+            _eid, target_comps = _find_player(world, index, peer_id)
         
         else:
             # global sound event
@@ -0,0 +1,141 @@
+# class: NetLoop
+
+# asyncio network transport
+#
+# the game loop used to poll its UDP sockets every frame and decode whatever
+# was there on the simulation thread; discovery ran two more threads polling
+# with timeouts. now one asyncio event loop, on a background thread, serves
+# every socket in the process (NetServer, NetClient, both discoveries):
+#   - an Inbox (DatagramProtocol) strips the ack header and decodes each
+#     datagram as it arrives, on the loop thread, and appends the result to a
+#     deque. deque append/popleft are atomic, so the game thread drains it
+#     without locks and only sees decoded messages
+#   - the codec is looked up per datagram with the owner's codec_for(addr),
+#     i.e. whatever it was when the datagram arrived. a datagram that didn't
+#     decode then (binary snapshots right behind the WELCOME that sets up the
+#     codec) is tried again when it's drained, after everything before it
+#   - sends stay on the game thread: they go straight to the socket (or its
+#     NetSim wrapper), which is safe next to the loop's reads
+#   - reliability, reassembly and everything else stays on the game thread
+#
+# this does not save CPU: decoding on the loop thread still holds the GIL,
+# so the game thread waits while it runs. what it buys is latency. a
+# datagram is read and decoded when it arrives, not at the next frame's
+# poll, and the game thread gets it ready to use. decode work only leaves
+# the game process with sessions in worker processes (server/sessions.py)
+#
+# one loop for all of them means a process can run several sessions (and
+# their discovery) without a thread per socket
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Iterator, Optional, Tuple
+
+from game.net.codec import decode_message
+from game.net.reliable import unframe
+
+Address = Tuple[str, int]
+
+# (addr, arrival perf_counter time, epoch, ack, bits, payload,
+#  message or None if it didn't decode yet)
+Inbound = Tuple[Address, float, Optional[int], int, int, bytes, Optional[dict]]
+
+# datagrams held for the game thread; when it stalls, the oldest go
+INBOX_MAX = 4096
+# how long closing a socket waits for the loop (s)
+CLOSE_TIMEOUT = 1.0
+
+
+class Inbox(asyncio.DatagramProtocol):
+    def __init__(self, codec_for: Callable[[Address], Any]) -> None:
+        self.codec_for = codec_for
+        self.queue: Deque[Inbound] = deque(maxlen=INBOX_MAX)
+        self.transport = None
+
+    # loop thread ##############################################################
+
+    def connection_made(self, transport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr: Address) -> None:
+        epoch, ack, bits, payload = unframe(data)
+        msg = None
+        if payload:
+            try:
+                msg = decode_message(payload, self.codec_for(addr))
+            except Exception:
+                pass
+        self.queue.append((addr, time.perf_counter(), epoch, ack, bits, payload, msg))
+
+    # ICMP errors (port unreachable, ...) on a UDP socket: nothing to do
+    def error_received(self, exc: Exception) -> None:
+        return
+
+    # game thread ##############################################################
+
+    # everything received so far, oldest first: (addr, arrived at, epoch, ack,
+    # bits, msg). msg is None for ack-only datagrams; ones that still don't
+    # decode are dropped
+    def drain(self) -> Iterator[Tuple[Address, float, Optional[int], int, int, Optional[dict]]]:
+        queue = self.queue
+        for _ in range(len(queue)):
+            addr, at, epoch, ack, bits, payload, msg = queue.popleft()
+            if payload and msg is None:
+                try:
+                    msg = decode_message(payload, self.codec_for(addr))
+                except Exception:
+                    continue
+            yield addr, at, epoch, ack, bits, msg
+
+
+# the event loop thread shared by every socket in the process
+class NetLoop:
+    def __init__(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="net-loop", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    # run a coroutine on the loop and wait for its result
+    def call(self, coro, timeout: Optional[float] = None):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    # serve a bound socket with `protocol`; returns the transport
+    def open(self, sock, protocol: asyncio.DatagramProtocol):
+        transport, _protocol = self.call(self.loop.create_datagram_endpoint(lambda: protocol, sock=sock))
+        return transport
+
+    # close a transport (and its socket) and wait until the socket is gone
+    def close(self, transport) -> None:
+        if transport is None or self.loop.is_closed():
+            return
+        try:
+            self.call(_close(transport), CLOSE_TIMEOUT)
+        except Exception:
+            pass
+
+
+async def _close(transport) -> None:
+    transport.close()
+    # the socket is closed in a callback the close just scheduled
+    await asyncio.sleep(0)
+
+
+_loop: Optional[NetLoop] = None
+_loop_lock = threading.Lock()
+
+
+# the process-wide NetLoop, started on first use
+def net_loop() -> NetLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = NetLoop()
+        return _loop
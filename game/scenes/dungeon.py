@@ -13,6 +13,8 @@ from game.scenes.base import Scene
 import pygame
 from pygame import Surface
 import math
+import os
+import time
 from game.core.config import Config
 
 from game.world.world import World
@@ -40,16 +42,18 @@ from game.world.systems.camera_clamp import CameraClampSystem
 from game.world.systems.viewpoint_active_map import ViewpointActiveMapSystem
 from game.world.systems.lifespan import LifeSpanSystem
 from game.world.systems.death import death
-from game.world.systems.sound import SoundSystem
+from game.world.systems.sound import SoundSystem, SoundRequestDrainSystem
 from game.world.systems.scoring import ScoringSystem
 from game.world.systems.hud_render import HudRenderSystem
+from game.world.systems.profiler_overlay import ProfilerOverlaySystem
+from game.core.profiler import TickProfiler
 from game.world.systems.projectile import ProjectileSpawnSystem
 
 # net
 from game.world.systems.net_host import NetHostSystem
 from game.world.systems.net_client import NetClientSystem
 from game.world.systems.net_smoothing import NetSmoothingSystem
-from game.net.context import net
+from game.net.context import net, NetworkContext
 from game.net.server import NetServer
 from game.net.client import NetClient
 from game.net.protocol import MSG_START_GAME
@@ -60,17 +64,24 @@ from game.world.maps.map_blueprint import build_Map_component
 from game.world.maps.map_factory import create_or_activate, resolve_map_hint_to_id
 
 class DungeonScene(Scene):
-    def __init__(self, scene_manager, role, spawn_requests: list[SpawnRequest] | None = None) -> None:
+    def __init__(self, scene_manager, role, spawn_requests: list[SpawnRequest] | None = None,
+                 headless: bool = False, context: NetworkContext | None = None) -> None:
         # So we can swap back to TitleScene when quitting from pause menu
         self.scene_manager = scene_manager
 
         self.world = World()
         self.role = role.upper()
+        # headless = dedicated server (server/sessions.py): no local input,
+        # camera, audio or drawing, only the simulation + NetHostSystem
+        self.headless = headless
+        # networking context: the global one, or a dedicated server session's own
+        self.net = context if context is not None else net
         self.render = RenderSystem()
         self.hud = HudRenderSystem()
+        self.profiler_overlay = ProfilerOverlaySystem()
         self.spawn_requests: list[SpawnRequest] = spawn_requests or []
         self.player_id: int | None = None
-        net.role = self.role
+        self.net.role = self.role
 
         # Pause menu UI / state
         pygame.font.init()
@@ -84,6 +95,10 @@ class DungeonScene(Scene):
         self._prev_menu_accept = False
         self._prev_menu_back = False
 
+        # profiler: F3 toggles timing + overlay, F4 exports CSV/JSON
+        self._prev_profiler_toggle = False
+        self._prev_profiler_export = False
+
         # Death / game-over state
         self._game_over = False
         self._saw_any_player = False  # becomes True once at least one player has spawned
@@ -91,27 +106,21 @@ class DungeonScene(Scene):
     def enter(self) -> None:
         # initial map, or pick a fixed id 
         load_registry(resource_path("data/map_registry.json"))
-        map_id = net.lobby_data.get("map_id") if isinstance(net.lobby_data, dict) else None
+        map_id = self.net.lobby_data.get("map_id") if isinstance(self.net.lobby_data, dict) else None
         if map_id is None:
             mi = pick(require_all=["tier1"])
             map_id = mi.id
         create_or_activate(self.world, map_id)
 
         # global pausee controller
-        has_pause = False
-        for _eid, _comps in self.world.query(PauseState):
-            has_pause = True
-            break
-        if not has_pause:
-            peid = self.world.new_entity()
-            self.world.add(peid, PauseState())
+        if self.world.singleton(PauseState) is None:
+            self.world.set_singleton(PauseState())
 
         # Scene/run policy for SpawnSystem (gameplay)
         has_lobby_spawns = bool(self.spawn_requests)
         spawn_player = (self.role == "SOLO" and not has_lobby_spawns)
 
-        e = self.world.new_entity()
-        self.world.add(e, SpawnPolicy(
+        self.world.set_singleton(SpawnPolicy(
             run_title_spawns=False,
             run_game_spawns=True,
             spawn_player=spawn_player,          
@@ -143,6 +152,8 @@ class DungeonScene(Scene):
                 death(),
                 ProjectileSpawnSystem(),
             ]
+            if self.headless:
+                self._strip_presentation_systems()
             if self.role == "HOST":
                 self._attach_host_net_singleton()
         elif self.role == "CLIENT":
@@ -190,6 +201,22 @@ class DungeonScene(Scene):
         elif self.role in ("HOST", "CLIENT"):
             self._spawn_players_from_net_lobby()
 
+    # drop everything that only matters to a local player on a screen
+    # SoundSystem is swapped for a drain so SoundRequests are still consumed
+    def _strip_presentation_systems(self) -> None:
+        presentation = (
+            InputSystem, EnsureCameraSystem, CameraBootstrapSystem,
+            CameraFollowSystem, CameraClampSystem, ViewpointActiveMapSystem,
+        )
+        systems = []
+        for sys in self.world.systems:
+            if isinstance(sys, presentation):
+                continue
+            if isinstance(sys, SoundSystem):
+                sys = SoundRequestDrainSystem()
+            systems.append(sys)
+        self.world.systems = systems
+
     # method to release resources
     def exit(self) -> None:
         pass
@@ -200,11 +227,34 @@ class DungeonScene(Scene):
             if hasattr(system, "handle_event"):
                 system.handle_event(event)
 
+    def _update_profiler_keys(self) -> None:
+        """F3 toggles the tick profiler and its overlay, F4 exports it."""
+        keys = pygame.key.get_pressed()
+
+        toggle = keys[pygame.K_F3]
+        if toggle and not self._prev_profiler_toggle:
+            if self.world.profiler is None:
+                self.world.profiler = TickProfiler()
+            else:
+                self.world.profiler.enabled = not self.world.profiler.enabled
+        self._prev_profiler_toggle = toggle
+
+        export = keys[pygame.K_F4]
+        if export and not self._prev_profiler_export and self.world.profiler is not None:
+            self._export_profile()
+        self._prev_profiler_export = export
+
+    def _export_profile(self) -> None:
+        out_dir = os.path.join(os.getcwd(), "profiles")
+        os.makedirs(out_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        base = os.path.join(out_dir, f"profile_{self.role.lower()}_{stamp}")
+        self.world.profiler.to_csv(base + ".csv")
+        self.world.profiler.to_json(base + ".json", include_samples=True)
+        print(f"[DungeonScene] profiler written to {base}.csv/.json")
+
     def _get_pause_state(self) -> PauseState | None:
-        # Find PauseState attached to the LocalControlled player
-        for _eid, comps in self.world.query(PauseState):
-            return comps[PauseState]
-        return None
+        return self.world.singleton(PauseState)
 
     def _update_pause(self, dt: float) -> None:
         """Handle pause toggle + pause menu using direct keyboard input."""
@@ -285,13 +335,14 @@ class DungeonScene(Scene):
         self._prev_menu_back = back
 
 
+    @property
+    def game_over(self) -> bool:
+        return self._game_over
+
     def _check_full_party_death(self) -> None:
         """Detect when all player entities have been removed (full-party wipe)."""
         # Check if there is currently any PlayerTag in the world
-        has_player_now = False
-        for _eid, _comps in self.world.query(PlayerTag):
-            has_player_now = True
-            break
+        has_player_now = self.world.count(PlayerTag) > 0
 
         if has_player_now:
             # Mark that the run has actually started (we've seen at least one player)
@@ -303,12 +354,16 @@ class DungeonScene(Scene):
     # one fixed simulation step, runs all systems in order
     def update(self, dt: float) -> None:
         # 0) If we've hit game-over, only handle the death screen UI
+        # (a headless server has no UI; it polls game_over instead)
         if self._game_over:
-            self._update_death_screen(dt)
+            if not self.headless:
+                self._update_death_screen(dt)
             return
 
         # 1) Handle local pause/menu input
-        self._update_pause(dt)
+        if not self.headless:
+            self._update_pause(dt)
+            self._update_profiler_keys()
 
         # 2) Check if pause menu requested a quit-to-title
         ps = self._get_pause_state()
@@ -327,8 +382,16 @@ class DungeonScene(Scene):
     # renders all graphics
     def draw(self, surface: Surface) -> None:
         # normal world + HUD
-        self.render.draw(self.world, surface)
-        self.hud.draw(self.world, surface)
+        profiler = self.world.profiler
+        if profiler is not None and profiler.enabled:
+            with profiler.section("RenderSystem.draw", self.world):
+                self.render.draw(self.world, surface)
+            with profiler.section("HudRenderSystem.draw", self.world):
+                self.hud.draw(self.world, surface)
+            self.profiler_overlay.draw(self.world, surface)
+        else:
+            self.render.draw(self.world, surface)
+            self.hud.draw(self.world, surface)
 
         if self._game_over:
             # Death screen over everything
@@ -453,10 +516,8 @@ class DungeonScene(Scene):
 
     def _find_active_map_and_spawn_pos(self) -> tuple[str | None, float, float]:
         # Find active map id
-        active_id = None
-        for _, comps in self.world.query(ActiveMapId):
-            active_id = comps[ActiveMapId].id
-            break
+        am = self.world.singleton(ActiveMapId)
+        active_id = am.id if am is not None else None
 
         bp = None
         for _, comps in self.world.query(Map):
@@ -526,10 +587,10 @@ class DungeonScene(Scene):
         Spawns players in a compact 2-column grid on adjacent tiles.
         """
         heroes_by_peer = {}
-        if isinstance(net.lobby_data, dict):
-            heroes_by_peer = net.lobby_data.get("heroes", {}) or {}
+        if isinstance(self.net.lobby_data, dict):
+            heroes_by_peer = self.net.lobby_data.get("heroes", {}) or {}
         if not heroes_by_peer:
-            heroes_by_peer = {net.my_peer_id: "hero.knight_blue"}
+            heroes_by_peer = {self.net.my_peer_id: "hero.knight_blue"}
 
         active_id, base_x, base_y = self._find_active_map_and_spawn_pos()
 
@@ -568,7 +629,7 @@ class DungeonScene(Scene):
             if active_id is not None:
                 self.world.add(eid, OnMap(id=active_id))
 
-            if peer_id == net.my_peer_id:
+            if peer_id == self.net.my_peer_id:
                 self.world.add(eid, LocalControlled())
                 self.player_id = eid
 
@@ -576,17 +637,16 @@ class DungeonScene(Scene):
     def _attach_host_net_singleton(self) -> None:
         """Create or reuse the host UDP server and attach NetHostState."""
         # Create server only once per run:
-        if net.server is None:
-            #  port 
-            net.server = NetServer(port=5000)
-            net.my_peer_id = "host"
+        if self.net.server is None:
+            self.net.server = NetServer(port=Config.NET_PORT)
+            self.net.my_peer_id = "host"
 
         # Attach ECS components
         e = self.world.new_entity()
-        self.world.add(e, NetIdentity(my_peer_id=net.my_peer_id, role="HOST"))
+        self.world.add(e, NetIdentity(my_peer_id=self.net.my_peer_id, role="HOST"))
         self.world.add(e, NetHostState(
-            server=net.server,
-            peers=net.peers,
+            server=self.net.server,
+            peers=self.net.peers,
         ))
 
         # NetHostSystem needs to run after all sound request producing systems but before SoundSystem
@@ -598,18 +658,18 @@ class DungeonScene(Scene):
         """Attach NetClientState to the existing NetClient that was created in HubScene"""
         # HubScene(JOIN) already created net.client and did the HELLO/WELCOME handshake.
         # If that didn't happen, we can't safely connect here
-        if net.client is None:
+        if self.net.client is None:
             print("[DungeonScene] Warning: net.client is None; "
                   "Client must join via HubScene first.")
             return
         
         # If there is still not a peer id, mark as pending
-        if not net.my_peer_id:
-            net.my_peer_id = "client_pending"
+        if not self.net.my_peer_id:
+            self.net.my_peer_id = "client_pending"
 
         e = self.world.new_entity()
-        self.world.add(e, NetIdentity(my_peer_id=net.my_peer_id, role="CLIENT"))
-        self.world.add(e, NetClientState(client=net.client))
+        self.world.add(e, NetIdentity(my_peer_id=self.net.my_peer_id, role="CLIENT"))
+        self.world.add(e, NetClientState(client=self.net.client))
 
         # NetClientSystem runs before animation/render
         for idx, sys in enumerate(self.world.systems):
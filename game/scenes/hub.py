@@ -43,6 +43,7 @@ from game.net.context import net
 from game.net.discovery import HostDiscovery, ClientDiscovery
 from game.net.server import NetServer
 from game.net.client import NetClient
+from game.net.lobby import LobbyHost
 from game.net.protocol import (
     PROTOCOL_VERSION,
     MSG_HELLO,
@@ -118,6 +119,9 @@ class HubScene(Scene):
         self.host_discovery: HostDiscovery | None = None
         self.client_discovery: ClientDiscovery | None = None
 
+        # host side of the lobby protocol, HOST mode only
+        self.lobby_host: LobbyHost | None = None
+
     # -------------------------------------------------------------------------
     # Scene life cycle
     # -------------------------------------------------------------------------
@@ -177,7 +181,7 @@ class HubScene(Scene):
         # discovery
         if self.mode == "HOST":
             # start discovery responder
-            self.host_discovery = HostDiscovery(game_port=5000, name="GateCrashers Host")
+            self.host_discovery = HostDiscovery(game_port=Config.NET_PORT, name="GateCrashers Host")
         elif self.mode == "JOIN":
             # start discovery broadcaster
             self.client_discovery = ClientDiscovery()
@@ -240,7 +244,7 @@ class HubScene(Scene):
     
         if self.mode == "HOST":
             # host pump game lobby messages and respond to LAN discovery
-            self._host_net_pump()
+            self.lobby_host.pump()
             if self.host_discovery is not None:
                 self.host_discovery.update(dt)
 
@@ -253,10 +257,7 @@ class HubScene(Scene):
                 if self.client_discovery is not None:
                     self.client_discovery.update(dt)
 
-                    hosts_comp: Optional[AvailableHosts] = None
-                    for _, comps in self.world.query(AvailableHosts):
-                        hosts_comp = comps[AvailableHosts]
-                        break
+                    hosts_comp: Optional[AvailableHosts] = self.world.singleton(AvailableHosts)
 
                     if hosts_comp is not None:
                         # fill hosts list from discovery ["ip:port", ...]
@@ -288,7 +289,7 @@ class HubScene(Scene):
         
             # HOST
             elif self.mode == "HOST":
-                if self._all_occupied_slots_ready():
+                if self.lobby_host.all_ready():
                     self._host_start_networked_game()
 
             # JOIN: client waits for MSG_START_GAME from host which is handled in _client_net_pump
@@ -330,9 +331,7 @@ class HubScene(Scene):
     # Helpers: Lobby / slots ############################################################
 
     def _get_lobby_state(self) -> Optional[LobbyState]:
-        for _, comps in self.world.query(LobbyState):
-            return comps[LobbyState]
-        return None
+        return self.world.singleton(LobbyState)
 
     def _iter_slots(self):
         for eid, comps in self.world.query(LobbySlot):
@@ -347,10 +346,7 @@ class HubScene(Scene):
     # JOIN browser ########################################################################
 
     def _handle_join_browser_key(self, lobby_state: LobbyState, key: int) -> None:
-        hosts_comp: Optional[AvailableHosts] = None
-        for _, comps in self.world.query(AvailableHosts):
-            hosts_comp = comps[AvailableHosts]
-            break
+        hosts_comp: Optional[AvailableHosts] = self.world.singleton(AvailableHosts)
 
         if hosts_comp is None:
             return
@@ -373,14 +369,14 @@ class HubScene(Scene):
             # parse "ip:port"
             entry = hosts_comp.hosts[hosts_comp.selected_index]
             ip = "127.0.0.1"    # placeholders
-            port = 5000         #
+            port = Config.NET_PORT  #
             if ":" in entry:
                 ip_str, port_str = entry.split(":", 1)
                 ip = ip_str.strip() or ip
                 try:
                     port = int(port_str)
                 except ValueError:
-                    port = 5000
+                    port = Config.NET_PORT
 
             # stop discovery when a host is chosen
             if self.client_discovery is not None:
@@ -438,173 +434,23 @@ class HubScene(Scene):
     def _init_host_network(self) -> None:
         # Create server socket only once; reuse across scenes
         if net.server is None:
-            net.server = NetServer(port=5000)
+            net.server = NetServer(port=Config.NET_PORT)
         net.my_peer_id = "host"
-
-    def _host_net_pump(self) -> None:
-        server = net.server
-        if server is None:
-            return
-
-        for addr, msg in server.recv_all():
-            mtype = msg.get("type")
-
-            if mtype == MSG_HELLO:
-                self._host_handle_hello(server, addr, msg)
-            elif mtype == MSG_LOBBY_UPDATE:
-                self._host_handle_lobby_update(msg)
-            elif mtype == MSG_START_GAME:
-                # Clients should not send this; ignore.
-                pass
-            elif mtype == MSG_JOIN_DENY:
-                # Not expected on host
-                pass
-
-    def _host_handle_hello(self, server: NetServer, addr: Tuple[str, int], msg: Dict[str, Any]) -> None:
-        # Basic protocol check
-        if int(msg.get("protocol", -1)) != PROTOCOL_VERSION:
-            server.send_raw(addr, {
-                "type": MSG_JOIN_DENY,
-                "reason": "protocol_mismatch",
-            })
-            return
-
-        # Collect currently used peer_ids
-        used_peer_ids = [slot.peer_id for _, slot in self._iter_slots() if slot.peer_id is not None]
-
-        # Deny if full
-        if len(used_peer_ids) >= 5:
-            server.send_raw(addr, {
-                "type": MSG_JOIN_DENY,
-                "reason": "full",
-            })
-            return
-
-        # Assign a new peer id
-        base = "peer"
-        index = 1
-        while f"{base}:{index}" in used_peer_ids:
-            index += 1
-        peer_id = f"{base}:{index}"
-
-        # Find a free slot (not necessarily index 0)
-        free_slot_eid = None
-        free_slot_comp: Optional[LobbySlot] = None
-        for eid, slot in self._iter_slots():
-            if slot.peer_id is None and not slot.is_local:
-                free_slot_eid = eid
-                free_slot_comp = slot
-                break
-
-        if free_slot_comp is None:
-            server.send_raw(addr, {
-                "type": MSG_JOIN_DENY,
-                "reason": "full",
-            })
-            return
-
-        free_slot_comp.peer_id = peer_id
-        free_slot_comp.name = f"Player {free_slot_comp.index + 1}"
-        free_slot_comp.selected_char_index = 0
-        free_slot_comp.ready = False
-        self._refresh_slot_preview(free_slot_eid, free_slot_comp)
-
-        # Register mapping in global context (host)
-        net.peers[peer_id] = addr
-        server.register_peer(peer_id, addr)
-
-        # Send welcome + lobby snapshot
-        server.send_raw(addr, {
-            "type": MSG_WELCOME,
-            "protocol": PROTOCOL_VERSION,
-            "peer_id": peer_id,
-        })
-        server.send_raw(addr, {
-            "type": MSG_LOBBY_STATE,
-            "slots": self._build_lobby_slots_payload(),
-        })
-
-        # Broadcast updated lobby to everyone else
-        server.broadcast({
-            "type": MSG_LOBBY_STATE,
-            "slots": self._build_lobby_slots_payload(),
-        })
-
-    def _host_handle_lobby_update(self, msg: Dict[str, Any]) -> None:
-        peer_id = msg.get("peer_id")
-        if not isinstance(peer_id, str):
-            return
-
-        hero_index = msg.get("hero_index")
-        ready = msg.get("ready")
-
-        for eid, slot in self._iter_slots():
-            if slot.peer_id == peer_id:
-                if hero_index is not None:
-                    try:
-                        hero_index = int(hero_index)
-                    except (TypeError, ValueError):
-                        hero_index = 0
-                    slot.selected_char_index = hero_index % len(self.HERO_CATALOG)
-                    self._refresh_slot_preview(eid, slot)
-                if ready is not None:
-                    slot.ready = bool(ready)
-                break
-
-        if net.server:
-            net.server.broadcast({
-                "type": MSG_LOBBY_STATE,
-                "slots": self._build_lobby_slots_payload(),
-            })
-
-    def _build_lobby_slots_payload(self) -> List[Dict[str, Any]]:
-        payload: List[Dict[str, Any]] = []
-        for _, slot in self._iter_slots():
-            payload.append({
-                "index": slot.index,
-                "peer_id": slot.peer_id,
-                "hero_index": slot.selected_char_index,
-                "ready": slot.ready,
-                "name": slot.name,
-            })
-        return payload
-
-    def _all_occupied_slots_ready(self) -> bool:
-        any_occupied = False
-        for _, slot in self._iter_slots():
-            if slot.peer_id is not None or slot.is_local:
-                any_occupied = True
-                if not slot.ready:
-                    return False
-        return any_occupied
+        # same lobby protocol as the dedicated server (game/net/lobby.py)
+        self.lobby_host = LobbyHost(
+            net,
+            self._iter_slots,
+            self.HERO_CATALOG,
+            on_slot_changed=self._refresh_slot_preview,
+        )
 
     def _host_start_networked_game(self) -> None:
         """
         Host decides to start the game:
-          - Build heroes_by_peer from LobbySlots.
-          - Fill net.lobby_data.
-          - Broadcast START_GAME.
+          - Fill net.lobby_data from the LobbySlots and broadcast START_GAME.
           - Switch to DungeonScene(HOST).
         """
-        heroes_by_peer: Dict[str, str] = {}
-        for _, slot in self._iter_slots():
-            if slot.peer_id is None and not slot.is_local:
-                continue
-            hero_name = self.HERO_CATALOG[slot.selected_char_index % len(self.HERO_CATALOG)]
-            hero_key = f"hero.{hero_name}"
-            pid = slot.peer_id or "host"
-            heroes_by_peer[pid] = hero_key
-
-        net.lobby_data = {
-            "heroes": heroes_by_peer,
-            "map_id": "level1",  # you can pick something else later
-        }
-
-        if net.server:
-            net.server.broadcast({
-                "type": MSG_START_GAME,
-                "lobby": net.lobby_data,
-            })
+        self.lobby_host.start_game("level1")  # you can pick something else later
 
         # Host transitions to DungeonScene(HOST)
         self.scene_manager.set(DungeonScene(self.scene_manager, role="HOST"))
@@ -619,6 +465,7 @@ class HubScene(Scene):
             net.client.send({
                 "type": MSG_HELLO,
                 "protocol": PROTOCOL_VERSION,
+                "codec": Config.NET_CODEC,
                 "name": "Player",
             })
 
@@ -674,7 +521,7 @@ class HubScene(Scene):
     def _send_lobby_update_from_client(self, slot: LobbySlot) -> None:
         if net.client is None:
             return
-        net.client.send({
+        net.client.send_reliable({
             "type": MSG_LOBBY_UPDATE,
             "peer_id": net.my_peer_id,
             "hero_index": slot.selected_char_index,
@@ -700,11 +547,7 @@ class HubScene(Scene):
                 self._send_lobby_update_from_client(slot)
             elif self.mode == "HOST":
                 # host updates everyone
-                if net.server:
-                    net.server.broadcast({
-                        "type": MSG_LOBBY_STATE,
-                        "slots": self._build_lobby_slots_payload(),
-                    })
+                self.lobby_host.broadcast_state()
             
             # register sound for character selection change
             slot_comps = self.world.components_of(slot_eid)
@@ -721,11 +564,7 @@ class HubScene(Scene):
             if self.mode == "JOIN":
                 self._send_lobby_update_from_client(slot)
             elif self.mode == "HOST":
-                if net.server:
-                    net.server.broadcast({
-                    "type": MSG_LOBBY_STATE,
-                    "slots": self._build_lobby_slots_payload(),
-                })
+                self.lobby_host.broadcast_state()
             
             # register sound for character selection change
             slot_comps = self.world.components_of(slot_eid)
@@ -740,11 +579,7 @@ class HubScene(Scene):
             if self.mode == "JOIN":
                 self._send_lobby_update_from_client(slot)
             elif self.mode == "HOST":
-                if net.server:
-                    net.server.broadcast({
-                        "type": MSG_LOBBY_STATE,
-                        "slots": self._build_lobby_slots_payload(),
-                    })
+                self.lobby_host.broadcast_state()
             
             # register sound for character selection change
             slot_comps = self.world.components_of(slot_eid)
@@ -758,11 +593,7 @@ class HubScene(Scene):
             for _, s in self._iter_slots():
                 if s.peer_id is not None or s.is_local:
                     s.ready = True
-            if net.server:
-                net.server.broadcast({
-                    "type": MSG_LOBBY_STATE,
-                    "slots": self._build_lobby_slots_payload(),
-                })
+            self.lobby_host.broadcast_state()
 
     # preview hero entities #################################################################
 
@@ -839,10 +670,7 @@ class HubScene(Scene):
     # Draw JOIN browser ##########################################################################
     
     def _draw_join_browser(self, surface: Surface, lobby_state: LobbyState) -> None:
-        hosts_comp: Optional[AvailableHosts] = None
-        for _, comps in self.world.query(AvailableHosts):
-            hosts_comp = comps[AvailableHosts]
-            break
+        hosts_comp: Optional[AvailableHosts] = self.world.singleton(AvailableHosts)
 
         surface.fill((10, 10, 18))
 
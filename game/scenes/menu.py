@@ -66,19 +66,16 @@ class TitleScene(Scene):
         create_or_activate(self.world, mi.id)
 
         # Title menu singleton
-        eid = self.world.new_entity()
-        self.world.add(eid, TitleMenu(
+        self.world.set_singleton(TitleMenu(
             options=["single_player", "host", "join", "settings", "quit"],
             selected_index=0
         ))
 
         # Intro controller singleton (fade timings are in the component)
-        intro = self.world.new_entity()
-        self.world.add(intro, TitleIntro())
+        self.world.set_singleton(TitleIntro())
 
         # Title-only spawn policy
-        cfg = self.world.new_entity()
-        self.world.add(cfg, SpawnPolicy(
+        self.world.set_singleton(SpawnPolicy(
             run_title_spawns=True,
             run_game_spawns=False,
             spawn_player=False
@@ -153,8 +150,8 @@ class TitleScene(Scene):
         self.world.update(dt)
 
         # if player chose a role, swap scenes
-        for _, comps in self.world.query(TitleMenu):
-            menu: TitleMenu = comps[TitleMenu]
+        menu: TitleMenu | None = self.world.singleton(TitleMenu)
+        if menu is not None:
             if menu.selected_role:
                 if menu.selected_role == "quit":
                     pygame.event.post(pygame.event.Event(pygame.QUIT))
@@ -183,23 +180,21 @@ class TitleScene(Scene):
         self.render.draw(self.world, self._bg_buf)
 
         # Draw current options image into ui buffer (full opacity here)
-        for _, comps in self.world.query(TitleMenu):
-            menu: TitleMenu = comps[TitleMenu]
+        menu: TitleMenu | None = self.world.singleton(TitleMenu)
+        if menu is not None:
             img = self.options_imgs.get(menu.selected_index)
             if img:
                 self._ui_buf.blit(img, (0, 0))
-            break
 
         # Read alphas from TitleIntro
         logo_alpha = 255
         bg_alpha = 255
         phase = "ready"
-        for _, comps in self.world.query(TitleIntro):
-            intro: TitleIntro = comps[TitleIntro]
+        intro: TitleIntro | None = self.world.singleton(TitleIntro)
+        if intro is not None:
             logo_alpha = intro.logo_alpha
             bg_alpha = intro.bg_alpha
             phase = intro.phase
-            break
 
         # 1) Background gameplay 
         self._bg_buf.set_alpha(bg_alpha)
@@ -7,6 +7,12 @@
 # @dataclass decorator with the custom data classes is just a python-style
 # implementation of something like a struct from C,C++. It isnt the same thing
 # memory-wise but it behaves similarly.
+#
+# hot components that exist once per actor and are touched every tick
+# (Transform, Intent, Movement, AnimationState, Life, HitboxSize, AI) use
+# slots=True: no per-instance __dict__, smaller objects, faster attribute
+# access. the catch is that every attribute has to be declared as a field,
+# so systems can't hang ad-hoc state on them anymore
 
 from dataclasses import dataclass, field
 from typing import Tuple, Dict, Set, Literal, List, Optional, Any
@@ -35,7 +41,7 @@ class PauseState:
 
 # transform: data representing world-space position
 # later will add velocity, rotation, etc... anything needed for size/location/orientation
-@dataclass
+@dataclass(slots=True)
 class Transform:
     x: float
     y: float
@@ -46,7 +52,7 @@ class Transform:
     net_y: Optional[float] = None
 
 # any data constants that are involved in entity movement calculations
-@dataclass
+@dataclass(slots=True)
 class Movement:
     speed: int
     dash_speed: int = 300
@@ -58,7 +64,7 @@ class Movement:
 # intent: data representing what the player/enemy is trying to do
 # this describes a per-tick input intent that is either written by 
 # InputSystem (from client) or by the server. movement is [-1,1] on each axis
-@dataclass
+@dataclass(slots=True)
 class Intent:
     move_x: float = 0.0   # -1..1
     move_y: float = 0.0   # -1..1
@@ -88,13 +94,13 @@ class Attack:
     damage: float = 1
 
 # Hitbox Size
-@dataclass
+@dataclass(slots=True)
 class HitboxSize:
     radius: float = 10.0   # default hitbox size, can be overridden in JSON
 
 
 # Enemy AI Patterns
-@dataclass
+@dataclass(slots=True)
 class AI:
     name: str   # "chort", "big_zombie", etc...
     size: str   # "big", "medium", "small", "tiny"
@@ -106,13 +112,22 @@ class AI:
     aggro_sfx_played: bool = False
     aggro_sfx_played: bool = False
 
+    # per-enemy state owned by EnemyAISystem
+    wander_timer: float = 0.0
+    wander_dir: Tuple[float, float] = (0.0, 0.0)
+    wander_waiting: bool = False
+    shoot_timer: float = 0.0
+    was_chasing: bool = False
+    last_aggro_target_id: Optional[int] = None
+    fixed_dir: Optional[Tuple[float, float]] = None     # "StraightLine" heading, set once
+
 
 @dataclass
 class lifeSpan:
     duration: float = 5.0    # seconds until entity is removed
     elapsed: float = 0.0     # time elapsed since creation
 
-@dataclass
+@dataclass(slots=True)
 class Life:
     hp: int = 10    # hp it currently has
     max_hp: int = 10   
@@ -146,7 +161,7 @@ class Sprite:
     atlas_id: str   # id's used for mapping sprites ("hero.knight", "enemy.chort")
     z: int = 10     # draw order (bigger number draws last)
 
-@dataclass
+@dataclass(slots=True)
 class AnimationState:
     clip: str = "idle"  # current clip name
     frame: int = 0
@@ -186,10 +201,20 @@ class ActiveMapId:
     id: str         
 
 # attach to any entity that belongs to a specific Map.id
+# the World binds itself to the instance when it is attached, so assigning a
+# new .id (map transitions, snapshots) moves the entity to the new map bucket
 @dataclass
 class OnMap:
     id: str         
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        object.__setattr__(self, name, value)
+        if name == "id":
+            bound = self.__dict__.get("_bound")
+            if bound is not None:
+                world, eid = bound
+                world._set_entity_map(eid, value)
+
 # lives on the Map entity, ensures spawns happen once per map
 @dataclass
 class MapSpawnState:
@@ -308,10 +333,19 @@ class NetHostState:
     server: Any = None                      # game.net.server.NetServer instance
     tick: int = 0                           # simulation/network tick
     accumulator: float = 0.0                # time accumulator for snapshot sends
-    send_interval: float = 1.0 / 60.0       # send snapshots at ~60Hz by default
+    send_interval: float = 1.0 / 60.0       # snapshot tick (fastest per-peer rate, see links)
     max_clients: int = 4                    # up to 4 clients (5 total players w/ host)
     # peer_id -> (ip, port)
     peers: Dict[str, Any] = field(default_factory=dict)
+    # peer_id -> game.net.delta.SnapshotHistory (sent snapshots + acked tick)
+    histories: Dict[str, Any] = field(default_factory=dict)
+    interest: Any = None                    # game.net.interest.InterestFilter (per-peer snapshot filtering)
+    # peer_id -> deque of (input tick, intent dict) not applied yet
+    input_queues: Dict[str, Any] = field(default_factory=dict)
+    # peer_id -> input tick currently in that peer's Intent
+    input_ticks: Dict[str, int] = field(default_factory=dict)
+    # peer_id -> game.net.link.PeerLink (rtt/loss, adaptive snapshot rate)
+    links: Dict[str, Any] = field(default_factory=dict)
 
 
 @dataclass
@@ -320,9 +354,14 @@ class NetClientState:
     tick: int = 0                           # local input tick
     accumulator: float = 0.0                # time accumulator for input sends
     send_interval: float = 1.0 / 60.0       # send inputs at ~60Hz
-    last_snapshot_tick: int = 0             # last snapshot we applied
-    prediction: bool = True                 # hook for client-side prediction
-    interpolation: bool = True              # hook for snapshot interpolation
+    last_snapshot_tick: int = 0             # last snapshot we applied (acked back to the host)
+    history: Any = None                     # game.net.delta.SnapshotHistory of rebuilt snapshots
+    prediction: bool = True                 # predict the local hero's movement and reconcile with snapshots
+    predictor: Any = None                   # game.net.prediction.LocalPredictor
+    interpolation: bool = True              # buffer snapshots and interpolate (False = apply on arrival)
+    buffer: Any = None                      # game.net.interpolation.SnapshotBuffer
+    clock: float = 0.0                      # seconds since the client state was created
+    sent_inputs: Any = None                 # deque of recent (tick, intent payload), repeated in each input
 
 # marks an entity as a client-side proxy for something that actually lives on the host
 @dataclass
@@ -330,6 +369,32 @@ class RemoteEntity:
     remote_id: int
     category: str = "generic"
 
+# client-side lookups for applying snapshots (game/net/snapshots.py)
+# kept up to date as proxies are created and cleaned up, so a snapshot is
+# applied without scanning the world once per entity in it
+@dataclass
+class RemoteIndex:
+    # category -> host entity id -> local proxy entity id
+    remotes: Dict[str, Dict[int, int]] = field(default_factory=dict)
+    # peer_id -> local player entity id
+    players: Dict[str, int] = field(default_factory=dict)
+    # player view version `players` was built at (QueryView.version)
+    players_version: int = -1
+
+# host-side record cache for build_world_snapshot (game/net/snapshots.py)
+# an entity whose snapshot fields are the same as last build gets the same
+# record dict back, so delta/link diffing can skip it with an identity check
+# the key maps and the payload's record lists are scratch storage: each build
+# refills the map from two builds ago and last build's lists
+@dataclass
+class SnapshotCache:
+    # category -> key (peer_id / entity id) -> (field values, record)
+    records: Dict[str, Dict[Any, Tuple[tuple, Dict[str, Any]]]] = field(default_factory=dict)
+    # the key maps records held before the last build, reused by the next
+    spare: Dict[str, Dict[Any, Tuple[tuple, Dict[str, Any]]]] = field(default_factory=dict)
+    # category -> record list handed out in the payload
+    lists: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+
 # scoring components
 
 @dataclass
@@ -5,11 +5,11 @@ from game.world.maps.map_blueprint import build_Map_component
 from game.world.components import Map, ActiveMapId, MapSpawnState
 
 def get_or_make_singleton(world, Comp, **kwargs):
-    for _, comps in world.query(Comp):
-        return comps[Comp]
-    e = world.new_entity()
+    inst = world.singleton(Comp)
+    if inst is not None:
+        return inst
     inst = Comp(**kwargs) if kwargs else Comp()  # type: ignore
-    world.add(e, inst)
+    world.set_singleton(inst)
     return inst
 
 def resolve_map_hint_to_id(hint: str) -> str | None:
@@ -27,7 +27,7 @@ def create_or_activate(world, map_id: str) -> int:
     # Activate existing Map entity for map_id or build a new one. Returns the Map entity id.
     # Deactivate others, and see if already present
     existing = None
-    for eid, comps in world.query(Map):
+    for eid, comps in world.view(Map):
         m = comps[Map]
         if m.id == map_id:
             existing = eid
@@ -37,9 +37,14 @@ def create_or_activate(world, map_id: str) -> int:
         world.components_of(existing)[Map].active = True
         map_eid = existing
     else:
+        # snapshots carry positions in a fixed frame; fail here, not with
+        # entities clamped to its edge mid-game
+        from game.net.snapshots import check_map_fits
         mi = info(map_id)
+        m = build_Map_component(mi)
+        check_map_fits(m)
         map_eid = world.new_entity()
-        world.add(map_eid, build_Map_component(mi))
+        world.add(map_eid, m)
         world.add(map_eid, MapSpawnState())
 
     # set ActiveMapId singleton
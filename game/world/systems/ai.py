@@ -30,13 +30,13 @@ class EnemyAISystem:#System):
     def update(self, world, dt: float) -> None:
         # build a mapping of map_id -> list of player Transforms on that map
         players_by_map: dict[str, list[tuple[int, Transform]]] = {}
-        for player_eid, comps in world.query(Transform, PlayerTag, OnMap):
+        for player_eid, comps in world.view(Transform, PlayerTag, OnMap):
             tr: Transform = comps[Transform]
             om: OnMap = comps[OnMap]
             players_by_map.setdefault(om.id, []).append((player_eid, tr))
 
         # drive AI for entities with AI + Transform + Intent
-        for entity_id, comps in world.query(Transform, Intent, AI): 
+        for entity_id, comps in world.view(Transform, Intent, AI): 
             ai: AI = comps[AI]
             pos: Transform = comps[Transform]
             intent: Intent = comps[Intent]
@@ -47,7 +47,7 @@ class EnemyAISystem:#System):
 
 
             if target_pos is None:
-                ai_onmap = world.get(entity_id, OnMap)
+                ai_onmap = comps.get(OnMap)
                 if ai_onmap is not None:
                     same_map_players = players_by_map.get(ai_onmap.id, [])
                     if same_map_players:
@@ -82,14 +82,7 @@ class EnemyAISystem:#System):
                 # out of aggro range or no valid target so clear target_id
                 ai.target_id = None
 
-                # Give each AI its own cooldown + direction if not already present
-                if not hasattr(ai, "wander_timer"):
-                    ai.wander_timer = 0.0
-                if not hasattr(ai, "wander_dir"):
-                    ai.wander_dir = (0.0, 0.0)
-                if not hasattr(ai, "wander_waiting"):
-                    ai.wander_waiting = False
-
+                # each AI keeps its own cooldown + direction (fields on AI)
                 ai.wander_timer -= dt
                 if ai.wander_waiting:
                     if ai.wander_timer <= 0:
@@ -122,11 +115,11 @@ class EnemyAISystem:#System):
                     chasing_now = (dist > 10 and dist < ai.agro_range and target_pos is not None)
 
                     # previous chasing state
-                    was_chasing = getattr(ai, "was_chasing", False)
+                    was_chasing = ai.was_chasing
                     ai.was_chasing = chasing_now
 
-                    current_target_id = getattr(ai, "target_id", None)
-                    last_sound_target_id = getattr(ai, "last_aggro_target_id", None)
+                    current_target_id = ai.target_id
+                    last_sound_target_id = ai.last_aggro_target_id
 
                     if chasing_now:
                         intent.move_x = dx / dist
@@ -169,7 +162,7 @@ class EnemyAISystem:#System):
 
                 #believed to work not sure tho
                 elif ai.kind == "StraightLine":
-                    if not hasattr(ai, "fixed_dir") and target_pos is not None:
+                    if ai.fixed_dir is None and target_pos is not None:
                         # Calculate player direction at creation
                         dx0 = target_pos.x - pos.x
                         dy0 = target_pos.y - pos.y
@@ -191,11 +184,11 @@ class EnemyAISystem:#System):
                         chasing_now = (dist > 10 and dist < ai.agro_range and target_pos is not None)
 
                         # previous chasing state
-                        was_chasing = getattr(ai, "was_chasing", False)
+                        was_chasing = ai.was_chasing
                         ai.was_chasing = chasing_now
 
-                        current_target_id = getattr(ai, "target_id", None)
-                        last_sound_target_id = getattr(ai, "last_aggro_target_id", None)
+                        current_target_id = ai.target_id
+                        last_sound_target_id = ai.last_aggro_target_id
 
                         if chasing_now:
                             intent.move_x = dx / dist
@@ -227,9 +220,6 @@ class EnemyAISystem:#System):
                     if not atk or not target_pos:
                         continue
 
-                    if not hasattr(ai, "shoot_timer"):
-                         ai.shoot_timer = 0.0
-
                     ai.shoot_timer -= dt
 
                     if ai.shoot_timer <= 0.0:
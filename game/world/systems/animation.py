@@ -10,7 +10,7 @@ class AnimationSystem:
     def update(self, world, dt):
 
         # loop through all entities with sprite and animationstate components
-        for _, comps in world.query(Sprite, AnimationState):
+        for _, comps in world.view(Sprite, AnimationState):
             spr = comps[Sprite]
             anim = comps[AnimationState]
 
@@ -66,7 +66,7 @@ class AttackSystem:
         return end - start_deg
 
     def update(self, world, dt):
-        for eid, comps in world.query(Intent, Attack, Transform):
+        for eid, comps in world.view(Intent, Attack, Transform):
             it: Intent = comps[Intent]
             atk: Attack = comps[Attack]
             tr: Transform = comps[Transform]
@@ -144,15 +144,14 @@ class AttackSystem:
                 self.prev_tip[eid] = (sx, sy)
                 
                 # restrict hits to enemies on the same map as the attacker
-                attacker_on = world.get(eid, OnMap)
+                attacker_on = comps.get(OnMap)
                 attacker_map_id = attacker_on.id if attacker_on is not None else None
 
                 hit_this_frame = set()
-                for enemy_id, enemy_comps in world.query(Transform, AI, HitboxSize):
-                    if attacker_map_id is not None:
-                        enemy_on = world.get(enemy_id, OnMap)
-                        if enemy_on is None or enemy_on.id != attacker_map_id:
-                            continue
+                targets = world.view(Transform, AI, HitboxSize)
+                if attacker_map_id is not None:
+                    targets = targets.on_maps((attacker_map_id,), include_unmapped=False)
+                for enemy_id, enemy_comps in targets:
                     enemy_tr: Transform = enemy_comps[Transform]
                     enemy_hitbox: HitboxSize = enemy_comps[HitboxSize]
 
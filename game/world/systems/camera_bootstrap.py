@@ -6,15 +6,13 @@ from game.world.maps.utils import map_world_bounds
 
 class CameraBootstrapSystem:
     def update(self, world, dt: float) -> None:
-        active_id = None
-        for _, comps in world.query(ActiveMapId):
-            active_id = comps[ActiveMapId].id
-            break
-        if active_id is None:
+        am = world.singleton(ActiveMapId)
+        if am is None:
             return
+        active_id = am.id
 
         tmx = None
-        for _, comps in world.query(Map):
+        for _, comps in world.view(Map):
             mp = comps[Map]
             if getattr(mp, "id", None) == active_id:
                 tmx = getattr(mp, "tmx_data", None)
@@ -23,7 +21,7 @@ class CameraBootstrapSystem:
             return
 
         bounds = map_world_bounds(tmx)
-        for _, comps in world.query(Camera):
+        for _, comps in world.view(Camera):
             cam = comps[Camera]
             if cam.clamp_rect != bounds:
                 cam.clamp_rect = bounds
@@ -4,7 +4,7 @@ from game.world.components import Camera
 
 class CameraClampSystem:
     def update(self, world, dt: float) -> None:
-        for _, comps in world.query(Camera):
+        for _, comps in world.view(Camera):
             cam = comps[Camera]
             if cam.clamp_rect is None:
                 continue
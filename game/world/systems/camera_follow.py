@@ -16,16 +16,12 @@ class CameraFollowSystem:
     def update(self, world, dt: float) -> None:
 
         # Get active map 
-        active_id = None
-        for _, comps in world.query(ActiveMapId):
-            active_id = comps[ActiveMapId].id
-            break
+        am = world.singleton(ActiveMapId)
+        active_id = am.id if am is not None else None
         
         # Find camera that follows local player
-        cam_eid, cam = None, None
-        for eid, comps in world.query(Camera, CameraFollowLocalPlayer):
-            cam_eid, cam = eid, comps[Camera]
-            break
+        cam_eid = world.singleton_entity(CameraFollowLocalPlayer)
+        cam = world.get(cam_eid, Camera)
         if cam is None:
             return
 
@@ -37,7 +33,7 @@ class CameraFollowSystem:
         target_eid = None
 
         # 1) Prefer the local-controlled player (normal behavior)
-        for eid, comps in world.query(PlayerTag, LocalControlled, Transform):
+        for eid, comps in world.view(PlayerTag, LocalControlled, Transform):
             # make sure target is in active map
             if active_id is not None:
                 om = comps.get(OnMap)
@@ -51,7 +47,7 @@ class CameraFollowSystem:
         #    fall back to *any* player so we can spectate others,
         #    ignoring ActiveMapId
         if target_tr is None:
-            for eid, comps in world.query(PlayerTag, Transform):
+            for eid, comps in world.view(PlayerTag, Transform):
                 target_tr = comps[Transform]
                 target_eid = eid
                 break
@@ -6,7 +6,7 @@ from game.world.components import PlayerTag, LocalControlled
 class EnsureCameraSystem:
     def update(self, world, dt: float) -> None:
         # If a camera already exists, do nothing
-        for _, _ in world.query(Camera):
+        if world.singleton(Camera) is not None:
             return
 
         # Find the local player to set initial camera position
@@ -41,7 +41,7 @@ class CollisionSystem:
         player_map: dict[int, str] = {}
         player_maps: set[str] = set()
 
-        for pid, comps in world.query(PlayerTag, OnMap):
+        for pid, comps in world.view(PlayerTag, OnMap):
             om: OnMap = comps[OnMap]
             players.append(pid)
             player_map[pid] = om.id
@@ -53,7 +53,7 @@ class CollisionSystem:
         
         # get collision rects per map
         collisions_by_map: dict[str, list[pygame.Rect]] = {}
-        for _, comps in world.query(Map):
+        for _, comps in world.view(Map):
             m: Map = comps[Map]
             if not m.collisions:
                 continue
@@ -71,19 +71,16 @@ class CollisionSystem:
             return
         
         # check collisions for all entities
-        for eid, comps in world.query(Transform):
+        # entities with an OnMap are only checked if that map has players
+        for eid, comps in world.view(Transform).on_maps(player_maps):
             tr = comps[Transform]
 
             # determine which map entity is on
             ent_on = comps.get(OnMap)
             ent_map_id = ent_on.id if ent_on is not None else None
 
-            # if entity has OnMap and that map has no players then skip
-            if ent_map_id is not None and ent_map_id not in player_maps:
-                continue
-
             # get entity's hitbox radius
-            hitbox = world.get(eid, HitboxSize)
+            hitbox = comps.get(HitboxSize)
             entity_radius = hitbox.radius if hitbox else 10
 
             # for each player on the same map
@@ -135,7 +132,7 @@ class CollisionSystem:
                             # If this is a projectile, consume it on hit so it
                             # doesn't keep colliding and dealing damage.
                             if is_projectile:
-                                world.delete_entity(eid)
+                                world.commands.destroy(eid)
                                 break
 
             
@@ -148,37 +145,48 @@ class CollisionSystem:
                 collisions = global_collisions
 
             # wall collisions
-            entity_rect = pygame.Rect(
-                tr.x - entity_radius,
-                tr.y - entity_radius,
-                entity_radius * 2,
-                entity_radius - 2 # -2 is required for bottom wall collision aestetics
-            )
-            for rect in collisions:
-                if entity_rect.colliderect(rect):
-
-                    if world.get(eid, Projectile):
-                        world.delete_entity(eid)
-                        break
-                    # Calculate minimum push distance
-                    dx_left = rect.right - entity_rect.left
-                    dx_right = rect.left - entity_rect.right
-                    dy_top = rect.bottom - entity_rect.top
-                    dy_bottom = rect.top - entity_rect.bottom
-
-                    # Push along the smaller overlap
-                    overlaps = {
-                        "left": abs(dx_left),
-                        "right": abs(dx_right),
-                        "top": abs(dy_top),
-                        "bottom": abs(dy_bottom)
-                    }
-                    min_dir = min(overlaps, key=overlaps.get)
-                    if min_dir == "left":
-                        tr.x += dx_left
-                    elif min_dir == "right":
-                        tr.x += dx_right
-                    elif min_dir == "top":
-                        tr.y += dy_top
-                    elif min_dir == "bottom":
-                        tr.y += dy_bottom
+            entity_rect = wall_rect(tr, entity_radius)
+            if world.get(eid, Projectile):
+                if entity_rect.collidelist(collisions) != -1:
+                    world.commands.destroy(eid)
+            else:
+                push_out_of_walls(tr, entity_rect, collisions)
+
+
+# wall hitbox for an entity at tr: entity_radius is half the HitboxSize radius
+def wall_rect(tr: Transform, entity_radius: float) -> pygame.Rect:
+    return pygame.Rect(
+        tr.x - entity_radius,
+        tr.y - entity_radius,
+        entity_radius * 2,
+        entity_radius - 2 # -2 is required for bottom wall collision aestetics
+    )
+
+
+# push tr out of every wall rect entity_rect overlaps, along the smaller overlap
+# also used by client-side prediction (game/net/prediction.py) for the local hero
+def push_out_of_walls(tr: Transform, entity_rect: pygame.Rect, collisions) -> None:
+    for rect in collisions:
+        if entity_rect.colliderect(rect):
+            # Calculate minimum push distance
+            dx_left = rect.right - entity_rect.left
+            dx_right = rect.left - entity_rect.right
+            dy_top = rect.bottom - entity_rect.top
+            dy_bottom = rect.top - entity_rect.bottom
+
+            # Push along the smaller overlap
+            overlaps = {
+                "left": abs(dx_left),
+                "right": abs(dx_right),
+                "top": abs(dy_top),
+                "bottom": abs(dy_bottom)
+            }
+            min_dir = min(overlaps, key=overlaps.get)
+            if min_dir == "left":
+                tr.x += dx_left
+            elif min_dir == "right":
+                tr.x += dx_right
+            elif min_dir == "top":
+                tr.y += dy_top
+            elif min_dir == "bottom":
+                tr.y += dy_bottom
@@ -7,49 +7,34 @@ class death:
     def update(self, world, dt: float) -> None:
         # get map id's that have players on them
         logic_map_ids: set[str] = set()
-        for _eid, comps in world.query(PlayerTag, OnMap):
+        for _eid, comps in world.view(PlayerTag, OnMap):
             om: OnMap = comps[OnMap]
             if om.id:
                 logic_map_ids.add(om.id)
 
         # if no players yet, use ActiveMapId
         if not logic_map_ids:
-            active_id = None
-            for _eid, comps in world.query(ActiveMapId):
-                active_id = comps[ActiveMapId].id
-                break
+            am = world.singleton(ActiveMapId)
+            active_id = am.id if am is not None else None
             if active_id:
                 logic_map_ids.add(active_id)
 
-        # collect entities to delete first
-        to_delete = []
-
         # ---- HP-based death ----
-        for entity_id, comps in world.query(Transform, Life):
+        # if entity is on a map, only process if that map has a player
+        living = world.view(Transform, Life)
+        for entity_id, comps in (living.on_maps(logic_map_ids) if logic_map_ids else living):
             life_comp: Life = comps[Life]
             if life_comp.hp > 0:
                 continue
-
-            # if entity is on a map, only process if that map has a player
-            if logic_map_ids:
-                om = comps.get(OnMap)
-                if om is not None and om.id not in logic_map_ids:
-                    continue
             
-            to_delete.append(entity_id)
+            world.commands.destroy(entity_id)
 
         # ---- lifespan-based death ----
-        for entity_id, comps in world.query(Transform, lifeSpan):
-            if logic_map_ids:
-                om = comps.get(OnMap)
-                if om is not None and om.id not in logic_map_ids:
-                    continue
-
+        timed = world.view(Transform, lifeSpan)
+        for entity_id, comps in (timed.on_maps(logic_map_ids) if logic_map_ids else timed):
             lifespan = comps[lifeSpan]
             lifespan.elapsed += dt
             if lifespan.elapsed >= lifespan.duration:
-                to_delete.append(entity_id)
+                world.commands.destroy(entity_id)
 
-        # ---- delete safely after iteration ----
-        for eid in to_delete:
-            world.delete_entity(eid)
\ No newline at end of file
+        # deletions are applied by the world once this system returns
\ No newline at end of file
@@ -24,10 +24,9 @@ class InputSystem:
         input: InputState | None = None
         intent: Intent | None = None
 
-        for _, comps in world.query(LocalControlled):
-            input: InputState = comps.get(InputState)
-            intent: Intent = comps.get(Intent)
-            break
+        local_eid = world.singleton_entity(LocalControlled)
+        input = world.get(local_eid, InputState)
+        intent = world.get(local_eid, Intent)
 
         # If we have no local-controlled player (e.g. dead and spectating),
         # skip gameplay input entirely.
@@ -35,9 +34,7 @@ class InputSystem:
             return
 
         # lookup global pause state
-        for _eid, comps in world.query(PauseState):
-            pause = comps[PauseState]
-            break
+        pause = world.singleton(PauseState)
 
         # If this client's player is paused, do not process gameplay input
         if pause is not None and pause.is_paused:
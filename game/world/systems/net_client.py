@@ -4,13 +4,27 @@
 #
 # NetClientSystem:
 #   - Runs ONLY on clients (NetIdentity.role == "CLIENT").
-#   - Sends local input at a fixed rate.
-#   - Receives world snapshots from host and applies them.
+#   - Sends local input at a fixed rate, tagged with client_state.tick, and
+#     predicts the local hero's movement from it (game/net/prediction.py).
+#     each input packet repeats the last Config.NET_INPUT_HISTORY inputs, so
+#     a lost packet doesn't lose its input.
+#   - Receives world snapshots (full or delta) from host and buffers them;
+#     they are applied ~100ms late with remote entities interpolated between
+#     them (game/net/interpolation.py). with NetClientState.interpolation off
+#     they are applied on arrival.
+#   - Acks the newest applied snapshot tick so the host can delta against it.
+#   - Snapshots that lost some of their chunks (game/net/fragment.py) are
+#     still applied, but not acked or kept as a delta baseline.
+#   - When the host has been silent for Config.NET_PEER_TIMEOUT, keeps asking
+#     to resume the session with the token from WELCOME (NetClient.resume):
+#     the host hands back the same peer id and hero.
 
 from __future__ import annotations
 
+from collections import deque
 from typing import Any, Dict
 
+from game.core.config import Config
 from game.world.components import (
     NetIdentity,
     NetClientState,
@@ -27,11 +41,18 @@ from game.net.protocol import (
     MSG_WELCOME,
     MSG_INPUT,
     MSG_SNAPSHOT,
+    MSG_SNAPSHOT_DELTA,
+    MSG_ACK,
     MSG_PING,
     MSG_PONG,
     MSG_START_GAME,
+    is_supported_protocol,
 )
 from game.net.snapshots import apply_world_snapshot
+from game.net.delta import SnapshotHistory, index_snapshot, expand_delta
+from game.net.fragment import overlay_snapshot
+from game.net.interpolation import SnapshotBuffer, interpolate_world
+from game.net.prediction import LocalPredictor
 
 
 class NetClientSystem:
@@ -39,13 +60,9 @@ class NetClientSystem:
 
     def update(self, world, dt: float) -> None:
         # Locate network singleton
-        net_id: NetIdentity | None = None
-        client_state: NetClientState | None = None
-
-        for _eid, comps in world.query(NetIdentity, NetClientState):
-            net_id = comps[NetIdentity]
-            client_state = comps[NetClientState]
-            break
+        net_eid = world.singleton_entity(NetClientState)
+        net_id: NetIdentity | None = world.get(net_eid, NetIdentity)
+        client_state: NetClientState | None = world.get(net_eid, NetClientState)
 
         if net_id is None or client_state is None:
             return
@@ -55,6 +72,7 @@ class NetClientSystem:
             return
 
         client: NetClient = client_state.client
+        client_state.clock += dt
 
         # Send local input at a fixed rate
         client_state.accumulator += dt
@@ -64,21 +82,92 @@ class NetClientSystem:
 
             payload = self._build_local_input_payload(world, net_id.my_peer_id)
             if payload is not None:
+                sent_inputs = self._sent_inputs(client_state)
                 msg: Dict[str, Any] = {
                     "type": MSG_INPUT,
                     "protocol": PROTOCOL_VERSION,
                     "peer_id": net_id.my_peer_id,
                     "tick": client_state.tick,
+                    "ack": client_state.last_snapshot_tick,
                     "intent": payload,
                 }
+                if sent_inputs:
+                    msg["history"] = [[tick, intent] for tick, intent in sent_inputs]
                 client.send(msg)
+                sent_inputs.append((client_state.tick, payload))
+                if client_state.prediction:
+                    self._predictor(client_state).step(world, net_id.my_peer_id, client_state.tick, payload)
+            elif client_state.last_snapshot_tick:
+                # no local player to drive (dead, spectating): still ack
+                client.send({
+                    "type": MSG_ACK,
+                    "protocol": PROTOCOL_VERSION,
+                    "peer_id": net_id.my_peer_id,
+                    "ack": client_state.last_snapshot_tick,
+                })
 
         # Receive and handle incoming messages
         for msg in client.recv_all():
             self._handle_message(world, net_id, client_state, msg)
 
+        # link dropped (or our address changed): ask for our hero back
+        if client.silent_for() > Config.NET_PEER_TIMEOUT:
+            client.resume()
+
+        # Play out buffered snapshots
+        if client_state.interpolation and client_state.buffer is not None:
+            buffer: SnapshotBuffer = client_state.buffer
+            render_time = buffer.render_time(client_state.clock, dt)
+            for snapshot in buffer.pop_ready(render_time):
+                apply_world_snapshot(world, snapshot, net_id.my_peer_id)
+            interpolate_world(world, buffer, render_time, net_id.my_peer_id)
+
+        # snapshots above wrote host positions; put the local hero back on its prediction
+        if client_state.prediction and client_state.predictor is not None:
+            client_state.predictor.hold(world, net_id.my_peer_id)
+
     # internals ###############################################################
 
+    # buffer for interpolation, or apply right away
+    def _receive_snapshot(
+        self,
+        world,
+        net_id: NetIdentity,
+        client_state: NetClientState,
+        snapshot: Dict[str, Any],
+        state: Dict[str, Any],
+        reconcile: bool = True,
+    ) -> None:
+        # reconcile on arrival: the hero doesn't wait in the jitter buffer
+        if reconcile and client_state.prediction and client_state.predictor is not None:
+            my_peer_id = net_id.my_peer_id
+            client_state.predictor.reconcile(world, my_peer_id, state["players"].get(my_peer_id))
+
+        if not client_state.interpolation:
+            apply_world_snapshot(world, snapshot, net_id.my_peer_id)
+            return
+        if client_state.buffer is None:
+            client_state.buffer = SnapshotBuffer()
+        client_state.buffer.push(snapshot, state, client_state.clock)
+
+    @staticmethod
+    def _predictor(client_state: NetClientState) -> LocalPredictor:
+        if client_state.predictor is None:
+            client_state.predictor = LocalPredictor()
+        return client_state.predictor
+
+    @staticmethod
+    def _sent_inputs(client_state: NetClientState) -> deque:
+        if client_state.sent_inputs is None:
+            client_state.sent_inputs = deque(maxlen=Config.NET_INPUT_HISTORY)
+        return client_state.sent_inputs
+
+    @staticmethod
+    def _history(client_state: NetClientState) -> SnapshotHistory:
+        if client_state.history is None:
+            client_state.history = SnapshotHistory()
+        return client_state.history
+
     # Find the LocalControlled + Owner(peer_id=my_peer_id) entity and convert its Intent to a wire-friendly dict
     def _build_local_input_payload(self, world, my_peer_id: str) -> Dict[str, Any] | None:
         for _eid, comps in world.query(PlayerTag, Owner, LocalControlled, Intent, InputState):
@@ -119,16 +208,48 @@ class NetClientSystem:
                 net_id.my_peer_id = peer_id
 
         elif mtype == MSG_SNAPSHOT:
-            # Directly applies snapshot
-            # probably need to implement buffering and interpolation later
-            if int(msg.get("protocol", PROTOCOL_VERSION)) != PROTOCOL_VERSION:
+            if not is_supported_protocol(msg.get("protocol", PROTOCOL_VERSION)):
                 return
             tick = int(msg.get("tick", 0))
             if tick <= client_state.last_snapshot_tick:
                 return
+
+            if msg.get("partial"):
+                # what's missing keeps its last complete state; our own
+                # record only counts if the chunk carrying players arrived
+                base = self._history(client_state).get(client_state.last_snapshot_tick)
+                snapshot, state = overlay_snapshot(base, msg)
+                self._receive_snapshot(world, net_id, client_state, snapshot, state, "players" in msg)
+                return
+
             client_state.last_snapshot_tick = tick
+            state = index_snapshot(msg)
+            self._history(client_state).push(state)
+            self._receive_snapshot(world, net_id, client_state, msg, state)
 
-            apply_world_snapshot(world, msg, net_id.my_peer_id)
+        elif mtype == MSG_SNAPSHOT_DELTA:
+            tick = int(msg.get("tick", 0))
+            if tick <= client_state.last_snapshot_tick:
+                return
+
+            # we only ack ticks we keep, so a missing baseline means a stale
+            # or mangled packet: drop it
+            history = self._history(client_state)
+            base = history.get(int(msg.get("base_tick", -1)))
+            if base is None:
+                return
+            expanded = expand_delta(base, msg)
+            if expanded is None:
+                return
+            snapshot, state = expanded
+
+            if msg.get("partial"):
+                self._receive_snapshot(world, net_id, client_state, snapshot, state, "players" in msg)
+                return
+
+            client_state.last_snapshot_tick = tick
+            history.push(state)
+            self._receive_snapshot(world, net_id, client_state, snapshot, state)
 
         elif mtype == MSG_PING:
             # echo ping → pong
@@ -6,13 +6,29 @@
 #   - Runs ONLY on the host (NetIdentity.role == "HOST").
 #   - Handles:
 #       * Handshake (hello/welcome).
-#       * Receiving remote input and applying it to Owner(peer) entities.
-#       * Broadcasting world snapshots at a fixed rate.
+#       * Receiving remote input and applying it to Owner(peer) entities,
+#         one input per tick in input-tick order. input packets repeat the
+#         client's last few inputs; whichever copy of an input arrives first
+#         is queued, the rest are dropped as duplicates. each player's snapshot
+#         record carries the last input tick its movement has used, which
+#         clients reconcile their prediction against.
+#       * Broadcasting world snapshots, filtered to what each peer can see, as
+#         deltas against each peer's acked snapshot when the peer supports it.
+#       * Pinging each peer and sending it snapshots at a rate that follows
+#         its measured rtt/loss and bandwidth budget (game/net/link.py).
 #       * Being aware of up to max_clients (4 clients -> 5 total players).
+#       * Dropping peers that have been silent for Config.NET_PEER_TIMEOUT:
+#         no more snapshots go to them and their hero stands still. a HELLO
+#         carrying the resume token from their WELCOME gets the same peer id
+#         (and hero) back, from any address. peers that never acked a
+#         reliable control message (NetServer.failed_peers) are dropped the
+#         same way: their control channel can't recover.
 
 from __future__ import annotations
 
-from typing import Any, Dict, Tuple
+import time
+from collections import deque
+from typing import Any, Dict, List, Tuple
 
 from game.world.components import (
     NetIdentity,
@@ -22,32 +38,36 @@ from game.world.components import (
     Intent,
     InputState,
 )
+from game.core.config import Config
 from game.net.server import NetServer
 from game.net.protocol import (
     PROTOCOL_VERSION,
+    DELTA_PROTOCOL_VERSION,
+    TICK_RATE,
     MSG_HELLO,
     MSG_WELCOME,
     MSG_JOIN_DENY,
     MSG_INPUT,
     MSG_SNAPSHOT,
+    MSG_ACK,
     MSG_PING,
     MSG_PONG,
     MSG_DISCONNECT,
+    is_supported_protocol,
 )
 from game.net.snapshots import build_world_snapshot
+from game.net.delta import SnapshotHistory, index_snapshot, diff_snapshot, delta_message
+from game.net.interest import InterestFilter
+from game.net.link import PeerLink, prioritize_view
 
 Address = Tuple[str, int]
 
 class NetHostSystem:
     def update(self, world, dt: float) -> None:
         # Locate network singleton
-        net_id: NetIdentity | None = None
-        host: NetHostState | None = None
-
-        for _eid, comps in world.query(NetIdentity, NetHostState):
-            net_id = comps[NetIdentity]
-            host = comps[NetHostState]
-            break
+        net_eid = world.singleton_entity(NetHostState)
+        net_id: NetIdentity | None = world.get(net_eid, NetIdentity)
+        host: NetHostState | None = world.get(net_eid, NetHostState)
 
         if net_id is None or host is None:
             return
@@ -62,21 +82,167 @@ class NetHostSystem:
         for addr, msg in server.recv_all():
             self._handle_message(world, server, host, addr, msg)
 
+        for peer_id in server.silent_peers(Config.NET_PEER_TIMEOUT):
+            self._drop_silent_peer(world, server, host, peer_id)
+        for peer_id in server.failed_peers():
+            self._drop_silent_peer(world, server, host, peer_id, "stopped acking")
+
+        if Config.NET_ADAPTIVE_RATE:
+            self._ping_peers(server, host)
+
         # Tick + send snapshots at a fixed interval
         host.accumulator += dt
+        # ticks count host time in 1/TICK_RATE steps whatever the send rate,
+        # so clients can turn a snapshot tick into a timestamp
+        tick_step = max(1, int(round(host.send_interval * TICK_RATE)))
         while host.accumulator >= host.send_interval:
             host.accumulator -= host.send_interval
-            host.tick += 1
+            host.tick += tick_step
 
-            snapshot_payload = build_world_snapshot(world, host.tick)
-            packet: Dict[str, Any] = {
+            # input ticks applied last frame are the ones this frame's movement used
+            snapshot_payload = build_world_snapshot(world, host.tick, host.input_ticks)
+            self._send_snapshot(server, host, snapshot_payload)
+
+        # next queued input per peer, for the next frame's systems
+        self._apply_queued_inputs(world, host)
+
+    # internals ################################################################
+
+    # each peer gets its filtered view of the snapshot: in full when it has no
+    # usable baseline, otherwise as a delta. peers with the same view and
+    # the same acked tick share one diff (and one encode per codec)
+    def _send_snapshot(self, server: NetServer, host: NetHostState, payload: Dict[str, Any]) -> None:
+        interest = None
+        if Config.NET_INTEREST_MANAGEMENT:
+            if host.interest is None:
+                host.interest = InterestFilter()
+            interest = host.interest
+            interest.begin(payload)
+
+        views: Dict[Any, Dict[str, Any]] = {}
+        states: Dict[Any, Dict[str, Any]] = {}
+        full_addrs: Dict[Any, List[Address]] = {}
+        by_base: Dict[Tuple[Any, int], List[Address]] = {}
+        base_states: Dict[Tuple[Any, int], Dict[str, Any]] = {}
+
+        adaptive = Config.NET_ADAPTIVE_RATE
+        sent_to: Dict[Address, Tuple[PeerLink, Any]] = {}
+
+        for peer_id, addr in list(server.peer_to_addr.items()):
+            link = self._link(host, peer_id)
+            if adaptive and not link.due(host.send_interval):
+                continue
+
+            if interest is not None:
+                key, view = interest.view_for(peer_id)
+            else:
+                key, view = None, payload
+            if adaptive and link.record_limit is not None:
+                # over budget at the slowest rate: this peer gets its own,
+                # smaller view with the most important updates
+                view = prioritize_view(view, link.last_sent, link.priorities, link.record_limit, peer_id)
+                key = ("limited", peer_id)
+            views[key] = view
+            sent_to[addr] = (link, key)
+
+            if not Config.NET_DELTA_SNAPSHOTS or server.peer_protocol(addr) < DELTA_PROTOCOL_VERSION:
+                full_addrs.setdefault(key, []).append(addr)
+                continue
+
+            state = states.get(key)
+            if state is None:
+                state = states[key] = index_snapshot(view)
+
+            history = host.histories.get(peer_id)
+            if history is None:
+                history = host.histories[peer_id] = SnapshotHistory()
+
+            base = history.baseline()
+            if base is None:
+                full_addrs.setdefault(key, []).append(addr)
+            else:
+                group = (key, base["tick"])
+                by_base.setdefault(group, []).append(addr)
+                base_states[group] = base
+            history.push(state)
+
+        sizes: Dict[Address, int] = {}
+        records: Dict[Address, int] = {}
+        for key, addrs in full_addrs.items():
+            view = views[key]
+            sizes.update(server.broadcast({
                 "type": MSG_SNAPSHOT,
                 "protocol": PROTOCOL_VERSION,
-                **snapshot_payload,
-            }
-            server.broadcast(packet)
+                **view,
+            }, addrs))
+            for addr in addrs:
+                records[addr] = len(view["enemies"]) + len(view["pickups"])
 
-    # internals ################################################################
+        for group, addrs in by_base.items():
+            key = group[0]
+            delta = diff_snapshot(base_states[group], states[key], views[key]["sound_events"])
+            sizes.update(server.broadcast(delta_message(delta), addrs))
+            for addr in addrs:
+                records[addr] = len(delta["enemies"]) + len(delta["pickups"])
+
+        # what each peer got: sizes feed its budget, the state is what
+        # prioritize_view holds back to
+        for addr, (link, key) in sent_to.items():
+            link.sent(sizes.get(addr, 0), records.get(addr, 0))
+            if adaptive:
+                state = states.get(key)
+                if state is None:
+                    state = states[key] = index_snapshot(views[key])
+                link.last_sent = state
+
+    def _link(self, host: NetHostState, peer_id: str) -> PeerLink:
+        link = host.links.get(peer_id)
+        if link is None:
+            link = host.links[peer_id] = PeerLink()
+        return link
+
+    # rtt/loss probes; pongs come back through _handle_message
+    def _ping_peers(self, server: NetServer, host: NetHostState) -> None:
+        now = time.perf_counter()
+        for peer_id, addr in list(server.peer_to_addr.items()):
+            link = self._link(host, peer_id)
+            link.expire(now)
+            stamp = link.ping(now)
+            if stamp is not None:
+                server.send_raw(addr, {"type": MSG_PING, "time": stamp})
+
+    def _handle_ack(self, server: NetServer, host: NetHostState, addr: Address, ack: Any) -> None:
+        if ack is None:
+            return
+        peer_id = server.addr_to_peer.get(addr)
+        history = host.histories.get(peer_id) if peer_id is not None else None
+        if history is not None:
+            history.ack(ack)
+
+    # resumable: the peer may come back with its resume token
+    def _forget_peer(self, server: NetServer, host: NetHostState, peer_id: str,
+                     resumable: bool = False) -> None:
+        host.peers.pop(peer_id, None)
+        self._reset_peer(host, peer_id)
+        server.unregister_peer(peer_id, resumable)
+
+    # per-peer streams start over (full snapshots, fresh input ticks and link)
+    @staticmethod
+    def _reset_peer(host: NetHostState, peer_id: str) -> None:
+        host.histories.pop(peer_id, None)
+        host.input_queues.pop(peer_id, None)
+        host.input_ticks.pop(peer_id, None)
+        host.links.pop(peer_id, None)
+
+    # a peer that stopped talking (or acking): stop sending to it and let go
+    # of its controls, but keep its hero for a resume
+    def _drop_silent_peer(self, world, server: NetServer, host: NetHostState, peer_id: str,
+                          reason: str = "timed out") -> None:
+        self._forget_peer(server, host, peer_id, resumable=True)
+        for _eid, comps in world.query(PlayerTag, Owner, Intent):
+            if comps[Owner].peer_id == peer_id:
+                self._apply_intent(comps[Intent], {})
+        print(f"[net] {peer_id} {reason}")
 
     def _handle_message(
         self,
@@ -92,16 +258,25 @@ class NetHostSystem:
             self._handle_hello(server, host, addr, msg)
 
         elif mtype == MSG_INPUT:
-            self._handle_input(world, msg)
+            self._handle_ack(server, host, addr, msg.get("ack"))
+            self._queue_input(host, msg)
+
+        elif mtype == MSG_ACK:
+            self._handle_ack(server, host, addr, msg.get("ack"))
 
         elif mtype == MSG_PING:
             server.send_raw(addr, {"type": MSG_PONG, "time": msg.get("time", 0)})
 
+        elif mtype == MSG_PONG:
+            peer_id = server.addr_to_peer.get(addr)
+            link = host.links.get(peer_id) if peer_id is not None else None
+            if link is not None:
+                link.pong(msg.get("time"), time.perf_counter())
+
         elif mtype == MSG_DISCONNECT:
             peer_id = msg.get("peer_id")
             if isinstance(peer_id, str):
-                host.peers.pop(peer_id, None)
-                server.unregister_peer(peer_id)
+                self._forget_peer(server, host, peer_id)
 
     def _handle_hello(
         self,
@@ -111,62 +286,107 @@ class NetHostSystem:
         msg: Dict[str, Any],
     ) -> None:
         # Version check
-        if int(msg.get("protocol", -1)) != PROTOCOL_VERSION:
+        if not is_supported_protocol(msg.get("protocol")):
             server.send_raw(addr, {
                 "type": MSG_JOIN_DENY,
                 "reason": "protocol_mismatch",
             })
             return
 
-        # Deny if full
-        if len(host.peers) >= host.max_clients:
-            server.send_raw(addr, {
-                "type": MSG_JOIN_DENY,
-                "reason": "full",
-            })
-            return
+        # Resuming: same peer id (and hero) as before the drop
+        peer_id = server.resume_peer(msg)
+        if peer_id is None:
+            # Deny if full
+            if len(host.peers) >= host.max_clients:
+                server.send_raw(addr, {
+                    "type": MSG_JOIN_DENY,
+                    "reason": "full",
+                })
+                return
 
-        # Assign a new peer id
-        base = "peer"
-        index = 1
-        while f"{base}:{index}" in host.peers:
-            index += 1
-        peer_id = f"{base}:{index}"
+            # Assign a new peer id
+            base = "peer"
+            index = 1
+            while f"{base}:{index}" in host.peers:
+                index += 1
+            peer_id = f"{base}:{index}"
+        else:
+            print(f"[net] {peer_id} resumed from {addr[0]}:{addr[1]}")
 
-        # Remember mapping
+        # Remember mapping (a reused peer id starts over with full snapshots)
         host.peers[peer_id] = addr
-        server.register_peer(peer_id, addr)
+        self._reset_peer(host, peer_id)
+        welcome_fields = server.accept_peer(peer_id, addr, msg)
 
         # Send welcome
-        server.send_raw(addr, {
+        server.send_reliable(addr, {
             "type": MSG_WELCOME,
-            "protocol": PROTOCOL_VERSION,
             "peer_id": peer_id,
+            **welcome_fields,
         })
 
-    def _handle_input(self, world, msg: Dict[str, Any]) -> None:
+    # queue a packet's inputs (repeated history + current) in tick order;
+    # late and duplicate ticks are dropped
+    def _queue_input(self, host: NetHostState, msg: Dict[str, Any]) -> None:
         peer_id = msg.get("peer_id")
         intent_data = msg.get("intent", {})
-        if not isinstance(peer_id, str):
+        if not isinstance(peer_id, str) or not isinstance(intent_data, dict):
+            return
+        try:
+            tick = int(msg.get("tick", 0))
+        except (TypeError, ValueError):
             return
 
-        # Map remote input into the owner entity's Intent/InputState
-        for _eid, comps in world.query(PlayerTag, Owner, Intent, InputState):
-            owner: Owner = comps[Owner]
-            if owner.peer_id != peer_id:
-                continue
+        inputs: List[Tuple[int, Dict[str, Any]]] = []
+        history = msg.get("history")
+        if isinstance(history, list):
+            for entry in history:
+                try:
+                    old_tick, old_data = int(entry[0]), entry[1]
+                except (TypeError, ValueError, IndexError, KeyError):
+                    continue
+                if isinstance(old_data, dict) and old_tick < tick:
+                    inputs.append((old_tick, old_data))
+            inputs.sort(key=lambda i: i[0])
+        inputs.append((tick, intent_data))
 
-            intent: Intent = comps[Intent]
+        queue = host.input_queues.get(peer_id)
+        if queue is None:
+            queue = host.input_queues[peer_id] = deque()
+        newest = queue[-1][0] if queue else host.input_ticks.get(peer_id, 0)
+        for input_tick, data in inputs:
+            if input_tick > newest:
+                queue.append((input_tick, data))
+                newest = input_tick
 
-            # Movement axes
-            intent.move_x = float(intent_data.get("move_x", 0.0))
-            intent.move_y = float(intent_data.get("move_y", 0.0))
-            intent.facing = intent_data.get("facing", intent.facing)
+        # don't let a burst turn into standing latency
+        while len(queue) > Config.NET_INPUT_QUEUE_MAX:
+            queue.popleft()
+
+    # one input per peer per tick. an empty queue keeps the last intent
+    def _apply_queued_inputs(self, world, host: NetHostState) -> None:
+        if not host.input_queues:
+            return
+
+        for _eid, comps in world.query(PlayerTag, Owner, Intent, InputState):
+            peer_id = comps[Owner].peer_id
+            queue = host.input_queues.get(peer_id)
+            if not queue:
+                continue
+            tick, intent_data = queue.popleft()
+            self._apply_intent(comps[Intent], intent_data)
+            host.input_ticks[peer_id] = tick
 
-            # Actions
-            intent.basic_atk = bool(intent_data.get("basic_atk", False))
-            intent.basic_atk_held = bool(intent_data.get("basic_atk_held", False))
-            intent.dash = bool(intent_data.get("dash", False))
-            intent.special_atk = bool(intent_data.get("special_atk", False))
+    # Map remote input into the owner entity's Intent
+    @staticmethod
+    def _apply_intent(intent: Intent, intent_data: Dict[str, Any]) -> None:
+        # Movement axes
+        intent.move_x = float(intent_data.get("move_x", 0.0))
+        intent.move_y = float(intent_data.get("move_y", 0.0))
+        intent.facing = intent_data.get("facing", intent.facing)
 
-            break
+        # Actions
+        intent.basic_atk = bool(intent_data.get("basic_atk", False))
+        intent.basic_atk_held = bool(intent_data.get("basic_atk_held", False))
+        intent.dash = bool(intent_data.get("dash", False))
+        intent.special_atk = bool(intent_data.get("special_atk", False))
@@ -14,7 +14,7 @@ class NetSmoothingSystem:
         if alpha > 1.0:
             alpha = 1.0
 
-        for _eid, comps in world.query(Transform):
+        for _eid, comps in world.view(Transform):
             tr: Transform = comps[Transform]
 
             # If no network target yet, skip
@@ -8,7 +8,7 @@ class PresentationMapperSystem:
     def update(self, world, dt):
         
         # loop through all entities with intent, animationstate, and facing components
-        for eid, comps in world.query(Intent, AnimationState, Facing):
+        for eid, comps in world.view(Intent, AnimationState, Facing):
             it: Intent = comps[Intent]
             atk: Attack = comps[Attack]
             anim: AnimationState = comps[AnimationState]
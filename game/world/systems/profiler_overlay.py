@@ -0,0 +1,62 @@
+import pygame
+from pygame import Surface
+from game.core.config import Config
+from game.core.paths import resource_path
+
+
+class ProfilerOverlaySystem:
+    """
+    Profiler overlay.
+    Draws the world's TickProfiler next to the HUD (top-right corner):
+    one row per system, worst p95 first, plus the whole tick.
+    Does nothing when the world has no profiler attached.
+    The panel is only re-rendered when the profiler's cached summary changes.
+    """
+    FONT = None
+
+    MAX_ROWS = 12
+    PADDING = 4
+    LINE_H = 11
+
+    def __init__(self) -> None:
+        self._rows = None       # summary the panel was rendered from
+        self._panel = None
+
+    def draw(self, world, surface: Surface) -> None:
+        profiler = getattr(world, "profiler", None)
+        if profiler is None or not profiler.enabled:
+            return
+
+        if ProfilerOverlaySystem.FONT is None:
+            ProfilerOverlaySystem.FONT = pygame.font.Font(
+                resource_path("assets/fonts/Retro Gaming.ttf"), 8
+            )
+
+        rows = profiler.latest_summary()
+        if rows is not self._rows or self._panel is None:
+            self._rows = rows
+            self._panel = self._render(rows)
+        surface.blit(self._panel, (Config.WINDOW_W - self._panel.get_width() - 8, 8))
+
+    def _render(self, rows: list) -> Surface:
+        font = ProfilerOverlaySystem.FONT
+        tick = rows[-1]
+        rows = rows[:-1][: self.MAX_ROWS]
+
+        lines = [f"tick {tick['last_ms']:.2f}ms p95 {tick['p95_ms']:.2f} ents {tick['entities']}"]
+        for r in rows:
+            lines.append(f"{r['system'][:22]:<22} {r['last_ms']:6.2f} {r['p95_ms']:6.2f}")
+
+        # panel sized to the widest line
+        images = [font.render(line, True, (230, 230, 230)) for line in lines]
+        panel_w = max(img.get_width() for img in images) + self.PADDING * 2
+        panel_h = len(images) * self.LINE_H + self.PADDING * 2
+
+        panel = pygame.Surface((panel_w, panel_h), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 170))
+
+        y = self.PADDING
+        for img in images:
+            panel.blit(img, (self.PADDING, y))
+            y += self.LINE_H
+        return panel
@@ -42,8 +42,8 @@ class ProjectileSpawnSystem:
 
             
 
-            # CONSUME EVENT
-            del world.entities[eid][ProjectileRequest]
+            # CONSUME EVENT (applied after this system returns)
+            world.commands.remove(eid, ProjectileRequest)
 
             #to_remove.append(eid)
 
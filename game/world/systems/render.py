@@ -13,26 +13,19 @@ from game.core import resources
 class RenderSystem:
     def draw(self, world, surface: Surface) -> None:
         # find active map id and get tmx data
-        active_id: Optional[str] = None
-        for _, comps in world.query(ActiveMapId):
-            active_id = comps[ActiveMapId].id
-            break
+        am = world.singleton(ActiveMapId)
+        active_id: Optional[str] = am.id if am is not None else None
 
         # get camera
-        cam = None
-        for _, comps in world.query(Camera):
-            cam = comps[Camera]
-            break
+        cam = world.singleton(Camera)
 
         # get a list of all entities to render
         entities_world = []
-        for eid, comps in world.query(Transform, Sprite, AnimationState, Facing):
-            
-            # filter to active map if OnMap tags are present
-            if active_id is not None:
-                om = comps.get(OnMap)
-                if om is not None and om.id != active_id:
-                    continue
+        # filter to active map if OnMap tags are present
+        drawables = world.view(Transform, Sprite, AnimationState, Facing)
+        if active_id is not None:
+            drawables = drawables.on_maps((active_id,))
+        for eid, comps in drawables:
 
             tr = comps[Transform]
             spr = comps[Sprite]
@@ -68,7 +61,7 @@ class RenderSystem:
 
         # get tmx data if it exists
         tmx_data = None
-        for _, comps in world.query(Map):
+        for _, comps in world.view(Map):
             m = comps[Map]
             if (active_id is None and m.active) or (active_id is not None and m.id == active_id):
                 tmx_data = m.tmx_data
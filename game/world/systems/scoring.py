@@ -23,7 +23,7 @@ class ScoringSystem:
     # Death → Score logic
     # ------------------------------------------------------------------
     def _process_deaths(self, world) -> None:
-        for eid, comps in world.query(Transform, Life):
+        for eid, comps in world.view(Transform, Life):
             life: Life = comps[Life]
 
             # Not dead → skip
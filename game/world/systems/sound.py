@@ -29,13 +29,13 @@ class SoundSystem:
 
         # get local controlled player
         listeners: List[Tuple[float, float]] = []
-        for _eid, comps in world.query(LocalControlled, Transform):
+        for _eid, comps in world.view(LocalControlled, Transform):
             tr: Transform = comps[Transform]
             listeners.append((float(tr.x), float(tr.y)))
 
         # find the map the the local controlled player is on
         local_maps: set[str] = set()
-        for _eid, comps in world.query(LocalControlled, OnMap):
+        for _eid, comps in world.view(LocalControlled, OnMap):
             om: OnMap = comps[OnMap]
             map_id = getattr(om, "id", None)
             if map_id:
@@ -49,7 +49,7 @@ class SoundSystem:
         generic_requests: List[SoundRequest] = []
 
         # iterate through all SoundRequest comps
-        for eid, comps in world.query(SoundRequest):
+        for eid, comps in world.view(SoundRequest):
             req: SoundRequest = comps[SoundRequest]
 
             # Map gating 
@@ -107,11 +107,11 @@ class SoundSystem:
     def _detect_scene_kind(self, world) -> str:
         # check which scene we are in based on singletons
         # Title scene?
-        for _eid, _comps in world.query(TitleMenu):
+        if world.singleton(TitleMenu) is not None:
             return "title"
 
         # Hub / lobby scene?
-        for _eid, _comps in world.query(LobbyState):
+        if world.singleton(LobbyState) is not None:
             return "hub"
 
         # Everything else Dungeon scene
@@ -158,4 +158,11 @@ class SoundSystem:
         # object interactions
 
         elif event == "chest_open":
-            audio.play_sfx_group("misc.chest_open")
\ No newline at end of file
+            audio.play_sfx_group("misc.chest_open")
+
+# headless host (dedicated server): nothing to play, but SoundRequests still
+# have to be consumed every tick so they don't pile up on entities
+class SoundRequestDrainSystem:
+    def update(self, world, dt: float) -> None:
+        for eid, _comps in world.view(SoundRequest):
+            world.commands.remove(eid, SoundRequest)
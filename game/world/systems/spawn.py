@@ -19,7 +19,7 @@ class SpawnSystem:
         
         # collect map ids that currently have at least one player
         map_ids_with_players: set[str] = set()
-        for _eid, comps in world.query(PlayerTag, OnMap):
+        for _eid, comps in world.view(PlayerTag, OnMap):
             om: OnMap = comps[OnMap]
             if om.id:
                 map_ids_with_players.add(om.id)
@@ -120,17 +120,15 @@ def _run_game_spawns(world, mp: Map, active_id: str, policy: SpawnPolicy):
 # helpers ########################################################################
 
 def _get_policy(world) -> SpawnPolicy:
-    for _, comps in world.query(SpawnPolicy):
-        return comps[SpawnPolicy]
-    return SpawnPolicy()  # safe defaults
+    policy = world.singleton(SpawnPolicy)
+    return policy if policy is not None else SpawnPolicy()  # safe defaults
 
 def _active_map_id(world):
-    for _, comps in world.query(ActiveMapId):
-        return comps[ActiveMapId].id
-    return None
+    am = world.singleton(ActiveMapId)
+    return am.id if am is not None else None
 
 def _map_by_id(world, map_id: str):
-    for eid, comps in world.query(Map):
+    for eid, comps in world.view(Map):
         if comps[Map].id == map_id:
             return eid, comps[Map]
     return None, None
@@ -13,9 +13,8 @@ class TitleMenuSystem:
         self.options_images = options_images
 
     def _intro_ready(self, world) -> bool:
-        for _, comps in world.query(TitleIntro):
-            return comps[TitleIntro].phase == "ready"
-        return True
+        intro = world.singleton(TitleIntro)
+        return intro is None or intro.phase == "ready"
 
     def handle_event(self, world, event) -> None:
         if not self._intro_ready(world):
@@ -9,11 +9,7 @@ from game.world.maps.map_factory import create_or_activate, resolve_map_hint_to_
 class ViewpointActiveMapSystem:
     def update(self, world, dt: float) -> None:
         # Find the camera that follows the local player / viewpoint
-        cam = None
-        for _eid, comps in world.query(Camera, CameraFollowLocalPlayer):
-            cam = comps[Camera]
-            break
-
+        cam = world.get(world.singleton_entity(CameraFollowLocalPlayer), Camera)
         if cam is None:
             return
 
@@ -29,10 +25,8 @@ class ViewpointActiveMapSystem:
         target_map_id: str = om.id
 
         # Current ActiveMapId (if any)
-        current_id: Optional[str] = None
-        for _eid, comps in world.query(ActiveMapId):
-            current_id = comps[ActiveMapId].id
-            break
+        am = world.singleton(ActiveMapId)
+        current_id: Optional[str] = am.id if am is not None else None
 
         # Already on that map → nothing to do
         if current_id == target_map_id:
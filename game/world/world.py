@@ -5,9 +5,243 @@
 # - Entity = integer ID with a dict of component instances
 # - System = object with update(world, dt)
 # world.update runs systems in the registered order
+#
+# the world also keeps a per-component-type index (type -> entity ids) so
+# query() only has to look at entities that own the rarest requested type
+# instead of walking every entity in the world
+#
+# systems that run the same query every tick should use world.view(...) instead:
+# a view is registered once per component signature and kept up to date as
+# components are added/removed, so iterating it needs no per-entity checks
+#
+# singletons (ActiveMapId, Camera, PauseState, NetHostState, ...) are still plain
+# components on plain entities, but world.singleton(Comp) finds them in O(1)
+# through the type index instead of scanning for the first match
+#
+# entities are also bucketed by OnMap.id. buckets follow OnMap being added,
+# removed, replaced, or having its .id reassigned, so view.on_maps(ids) only
+# touches entities on those maps no matter how many old maps stay loaded
+#
+# structural changes made while a system is iterating (spawn, destroy,
+# add/remove component) should go through world.commands. the buffer is
+# flushed after every system in world.update, so no system ever sees an
+# entity disappear under it mid-loop
+#
+# attach a TickProfiler (world.profiler = TickProfiler()) to time every
+# system's update; with no profiler the loop is the same plain loop. queries
+# and views add the entities they walk to world.visited, so the profiler can
+# tell how many entities each system iterated
 
 
-from typing import Dict, List, Type, Iterator, Tuple, Any
+from time import perf_counter
+from typing import Dict, List, Type, Iterator, Tuple, Any, Iterable, Optional
+
+from game.world.components import OnMap
+from game.core.profiler import system_name
+
+
+# component dict for a single entity
+# systems write comps[Comp] = ... and del comps[Comp] directly, so the dict itself
+# reports every add/remove back to the World to keep the type index in sync
+class _ComponentDict(dict):
+    __slots__ = ("_world", "_eid")
+
+    def __init__(self, world: "World", eid: int) -> None:
+        super().__init__()
+        self._world = world
+        self._eid = eid
+
+    def __setitem__(self, comp_type: Type, comp: Any) -> None:
+        is_new = comp_type not in self
+        old = None if is_new else dict.__getitem__(self, comp_type)
+        dict.__setitem__(self, comp_type, comp)
+        world = self._world
+        if world is not None:
+            if comp_type is OnMap:
+                if old is not None and old is not comp:
+                    world._unbind_map(self._eid, old)
+                world._bind_map(self._eid, comp)
+            if is_new:
+                world._index_add(self._eid, comp_type)
+
+    def __delitem__(self, comp_type: Type) -> None:
+        comp = dict.pop(self, comp_type)
+        world = self._world
+        if world is not None:
+            world._index_remove(self._eid, comp_type)
+            if comp_type is OnMap:
+                world._unbind_map(self._eid, comp)
+
+    def pop(self, comp_type: Type, *default: Any) -> Any:
+        if comp_type in self:
+            comp = dict.__getitem__(self, comp_type)
+            self.__delitem__(comp_type)
+            return comp
+        if default:
+            return default[0]
+        raise KeyError(comp_type)
+
+    def popitem(self) -> Tuple[Type, Any]:
+        comp_type = next(reversed(self.keys()))
+        return comp_type, self.pop(comp_type)
+
+    def setdefault(self, comp_type: Type, default: Any = None) -> Any:
+        if comp_type not in self:
+            self[comp_type] = default
+        return dict.__getitem__(self, comp_type)
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        for comp_type, comp in dict(*args, **kwargs).items():
+            self[comp_type] = comp
+
+    def clear(self) -> None:
+        for comp_type in list(self.keys()):
+            self.__delitem__(comp_type)
+
+
+# live result set for one component signature
+# created through World.view(), which caches one view per signature
+class QueryView:
+    def __init__(self, world: "World", comp_types: Tuple[Type, ...]) -> None:
+        self._world = world
+        self.comp_types = comp_types
+        self._members: Dict[int, Dict[Type, Any]] = {}  # eid -> component dict
+        # same members partitioned by OnMap.id (None = entity has no OnMap)
+        self._parts: Dict[Optional[str], Dict[int, Dict[Type, Any]]] = {}
+        # bumped whenever an entity joins or leaves, so an index built from
+        # the view can tell whether it is still complete
+        self.version = 0
+
+    def _add(self, eid: int, comps: Dict[Type, Any], map_id: Optional[str]) -> None:
+        self._members[eid] = comps
+        self.version += 1
+        part = self._parts.get(map_id)
+        if part is None:
+            part = {}
+            self._parts[map_id] = part
+        part[eid] = comps
+
+    def _discard(self, eid: int, map_id: Optional[str]) -> None:
+        if self._members.pop(eid, None) is not None:
+            self.version += 1
+            part = self._parts.get(map_id)
+            if part is not None:
+                part.pop(eid, None)
+
+    def _move(self, eid: int, old_map: Optional[str], new_map: Optional[str]) -> None:
+        comps = self._members.get(eid)
+        if comps is None:
+            return
+        part = self._parts.get(old_map)
+        if part is not None:
+            part.pop(eid, None)
+        part = self._parts.get(new_map)
+        if part is None:
+            part = {}
+            self._parts[new_map] = part
+        part[eid] = comps
+
+    # yields (entity_id, component_dict) pairs like World.query
+    def __iter__(self) -> Iterator[Tuple[int, Dict[Type, Any]]]:
+        members = self._members
+        self._world.visited += len(members)
+        # copy so systems can add/delete entities while iterating
+        for eid, comps in list(members.items()):
+            if eid in members:
+                yield eid, comps
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    def __contains__(self, eid: int) -> bool:
+        return eid in self._members
+
+    # secondary filter by OnMap.id, served from the per-map partitions
+    # entities without an OnMap are kept unless include_unmapped is False,
+    # which matches how the simulation systems treat untagged entities
+    def on_maps(self, map_ids: Iterable[Optional[str]],
+                include_unmapped: bool = True) -> Iterator[Tuple[int, Dict[Type, Any]]]:
+        if not isinstance(map_ids, (set, frozenset, dict)):
+            map_ids = set(map_ids)
+
+        # collect all buckets up front so an entity that changes map
+        # mid-loop is not visited twice
+        items: List[Tuple[int, Dict[Type, Any]]] = []
+        for map_id, part in self._parts.items():
+            if map_id is None:
+                if not include_unmapped:
+                    continue
+            elif map_id not in map_ids:
+                continue
+            items.extend(part.items())
+        self._world.visited += len(items)
+
+        members = self._members
+        for eid, comps in items:
+            if eid in members:
+                yield eid, comps
+
+    # number of members on map_id
+    def count_on(self, map_id: Optional[str]) -> int:
+        return len(self._parts.get(map_id, ()))
+
+    # first matching (entity_id, component_dict) or (None, None)
+    def first(self) -> Tuple[Optional[int], Optional[Dict[Type, Any]]]:
+        for eid, comps in self._members.items():
+            return eid, comps
+        return None, None
+
+
+# deferred structural changes
+# spawn() hands back a reserved entity id right away so callers can queue
+# components for it; the entity itself only exists after the next flush.
+# destroys feed World._to_delete and are applied last in a flush
+class CommandBuffer:
+    def __init__(self, world: "World") -> None:
+        self._world = world
+        self._ops: List[Tuple[str, int, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self._ops) + len(self._world._to_delete)
+
+    # queue a new entity with the given components, returns its reserved id
+    def spawn(self, *comps: Any) -> int:
+        eid = self._world._reserve_id()
+        self._ops.append(("spawn", eid, comps))
+        return eid
+
+    # queue an entity for deletion
+    def destroy(self, eid: int) -> None:
+        self._world._to_delete.append(eid)
+
+    # queue a component add (replaces an existing one of the same type)
+    def add(self, eid: int, comp: Any) -> None:
+        self._ops.append(("add", eid, comp))
+
+    # queue a component removal
+    def remove(self, eid: int, comp_type: Type) -> None:
+        self._ops.append(("remove", eid, comp_type))
+
+    # apply everything queued so far, in order, then the destroys
+    def flush(self) -> None:
+        world = self._world
+        while self._ops:
+            ops, self._ops = self._ops, []
+            for op, eid, arg in ops:
+                if op == "spawn":
+                    comps = _ComponentDict(world, eid)
+                    world.entities[eid] = comps
+                    for comp in arg:
+                        comps[type(comp)] = comp
+                elif op == "add":
+                    comps = world.entities.get(eid)
+                    if comps is not None:
+                        comps[type(arg)] = arg
+                else:
+                    world.remove(eid, arg)
+        if world._to_delete:
+            world.cleanup_deleted()
+
 
 class World:
     def __init__(self) -> None:
@@ -16,13 +250,38 @@ class World:
         self._next_id = 1                                   # next integer id to be given
         self._to_delete: List[int] = []
 
+        # CompType -> ids of entities that own it
+        # dicts are used as insertion-ordered sets so queries stay deterministic
+        self._by_type: Dict[Type, Dict[int, None]] = {}
+
+        # cached views: frozenset(signature) -> view, plus CompType -> views using it
+        self._views: Dict[frozenset, QueryView] = {}
+        self._views_by_type: Dict[Type, List[QueryView]] = {}
+
+        # OnMap.id -> ids of entities on that map, and the reverse
+        self._by_map: Dict[str, Dict[int, None]] = {}
+        self._map_of: Dict[int, str] = {}
+
+        # deferred spawn/destroy/add/remove, flushed between systems
+        self.commands = CommandBuffer(self)
+
+        # optional game.core.profiler.TickProfiler
+        self.profiler = None
+        # running count of entities walked by query/view/entities_on
+        self.visited = 0
+
     # entity & component management #########################################################
 
     # build new entity
     def new_entity(self) -> int:
-        eid = self._next_id # entity id
+        eid = self._reserve_id() # entity id
+        self.entities[eid] = _ComponentDict(self, eid)
+        return eid
+
+    # hand out the next entity id without creating the entity
+    def _reserve_id(self) -> int:
+        eid = self._next_id
         self._next_id += 1
-        self.entities[eid] = {}
         return eid
 
     # add a component instance to an entity
@@ -35,40 +294,223 @@ class World:
         if comps is None:
             return None
         return comps.get(comp_type)
-    
+
     # return the component dict for the entity
     def components_of(self, eid: int) -> Dict[Type, Any]:
-        return self.entities.setdefault(eid, {})
+        comps = self.entities.get(eid)
+        if comps is None:
+            comps = _ComponentDict(self, eid)
+            self.entities[eid] = comps
+        return comps
 
     # iterates through entities that have all of the requested component types
-    # yields (entity_id, component_dict) pairs 
+    # yields (entity_id, component_dict) pairs
     def query(self, *comp_types: Type) -> Iterator[Tuple[int, Dict[Type, Any]]]:
-        for eid, comps in self.entities.items():
+        if not comp_types:
+            self.visited += len(self.entities)
+            yield from list(self.entities.items())
+            return
+
+        # drive the scan from the rarest requested type
+        smallest = None
+        for ct in comp_types:
+            ids = self._by_type.get(ct)
+            if not ids:
+                return
+            if smallest is None or len(ids) < len(smallest):
+                smallest = ids
+
+        self.visited += len(smallest)
+        # copy the ids so systems can add/delete entities while iterating
+        for eid in tuple(smallest):
+            comps = self.entities.get(eid)
+            if comps is None:
+                continue    # deleted earlier in this loop
             if all(ct in comps for ct in comp_types):
                 yield eid, comps
 
+    # cached, incrementally maintained query for a component signature
+    # the first call registers the view; later calls with the same types
+    # (in any order) return the same object
+    def view(self, *comp_types: Type) -> QueryView:
+        key = frozenset(comp_types)
+        v = self._views.get(key)
+        if v is not None:
+            return v
+
+        v = QueryView(self, tuple(comp_types))
+        for eid, comps in self.query(*comp_types):
+            v._add(eid, comps, self._map_of.get(eid))
+        self._views[key] = v
+        for ct in key:
+            self._views_by_type.setdefault(ct, []).append(v)
+        return v
+
+    # singletons #####################################################################
+
+    # entity id that holds the singleton comp_type, or None
+    def singleton_entity(self, comp_type: Type) -> Optional[int]:
+        ids = self._by_type.get(comp_type)
+        if not ids:
+            return None
+        return next(iter(ids))
+
+    # the singleton component instance of comp_type, or None
+    def singleton(self, comp_type: Type) -> Any:
+        ids = self._by_type.get(comp_type)
+        if not ids:
+            return None
+        return self.entities[next(iter(ids))][comp_type]
+
+    # install comp as the singleton of its type
+    # replaces the instance on the entity that already holds one, otherwise
+    # creates a new entity for it. returns the holder entity id
+    def set_singleton(self, comp: Any) -> int:
+        eid = self.singleton_entity(type(comp))
+        if eid is None:
+            eid = self.new_entity()
+        self.add(eid, comp)
+        return eid
+
+    # number of entities that own comp_type
+    def count(self, comp_type: Type) -> int:
+        return len(self._by_type.get(comp_type, ()))
+
+    # map buckets ####################################################################
+
+    # ids of maps that currently hold at least one entity
+    def map_ids(self) -> List[str]:
+        return [map_id for map_id, ids in self._by_map.items() if ids]
+
+    # OnMap.id of an entity, or None
+    def map_of(self, eid: int) -> Optional[str]:
+        return self._map_of.get(eid)
+
+    # (entity_id, component_dict) pairs for every entity on map_id
+    def entities_on(self, map_id: str) -> Iterator[Tuple[int, Dict[Type, Any]]]:
+        ids = tuple(self._by_map.get(map_id, ()))
+        self.visited += len(ids)
+        for eid in ids:
+            comps = self.entities.get(eid)
+            if comps is not None:
+                yield eid, comps
+
     # simulation tick ###############################################################
     # run each system once. order matters in the systems list
+    # queued commands are flushed after every system (the sync points)
     def update(self, dt: float) -> None:
+        commands = self.commands
+        profiler = self.profiler
+        if profiler is not None and profiler.enabled:
+            self._update_profiled(dt, profiler)
+            return
         for sys in self.systems:
             sys.update(self, dt)
-        self.cleanup_deleted()
+            commands.flush()
+
+    # same as update, timing each system (update + flush) and counting the
+    # entities its queries/views walked
+    def _update_profiled(self, dt: float, profiler: Any) -> None:
+        commands = self.commands
+        clock = perf_counter
+        tick_start = clock()
+        for sys in self.systems:
+            visited = self.visited
+            t0 = clock()
+            sys.update(self, dt)
+            commands.flush()
+            profiler.record(system_name(sys), (clock() - t0) * 1000.0, self.visited - visited)
+        profiler.end_tick((clock() - tick_start) * 1000.0, len(self.entities))
 
       # completely remove an entity and all its components
     def delete_entity(self, eid: int) -> None:
         #"""Removes the given entity and all of its components from the world."""
-        if eid in self.entities:
-            del self.entities[eid]
+        comps = self.entities.pop(eid, None)
+        if comps is None:
+            return
+        for comp_type in comps:
+            self._index_remove(eid, comp_type)
+        om = comps.get(OnMap)
+        if om is not None:
+            self._unbind_map(eid, om)
+        # detach so stale references can't touch the index anymore
+        if isinstance(comps, _ComponentDict):
+            comps._world = None
 
 
     def cleanup_deleted(self) -> None:
         #"""Remove all entities queued for deletion."""
-        for eid in self._to_delete:
-            self.entities.pop(eid, None)
-        self._to_delete.clear()
-        
+        to_delete, self._to_delete = self._to_delete, []
+        for eid in to_delete:
+            self.delete_entity(eid)
+
     def remove(self, eid: int, comp_type: type) -> None:
         comps = self.entities.get(eid)
         if comps and comp_type in comps:
             del comps[comp_type]
 
+    # type index ####################################################################
+
+    def _index_add(self, eid: int, comp_type: Type) -> None:
+        ids = self._by_type.get(comp_type)
+        if ids is None:
+            ids = {}
+            self._by_type[comp_type] = ids
+        ids[eid] = None
+
+        views = self._views_by_type.get(comp_type)
+        if views:
+            comps = self.entities.get(eid)
+            if comps is None:
+                return
+            map_id = self._map_of.get(eid)
+            for v in views:
+                if all(ct in comps for ct in v.comp_types):
+                    v._add(eid, comps, map_id)
+
+    def _index_remove(self, eid: int, comp_type: Type) -> None:
+        ids = self._by_type.get(comp_type)
+        if ids is not None:
+            ids.pop(eid, None)
+
+        views = self._views_by_type.get(comp_type)
+        if views:
+            map_id = self._map_of.get(eid)
+            for v in views:
+                v._discard(eid, map_id)
+
+    # map index #####################################################################
+
+    # OnMap attached (or replaced) on eid
+    def _bind_map(self, eid: int, om: OnMap) -> None:
+        object.__setattr__(om, "_bound", (self, eid))
+        self._set_entity_map(eid, om.id)
+
+    # OnMap detached from eid
+    def _unbind_map(self, eid: int, om: OnMap) -> None:
+        if om.__dict__.get("_bound") == (self, eid):
+            object.__setattr__(om, "_bound", None)
+        self._set_entity_map(eid, None)
+
+    # move eid to the bucket for map_id (None = no OnMap)
+    def _set_entity_map(self, eid: int, map_id: Optional[str]) -> None:
+        old = self._map_of.get(eid)
+        if old == map_id:
+            return
+
+        if old is not None:
+            ids = self._by_map.get(old)
+            if ids is not None:
+                ids.pop(eid, None)
+        if map_id is not None:
+            ids = self._by_map.get(map_id)
+            if ids is None:
+                ids = {}
+                self._by_map[map_id] = ids
+            ids[eid] = None
+            self._map_of[eid] = map_id
+        else:
+            self._map_of.pop(eid, None)
+
+        for v in self._views.values():
+            v._move(eid, old, map_id)
@@ -0,0 +1,90 @@
+# Headless dedicated server
+#
+# run from the project root:
+#   python -m server.run_server [--port 5000] [--name "GateCrashers Server"] [--map level1]
+#                               [--sessions 1] [--workers 0]
+#
+# hosts the same session a HubScene(HOST) + DungeonScene(HOST) would, without a
+# window, audio or a local player:
+#   - LOBBY: answers LAN discovery, accepts HELLO/LOBBY_UPDATE from clients
+#     (the normal JOIN flow in HubScene works unchanged). once every joined
+#     player is ready, START_GAME is broadcast
+#   - GAME:  DungeonScene(role="HOST", headless=True) runs the host system list
+#     (spawn, AI, attack, movement, collision, NetHostSystem, ...) at a fixed
+#     tick. presentation systems are stripped by the scene
+#   - when the party wipes, every client has left, or the ones that timed out
+#     haven't resumed within Config.NET_RESUME_GRACE seconds, the server goes
+#     back to the lobby and keeps the socket open for the next session
+#
+# --sessions N runs N of those side by side on the same port, each with its
+# own lobby, World and peers; new players fill the first lobby with room.
+# --workers M spreads them over M processes (server/sessions.py)
+
+import os
+
+# SDL must be told before pygame is imported: no window, no audio device.
+# SDL would also turn SIGTERM into a QUIT event nobody reads, so keep its
+# signal handlers out and handle SIGTERM ourselves (see run())
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("SDL_NO_SIGNAL_HANDLERS", "1")
+
+import argparse
+import signal
+from typing import Optional
+
+import pygame
+
+from game.core.config import Config
+from game.net.discovery import HostDiscovery
+from server.sessions import SessionManager, init_headless_pygame, run_fixed
+
+
+# `kill` / service stop: shut down like Ctrl+C
+def _on_sigterm(_signum, _frame) -> None:
+    raise KeyboardInterrupt
+
+
+def run(port: int = Config.NET_PORT, name: str = "GateCrashers Server", map_id: str = "level1",
+        tick_rate: Optional[float] = None, sessions: int = 1, workers: int = 0) -> None:
+    signal.signal(signal.SIGTERM, _on_sigterm)
+    fixed_dt = 1.0 / tick_rate if tick_rate else Config.FIXED_DT
+    # workers load their own assets; the parent only routes
+    if workers <= 0:
+        init_headless_pygame()
+
+    manager = SessionManager(port, sessions, map_id, workers=workers, tick_rate=tick_rate)
+    discovery = HostDiscovery(game_port=port, name=name)
+    where = f" in {len(manager.workers)} workers" if manager.workers else ""
+    print(f"[server] listening on udp/{port} at {1.0 / fixed_dt:.0f} ticks/s, "
+          f"{len(manager.session_ids)} session(s){where}")
+
+    try:
+        run_fixed(manager.step, fixed_dt)
+    except KeyboardInterrupt:
+        print("[server] shutting down")
+    finally:
+        discovery.close()
+        manager.close()
+        pygame.quit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="GateCrashers headless dedicated server")
+    parser.add_argument("--port", type=int, default=Config.NET_PORT,
+                        help=f"UDP game port (default {Config.NET_PORT})")
+    parser.add_argument("--name", default="GateCrashers Server", help="name shown in the LAN host list")
+    parser.add_argument("--map", dest="map_id", default="level1", help="map id to start sessions on")
+    parser.add_argument("--tick-rate", type=float, default=None,
+                        help="simulation ticks per second (default 1 / Config.FIXED_DT)")
+    parser.add_argument("--sessions", type=int, default=1,
+                        help="independent lobbies/games served on the port (default 1)")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="processes to spread the sessions over (default 0: all in this one)")
+    args = parser.parse_args()
+    run(port=args.port, name=args.name, map_id=args.map_id, tick_rate=args.tick_rate,
+        sessions=args.sessions, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+# class: SessionManager
+
+# several game sessions in one server process
+#
+# a Session is what the dedicated server used to be as a whole: a lobby that
+# fills up and readies, a headless DungeonScene(HOST) until the party wipes or
+# leaves, then a fresh lobby. each session has its own NetworkContext (peers,
+# lobby data, NetServer), World and tick, so any number can run side by side
+#
+# SessionManager runs them all behind one port: a SessionRouter
+# (game/net/router.py) owns the socket and every session's NetServer is a
+# link of it. a player's first HELLO is placed by route_pending():
+#   - its "session" field, if it names one of ours
+#   - the session in front of its resume token ("<session>:<token>")
+#   - the first lobby with a free slot
+#   - otherwise the first session, which answers the way it always has
+#     (full, or a late join)
+#
+# with workers > 0 the sessions are dealt out to that many processes instead.
+# each worker runs its sessions at its own fixed tick and talks to the router
+# over a pipe: datagrams in, datagrams out, route changes and whether each
+# lobby still has room. the parent process only routes, so separate sessions
+# simulate (and decode) on separate cores
+
+import multiprocessing
+import signal
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pygame
+
+from game.core.config import Config
+from game.core.paths import resource_path
+from game.core.resources import load_atlases
+from game.world.actors.blueprint_index import load as load_blueprints
+from game.world.maps.map_index import load_registry
+from game.scene_manager import SceneManager
+from game.scenes.dungeon import DungeonScene
+from game.scenes.hub import HubScene
+from game.net.context import NetworkContext
+from game.net.router import SessionRouter
+from game.net.server import NetServer
+from game.net.lobby import LobbyHost
+from game.net.protocol import MSG_HELLO
+from game.world.components import LobbySlot
+
+Address = Tuple[str, int]
+
+MAX_PLAYERS = 5
+
+
+# one lobby -> game -> lobby cycle after another, on its own NetServer
+class Session:
+    def __init__(self, session_id: str, server: NetServer, map_id: str, name: str = "server") -> None:
+        self.session_id = session_id
+        self.map_id = map_id
+        self.name = name
+        self.net = NetworkContext(role="HOST", my_peer_id="host", server=server)
+
+        self.lobby: Optional[LobbyHost] = self._new_lobby()
+        self.scenes: Optional[SceneManager] = None
+        self.dungeon: Optional[DungeonScene] = None
+        # when the game ran out of peers (they may still resume)
+        self.empty_since: Optional[float] = None
+
+    # a lobby with a free slot
+    def accepting(self) -> bool:
+        return self.lobby is not None and self.lobby.has_room()
+
+    def step(self, dt: float) -> None:
+        if self.dungeon is None:
+            # LOBBY ##############################################################
+            self.lobby.pump()
+            if self.lobby.all_ready():
+                self.lobby.start_game(self.map_id)
+                print(f"[{self.name}] starting {self.map_id} with {sorted(self.net.lobby_data['heroes'])}")
+                self.scenes = SceneManager()
+                self.dungeon = DungeonScene(self.scenes, role="HOST", headless=True, context=self.net)
+                self.scenes.set(self.dungeon)
+                self.lobby = None
+            return
+
+        # GAME ###################################################################
+        self.scenes.update(dt)
+        # peers that left on purpose have no resume token anymore
+        if self.net.peers:
+            self.empty_since = None
+        elif self.empty_since is None:
+            self.empty_since = time.perf_counter()
+        abandoned = self.empty_since is not None and (
+            not self.net.server.resume_tokens
+            or time.perf_counter() - self.empty_since > Config.NET_RESUME_GRACE
+        )
+        if self.dungeon.game_over or abandoned:
+            print(f"[{self.name}] session over, back to lobby")
+            self._end_game()
+            self.lobby = self._new_lobby()
+
+    def close(self) -> None:
+        if self.dungeon is not None:
+            self._end_game()
+        self.net.server.close()
+
+    # lobby without a local slot: all five slots belong to remote peers.
+    # same protocol as HubScene's host side (game/net/lobby.py)
+    def _new_lobby(self) -> LobbyHost:
+        slots = [LobbySlot(index=i, name=f"Player {i + 1}") for i in range(MAX_PLAYERS)]
+        return LobbyHost(self.net, lambda: enumerate(slots), HubScene.HERO_CATALOG, name=self.name)
+
+    def _end_game(self) -> None:
+        self.dungeon.exit()
+        self.scenes = None
+        self.dungeon = None
+        self.empty_since = None
+        for peer_id in list(self.net.server.peer_to_addr.keys()):
+            self.net.server.unregister_peer(peer_id)
+        self.net.peers.clear()
+
+
+# every session behind one port, here or in worker processes
+class SessionManager:
+    def __init__(self, port: int, count: int, map_id: str, workers: int = 0,
+                 tick_rate: Optional[float] = None) -> None:
+        self.router = SessionRouter(port=port)
+        self.session_ids = [str(i + 1) for i in range(max(1, count))]
+        self.sessions: Dict[str, Session] = {}
+        self.workers: List[SessionWorker] = []
+
+        if workers <= 0:
+            for sid in self.session_ids:
+                server = NetServer(session=self.router.link(sid))
+                self.sessions[sid] = Session(sid, server, map_id, _session_name(sid, len(self.session_ids)))
+            return
+
+        workers = min(workers, len(self.session_ids))
+        for w in range(workers):
+            ids = self.session_ids[w::workers]
+            self.workers.append(SessionWorker(self.router, ids, map_id, tick_rate, len(self.session_ids)))
+
+    def step(self, dt: float) -> bool:
+        self.route_pending()
+        self.router.flush()
+        for session in self.sessions.values():
+            session.step(dt)
+        return True
+
+    def route_pending(self) -> None:
+        for addr, data, msg in self.router.drain_pending():
+            if msg.get("type") != MSG_HELLO:
+                continue    # stale traffic from someone no session knows
+            self.router.deliver(self._pick_session(msg), data, addr)
+
+    def accepting(self, session_id: str) -> bool:
+        session = self.sessions.get(session_id)
+        if session is not None:
+            return session.accepting()
+        for worker in self.workers:
+            if session_id in worker.accepting:
+                return worker.accepting[session_id]
+        return False
+
+    def close(self) -> None:
+        for session in self.sessions.values():
+            session.close()
+        for worker in self.workers:
+            worker.close()
+        self.router.close()
+
+    def _pick_session(self, hello: Dict[str, Any]) -> str:
+        asked = hello.get("session")
+        if asked in self.session_ids:
+            return asked
+        token = hello.get("resume")
+        if isinstance(token, str):
+            owner = token.split(":", 1)[0]
+            if owner in self.session_ids:
+                return owner
+        for sid in self.session_ids:
+            if self.accepting(sid):
+                return sid
+        return self.session_ids[0]
+
+
+def _session_name(session_id: str, count: int) -> str:
+    return "server" if count == 1 else f"session {session_id}"
+
+
+# pygame pieces the simulation needs: image loading (atlases, tmx tiles) wants
+# a video mode, even on the dummy driver. the mixer is never initialized
+def init_headless_pygame() -> None:
+    pygame.display.init()
+    pygame.display.set_mode((1, 1))
+    pygame.font.init()
+
+    load_atlases(resource_path("data/sprites/atlases.json"))
+    load_blueprints(resource_path("data/blueprints/heroes.json"), resource_path("data/blueprints/enemies.json"))
+    # map ids go into the codec string table built on the first HELLO
+    load_registry(resource_path("data/map_registry.json"))
+
+
+# call step(fixed_dt) every fixed_dt seconds until it returns False. if we fell
+# behind, don't try to catch up with a burst of steps
+def run_fixed(step: Callable[[float], bool], fixed_dt: float) -> None:
+    next_tick = time.perf_counter()
+    while step(fixed_dt):
+        next_tick += fixed_dt
+        delay = next_tick - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            next_tick = time.perf_counter()
+
+
+# process pool #################################################################
+
+# parent side of a worker process
+class SessionWorker:
+    def __init__(self, router: SessionRouter, session_ids: List[str], map_id: str,
+                 tick_rate: Optional[float], total: int) -> None:
+        self.router = router
+        self.session_ids = session_ids
+        # session id -> lobby has room, as last reported
+        self.accepting: Dict[str, bool] = {sid: False for sid in session_ids}
+
+        # spawn, not fork: the parent already runs the net loop thread
+        ctx = multiprocessing.get_context("spawn")
+        self.conn, child = ctx.Pipe()
+        self._lock = threading.Lock()   # the loop and game threads both forward
+        self.process = ctx.Process(
+            target=_worker_main, args=(child, router.address, session_ids, map_id, tick_rate, total),
+            name=f"sessions-{'-'.join(session_ids)}", daemon=True,
+        )
+        self.process.start()
+        child.close()
+
+        for sid in session_ids:
+            router.receivers[sid] = self._forwarder(sid)
+        router.watch(self.conn, self._on_message)
+
+    def _forwarder(self, session_id: str) -> Callable[[bytes, Address], None]:
+        def forward(data: bytes, addr: Address) -> None:
+            try:
+                with self._lock:
+                    self.conn.send((session_id, data, addr))
+            except (OSError, ValueError):
+                pass
+        return forward
+
+    # loop thread: whatever the worker sent
+    def _on_message(self, msg: Optional[Tuple]) -> None:
+        if msg is None:
+            print(f"[server] worker for sessions {', '.join(self.session_ids)} exited")
+            for sid in self.session_ids:
+                self.router.drop_session(sid)
+                self.accepting[sid] = False
+            return
+        kind = msg[0]
+        if kind == "out":
+            self.router.send_now(msg[1], msg[2])
+        elif kind == "route":
+            self.router.route(msg[1], msg[2])
+        elif kind == "unroute":
+            self.router.unroute(msg[1], msg[2])
+        elif kind == "accepting":
+            self.accepting[msg[1]] = msg[2]
+
+    def close(self) -> None:
+        # the worker ends its sessions when the pipe closes
+        try:
+            self.conn.close()
+        except OSError:
+            pass
+        self.process.join(2.0)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+# worker side: NetServer sends through this instead of a socket
+class _PipeSocket:
+    def __init__(self, conn) -> None:
+        self._conn = conn
+
+    def sendto(self, data: bytes, addr: Address) -> int:
+        try:
+            self._conn.send(("out", data, addr))
+        except (OSError, ValueError):
+            pass
+        return len(data)
+
+    def close(self) -> None:
+        return
+
+
+# worker side: a session's link to the router in the parent process
+class PipeLink:
+    def __init__(self, conn, session_id: str, address: Address) -> None:
+        self._conn = conn
+        self.session_id = session_id
+        self.address = address
+        self.sock = _PipeSocket(conn)
+        self.inbox = None
+
+    def attach(self, inbox) -> None:
+        self.inbox = inbox
+
+    def route(self, addr: Address) -> None:
+        self._send(("route", addr, self.session_id))
+
+    def unroute(self, addr: Address) -> None:
+        self._send(("unroute", addr, self.session_id))
+
+    def close(self) -> None:
+        self.inbox = None
+
+    # whether this session's lobby has room, for the parent's HELLO routing
+    def report(self, accepting: bool) -> None:
+        self._send(("accepting", self.session_id, accepting))
+
+    def _send(self, msg: Tuple) -> None:
+        try:
+            self._conn.send(msg)
+        except (OSError, ValueError):
+            pass
+
+
+def _worker_main(conn, address: Address, session_ids: List[str], map_id: str,
+                 tick_rate: Optional[float], total: int) -> None:
+    # Ctrl+C reaches the whole process group; the parent shuts us down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    init_headless_pygame()
+    fixed_dt = 1.0 / tick_rate if tick_rate else Config.FIXED_DT
+
+    links: Dict[str, PipeLink] = {}
+    sessions: Dict[str, Session] = {}
+    for sid in session_ids:
+        link = links[sid] = PipeLink(conn, sid, address)
+        sessions[sid] = Session(sid, NetServer(session=link), map_id, _session_name(sid, total))
+    reported: Dict[str, bool] = {}
+
+    def step(dt: float) -> bool:
+        try:
+            while conn.poll():
+                sid, data, addr = conn.recv()
+                link = links.get(sid)
+                if link is not None and link.inbox is not None:
+                    # decoded here, in the worker
+                    link.inbox.datagram_received(data, addr)
+        except (EOFError, OSError):
+            return False
+
+        for sid, session in sessions.items():
+            session.step(dt)
+            accepting = session.accepting()
+            if reported.get(sid) != accepting:
+                reported[sid] = accepting
+                links[sid].report(accepting)
+        return True
+
+    try:
+        run_fixed(step, fixed_dt)
+    finally:
+        for session in sessions.values():
+            session.close()